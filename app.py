@@ -1,13 +1,22 @@
 # app.py - JejakPalsu Forensic Checker
+import atexit
+import csv
 import hashlib
+import json
 import os
+import re
 import secrets
+import threading
 import time
+from contextlib import contextmanager, nullcontext
+from functools import partial
 from PIL import Image
 from PIL.ExifTags import TAGS
-from flask import Flask, render_template, request, redirect, url_for, send_file, send_from_directory
+from flask import Blueprint, Flask, Response, copy_current_request_context, current_app, jsonify, render_template, request, redirect, url_for, send_file, stream_with_context
+from markupsafe import escape
 from werkzeug.utils import secure_filename
-from io import BytesIO
+from io import BytesIO, StringIO
+from pathlib import Path
 
 
 
@@ -15,14 +24,27 @@ from io import BytesIO
 Image = None
 TAGS = {}
 ImageChops = None
-PdfReader = None
-HTML = None
-CSS = None
-
-try:
-    from pdf2image import convert_from_path
-except ImportError:
-    print("WARNING: pdf2image not found. ELA for PDF will fail.")
+compute_ela = None
+AnalysisCache = None
+ResultStore = None
+ReportRenderer = None
+ArtifactStore = None
+HashIndex = None
+EvidenceStore = None
+extract_strings = None
+hex_page = None
+analyze_jpeg = None
+detect_copy_move = None
+noise_map = None
+ghost_sweep = None
+scan_pdf_revisions = None
+read_image_metadata = None
+estimate_cost = None
+MemoryBudget = None
+ingest_upload = None
+JobQueue = None
+backends = None
+metrics = None
 
 try:
     from PIL import Image, ImageChops
@@ -31,15 +53,127 @@ except ImportError:
     print("WARNING: Pillow library not found. Image metadata and ELA will be limited.")
 
 try:
-    from pypdf import PdfReader
+    from forensic_tools.ela import compute_ela, compute_ela_tiled, image_size, load_rgb
+except ImportError:
+    compute_ela = None
+    print("WARNING: NumPy/Pillow not found. ELA will be unavailable.")
+
+try:
+    from forensic_tools.ingest import ingest_upload, ingest_file, open_mapped, signature_matches_extension, MappedReader
+except ImportError:
+    ingest_upload = None
+    print("WARNING: forensic_tools could not be imported. Uploads will be hashed after saving.")
+
+try:
+    from forensic_tools.strings_scan import extract_strings, DEFAULT_KEYWORDS
+except ImportError:
+    extract_strings = None
+    DEFAULT_KEYWORDS = ()
+
+try:
+    from forensic_tools.hexview import hex_page, BYTES_PER_ROW
+except ImportError:
+    hex_page = None
+
+try:
+    from forensic_tools.jpeg_markers import analyze_jpeg, format_quant_table
+except ImportError:
+    analyze_jpeg = None
+
+try:
+    from forensic_tools.copy_move import detect_copy_move, render_overlay
+except ImportError:
+    detect_copy_move = None
+    print("WARNING: NumPy/Pillow not found. Copy-move detection will be unavailable.")
+
+try:
+    from forensic_tools.noise import noise_map
+except ImportError:
+    noise_map = None
+    print("WARNING: NumPy/Pillow not found. Noise analysis will be unavailable.")
+
+try:
+    from forensic_tools.ghost import ghost_sweep
+except ImportError:
+    ghost_sweep = None
+
+try:
+    from forensic_tools.cache import AnalysisCache, ResultStore, artifact_name
+except ImportError:
+    AnalysisCache = None
+    ResultStore = None
+    print("WARNING: forensic_tools could not be imported. Analysis results will not be cached.")
+
+try:
+    from forensic_tools.artifacts import ArtifactStore, preview_name
+except ImportError:
+    ArtifactStore = None
+
+try:
+    from forensic_tools.phash import HashIndex, MAX_RADIUS, image_hashes, to_hex, from_hex
+except ImportError:
+    HashIndex = None
+
+try:
+    from forensic_tools.evidence import EvidenceStore, parse_filters, COLUMNS as EVIDENCE_COLUMNS
+except ImportError:
+    EvidenceStore = None
+
+try:
+    from forensic_tools.reports import ReportRenderer, ReportUnavailable, RenderTimeout, report_key
+except ImportError:
+    ReportRenderer = None
+
+try:
+    from forensic_tools.jobs import JobQueue, QueueFull, start_workers, DONE, FAILED
+except ImportError:
+    JobQueue = None
+    print("WARNING: forensic_tools could not be imported. Background analysis jobs are disabled.")
+
+try:
+    from forensic_tools.pdf_revisions import scan_pdf_revisions, scan_pdf_file, editing_tools
+except ImportError:
+    scan_pdf_revisions = None
+
+# EXIF/XMP/IRB/PNG-chunk metadata read from the headers (see check_metadata)
+try:
+    from forensic_tools.image_metadata import editing_software, metadata_findings, read_image_metadata, software_fields
+except ImportError:
+    read_image_metadata = None
+
+# pdf2image, pypdf and weasyprint are imported on first use (see forensic_tools.backends)
+try:
+    from forensic_tools import backends
+except ImportError:
+    backends = None
+
+# Stage timings, byte/error counters and image sizes for /metrics
+try:
+    from forensic_tools import metrics
 except ImportError:
-    print("WARNING: pypdf library not found. PDF metadata extraction will be limited.")
+    metrics = None
+
+# Required, and safe without numpy/Pillow: pipeline is stdlib only and forensic_tools/__init__
+# imports its numpy helpers lazily. Analyzers are scheduled over shared inputs (see ANALYSIS below)
+from forensic_tools.pipeline import Pipeline
 
+# Header-only cost estimates gate every decode (see admit_analysis)
 try:
-    from weasyprint import HTML, CSS 
+    from forensic_tools.admission import (ADMIT, DOWNSCALE, QUEUE, REJECT, AdmissionRejected, MemoryBudget,
+                                          decide as decide_admission, estimate_cost)
 except ImportError:
-    # This is okay if you only need the web analysis, but required for PDF reports
-    print("WARNING: weasyprint library not found. PDF Report generation will fail.")
+    print("WARNING: forensic_tools.admission could not be imported. Files are analyzed without admission control.")
+    estimate_cost = None
+    MemoryBudget = None
+    ADMIT, QUEUE, DOWNSCALE, REJECT = 'admit', 'queue', 'downscale', 'reject'
+
+    class AdmissionRejected(Exception):
+        """Stand-in for the except clauses; never raised without forensic_tools.admission."""
+        status, admission = 413, None
+
+def load_backend(name):
+    """The optional backend module, imported on first use (None if unavailable)."""
+    return backends.load(name) if backends else None
 
 # --- Helper functions for HTML table generation (Retained) ---
 def _create_row(key, value, highlight=False):
@@ -62,124 +196,259 @@ def _create_section_header(title):
 # ------------------------------------------------
 
 # --- Forensic Tools: Error Level Analysis (ELA) (FIXED LOGIC) ---
-def perform_ela(image_source):
+ELA_QUALITY = 95
+ELA_SCALE = 20
+ELA_NORMALIZE = 'scale'
+# Images with at least this many pixels are analyzed in strips (compute_ela_tiled)
+ELA_TILED_MIN_PIXELS = 12_000_000
+ELA_MEMORY_BUDGET = 64 * 1024 * 1024
+
+def perform_ela(image_source, quality=ELA_QUALITY, scale=ELA_SCALE, normalize=ELA_NORMALIZE, full_result=False,
+                tiled_min_pixels=ELA_TILED_MIN_PIXELS, memory_budget=ELA_MEMORY_BUDGET, full_resolution=False):
     """
-    Accepts either a file path or a PIL Image object.
-    Performs ELA comparison and returns an enhanced difference image.
+    Accepts a file path, a PIL Image object or a decoded RGB array.
+    Performs ELA comparison in memory (see forensic_tools.ela.compute_ela)
+    and returns an enhanced difference image, or the full result dict
+    (image, raw error array and statistics) when full_result is True.
+
+    Large scans are processed in strips within memory_budget and return a
+    reduced preview; full_resolution forces the tiled path and returns the
+    full-size heatmap instead.
     """
-    if Image is None or ImageChops is None:
+    if compute_ela is None:
         return None
     
     try:
-        # If source is a path, open it; otherwise assume it's already a PIL Image
-        if isinstance(image_source, str):
-            original_img = Image.open(image_source).convert("RGB")
+        width, height = image_size(image_source)
+        if full_resolution or width * height >= tiled_min_pixels:
+            result = compute_ela_tiled(image_source, quality=quality, scale=scale, normalize=normalize,
+                                       memory_budget=memory_budget, full_resolution=full_resolution)
         else:
-            original_img = image_source.convert("RGB")
-            
-        # Re-save at Q95 to create the reference baseline
-        buffer_q95 = BytesIO()
-        original_img.save(buffer_q95, format='JPEG', quality=95)
-        img_q95 = Image.open(buffer_q95).convert("RGB")
-        
-        # Calculate difference and enhance
-        ela_img = ImageChops.difference(original_img, img_q95)
-        scale_factor = 20
-        ela_result = ela_img.point(lambda i: i * scale_factor)
-        
-        return ela_result.convert("RGB")
+            result = compute_ela(image_source, quality=quality, scale=scale, normalize=normalize)
+        return result if full_result else result['image']
     except Exception as e:
         print(f"ELA Error: {e}")
+        if metrics: metrics.record_error('ela')
         return None
 
-# --- MOCK/HELPER FUNCTIONS (check_metadata, check_strings_with_offsets, convert_pdf_to_images) ---
+# --- MOCK/HELPER FUNCTIONS (check_metadata, check_strings_with_offsets) ---
 # ... (These functions remain identical to the previous script) ...
-def convert_pdf_to_images(pdf_path):
-    if not os.path.exists(pdf_path): return []
-    temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"mock_page_{secrets.token_hex(6)}.jpg")
-    try:
-        return [temp_path] 
-    except Exception: return []
-
-def check_metadata(file_path, file_extension):
+def check_metadata(file_path, file_extension, file_view=None):
+    """
+    file_view may be a memory-mapped view of the file (see forensic_tools.ingest.open_mapped);
+    when given, the file is parsed from it instead of being read into memory again.
+    Images are never decoded: EXIF, XMP, Photoshop resources, ICC and PNG text come from
+    the headers (see forensic_tools.image_metadata), and data['Metadata_Findings'] lists
+    the edit evidence found there.
+    """
     html = "<table style='width:100%; border-collapse: collapse; margin-top:10px;'>"
     data = {'TAMPER_ALERT': 'Low', 'Software': 'N/A', 'Width': 'N/A', 'Height': 'N/A'}
     
     if file_extension == 'pdf':
-        if not PdfReader:
+        scan = None
+        if scan_pdf_revisions:
+            try:
+                scan = scan_pdf_revisions(file_view) if file_view is not None else scan_pdf_file(file_path)
+            except Exception as e:
+                print(f"PDF revision scan failed: {e}")
+                if metrics: metrics.record_error('metadata')
+
+        # pypdf is only needed when the scanner could not reach the Info dictionary or the page size
+        needs_full_parse = not scan or not scan['revisions'] or scan['needs_full_parse'] or not scan['media_box']
+        pypdf = load_backend('pypdf') if needs_full_parse else None
+        if not scan and not pypdf:
             html += _create_row("Error", "pypdf library not installed. Cannot extract PDF metadata.")
             html += "</table>"
             return data, html
 
-        try:
-            reader = PdfReader(file_path)
-            metadata = reader.metadata
-            html += _create_section_header("PDF Document Properties")
-            html += "<tbody>"
-            pdf_data = {}
-            if metadata:
-                try:
-                    page = reader.pages[0]
-                    media_box = page.mediabox
+        pdf_data = {}
+        if scan and scan['revisions']:
+            pdf_data = dict(scan['revisions'][-1]['info'])
+            if scan['media_box']:
+                x0, y0, x1, y1 = scan['media_box']
+                data['Width'] = int(x1 - x0)
+                data['Height'] = int(y1 - y0)
+
+        if pypdf:
+            try:
+                reader = pypdf.PdfReader(MappedReader(file_view) if file_view else file_path)
+                if not pdf_data and reader.metadata:
+                    for key, value in reader.metadata.items():
+                        if key.startswith('/'): key = key[1:]
+                        pdf_data[key] = value
+                if data['Width'] == 'N/A':
+                    media_box = reader.pages[0].mediabox
                     data['Width'] = int(media_box[2])
                     data['Height'] = int(media_box[3])
-                except Exception: pass
-
-                for key, value in metadata.items():
-                    if key.startswith('/'): key = key[1:]
-                    pdf_data[key] = value
-
-                creator_software = str(pdf_data.get('Creator', '')) + str(pdf_data.get('Producer', ''))
-                if 'Photoshop' in creator_software or 'Illustrator' in creator_software or 'Canva' in creator_software: 
-                    data['TAMPER_ALERT'] = 'Medium'
-                
-                for key, value in pdf_data.items():
-                    html += _create_row(key, value)
-                    if key in ['Creator', 'Producer']: data['Software'] = str(value)
-            else: html += _create_row("Note", "No Document Properties Found.")
+            except Exception as e:
+                print(f"Error reading PDF metadata: {e}")
+                if metrics: metrics.record_error('metadata')
+                html += _create_row("Fatal Error", f"Failed to parse PDF metadata: {e}")
+
+        html += _create_section_header("PDF Document Properties")
+        html += "<tbody>"
+        if pdf_data:
+            creator_software = str(pdf_data.get('Creator', '')) + str(pdf_data.get('Producer', ''))
+            if 'Photoshop' in creator_software or 'Illustrator' in creator_software or 'Canva' in creator_software:
+                data['TAMPER_ALERT'] = 'Medium'
+
+            for key, value in pdf_data.items():
+                html += _create_row(key, escape(str(value)))
+                if key in ['Creator', 'Producer']:
+                    data['Software'] = str(value)
+                    data[key] = str(value)
+            if pdf_data.get('CreationDate'): data['Created'] = str(pdf_data['CreationDate'])
+            if pdf_data.get('ModDate'): data['Modified'] = str(pdf_data['ModDate'])
+        else: html += _create_row("Note", "No Document Properties Found.")
+        html += "</tbody>"
+
+        if scan and scan['revisions']:
+            revisions = scan['revisions']
+            data['Revisions'] = len(revisions)
+            data['Incremental_Updates'] = scan['incremental_updates']
+
+            # Editing tools anywhere in the save history, not only in the final Info dictionary
+            tools = editing_tools(scan['software'])
+            first = revisions[0]
+            original_tools = editing_tools(list(first['info'].values()) + list(first['xmp'].values()))
+            if tools and data['TAMPER_ALERT'] == 'Low':
+                data['TAMPER_ALERT'] = 'Medium'
+            if scan['incremental_updates'] and set(tools) - set(original_tools):
+                # The tool only shows up in a later save: the document was edited after it was created
+                data['TAMPER_ALERT'] = 'High'
+                data['Software'] = ', '.join(scan['software'])
+
+            html += _create_section_header("PDF Revisions (Incremental Saves)")
+            html += "<tbody>"
+            html += _create_row("PDF Version", scan['version'])
+            html += _create_row("Revisions", f"{len(revisions)}{' (linearized)' if scan['linearized'] else ''}")
+            html += _create_row("Incremental Updates", scan['incremental_updates'], highlight=scan['incremental_updates'] > 0)
+            if scan['error']:
+                html += _create_row("Structure Note", escape(scan['error']), highlight=True)
+            for revision in revisions:
+                details = f"{len(revision['objects'])} object(s), {revision['xref'] or 'no'} xref"
+                for key in ('Producer', 'Creator', 'ModDate'):
+                    if key in revision['info']:
+                        details += f"; {key}: {revision['info'][key]}"
+                if 'CreatorTool' in revision['xmp']:
+                    details += f"; XMP CreatorTool: {revision['xmp']['CreatorTool']}"
+                html += _create_row(f"Revision {revision['number']} (bytes {revision['start']:,}-{revision['end']:,})",
+                                    escape(details), highlight=revision['number'] > 1 and scan['incremental_updates'] > 0)
             html += "</tbody>"
-        except Exception as e:
-            print(f"Error reading PDF metadata: {e}")
-            html += _create_row("Fatal Error", f"Failed to parse PDF metadata: {e}")
     
 
     elif file_extension in ['jpg', 'jpeg', 'png']:
-        if not Image:
-            html += _create_row("Error", "Pillow library not installed. Cannot extract image metadata.")
+        if not read_image_metadata:
+            html += _create_row("Error", "Image metadata reader not available. Cannot extract image metadata.")
             html += "</table>"
             return data, html
 
         try:
-            with open(file_path, 'rb') as f: img_data_raw = f.read()
-            img = Image.open(BytesIO(img_data_raw))
-            
-            data['Width'] = img.width
-            data['Height'] = img.height
-            
+            # Header only: APPn segments / ancillary chunks up to the first image data, no decode
+            meta = read_image_metadata(file_view if file_view is not None else file_path, file_extension)
+            findings = metadata_findings(meta)
+            exif = meta['exif'] or {'ifd0': {}, 'exif': {}, 'gps': {}}
+            xmp = meta['xmp'] or {'properties': {}, 'history': [], 'document_ancestors': [], 'text_layers': []}
+            photoshop = meta['photoshop'] or {}
+
+            data['Width'] = meta['width'] or 'N/A'
+            data['Height'] = meta['height'] or 'N/A'
+            software = software_fields(meta)
+            if software:
+                # The editor, if any field names one, otherwise the first software field
+                data['Software'] = next((v for _, v in software if editing_software([v])), software[0][1])
+            if xmp['properties'].get('xmp:CreatorTool'): data['Creator'] = xmp['properties']['xmp:CreatorTool']
+            created = exif['exif'].get('DateTimeOriginal') or xmp['properties'].get('xmp:CreateDate')
+            modified = exif['ifd0'].get('DateTime') or xmp['properties'].get('xmp:ModifyDate') or meta['png_time']
+            if created: data['Created'] = str(created)
+            if modified: data['Modified'] = str(modified)
+            if findings:
+                data['TAMPER_ALERT'] = 'High' if findings[0]['severity'] == 'high' else 'Medium'
+            data['Metadata_Findings'] = findings
+
             html += _create_section_header("File")
             html += "<tbody>"
-            html += _create_row("File Type", img.format)
+            html += _create_row("File Type", meta['format'] or 'Unknown')
             html += _create_row("Image Width", data['Width'])
             html += _create_row("Image Height", data['Height'])
+            html += _create_row("Metadata Segments", escape(' '.join(meta['segments']) or 'None'))
+            html += _create_row("Header Bytes Read", f"{meta['bytes_read']:,}")
+            if meta['error']:
+                html += _create_row("Structure Note", escape(meta['error']), highlight=True)
             html += "</tbody>"
 
-            exif_raw = img.getexif()
-            if exif_raw and TAGS:
+            if exif['ifd0'] or exif['exif'] or exif['gps']:
                 html += _create_section_header("EXIF")
                 html += "<tbody>"
-                for tag_id, value in exif_raw.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    highlight = False
-                    if tag == 'Software':
-                        data['Software'] = str(value)
-                        if 'Adobe' in str(value) or 'Photoshop' in str(value):
-                            data['TAMPER_ALERT'] = 'High'
-                            highlight = True
-                    html += _create_row(tag, value, highlight=highlight)
+                for group in ('ifd0', 'exif', 'gps'):
+                    for tag, value in exif[group].items():
+                        highlight = tag == 'Software' and bool(editing_software([str(value)]))
+                        html += _create_row(tag, escape(str(value)), highlight=highlight)
+                html += "</tbody>"
+
+            if xmp['properties']:
+                html += _create_section_header("XMP")
+                html += "<tbody>"
+                for name, value in xmp['properties'].items():
+                    highlight = name == 'xmp:CreatorTool' and bool(editing_software([value]))
+                    html += _create_row(escape(name), escape(value[:500]), highlight=highlight)
+                html += "</tbody>"
+
+            if xmp['history'] or xmp['document_ancestors'] or xmp['text_layers']:
+                html += _create_section_header("XMP Edit History")
+                html += "<tbody>"
+                for n, event in enumerate(xmp['history'], 1):
+                    details = ', '.join(f"{key}: {event[key]}" for key in ('when', 'softwareAgent', 'changed', 'instanceID')
+                                        if event.get(key))
+                    edited = event.get('action', '').lower() != 'created' and bool(editing_software([event.get('softwareAgent', '')]))
+                    html += _create_row(f"{n}. {escape(event.get('action', 'event'))}", escape(details), highlight=edited)
+                for ancestor in xmp['document_ancestors'][:20]:
+                    html += _create_row("Placed Document", escape(ancestor), highlight=True)
+                for layer in xmp['text_layers']:
+                    html += _create_row(f"Text Layer {escape(layer['name'])}", escape(layer['text']), highlight=True)
+                html += "</tbody>"
+
+            if photoshop:
+                html += _create_section_header("Photoshop Resources / IPTC")
+                html += "<tbody>"
+                if photoshop['writer']:
+                    html += _create_row("Writer", escape(f"{photoshop['writer']} (reader: {photoshop['reader'] or 'N/A'})"),
+                                        highlight=bool(editing_software([photoshop['writer']])))
+                if photoshop['resources']:
+                    html += _create_row("Resources", escape(', '.join(photoshop['resources'])))
+                for name, value in photoshop['iptc'].items():
+                    html += _create_row(f"IPTC {name}", escape(value))
+                html += "</tbody>"
+
+            if meta['icc']:
+                html += _create_section_header("ICC Profile")
+                html += "<tbody>"
+                for key, value in meta['icc'].items():
+                    if value:
+                        html += _create_row(key.replace('_', ' ').title(), escape(str(value)))
+                html += "</tbody>"
+
+            if meta['text'] or meta['comments'] or meta['png_time'] or meta['dpi']:
+                html += _create_section_header("Text Chunks / Comments")
+                html += "<tbody>"
+                for keyword, value in meta['text'].items():
+                    html += _create_row(escape(keyword), escape(value[:500]), highlight=keyword == 'Software' and bool(editing_software([value])))
+                for comment in meta['comments']:
+                    html += _create_row("Comment", escape(comment))
+                if meta['png_time']: html += _create_row("Last Modified (tIME)", meta['png_time'])
+                if meta['dpi']: html += _create_row("DPI (pHYs)", f"{meta['dpi'][0]} x {meta['dpi'][1]}")
+                html += "</tbody>"
+
+            if findings:
+                html += _create_section_header("Metadata Findings")
+                html += "<tbody>"
+                for finding in findings:
+                    html += _create_row(finding['severity'].title(), escape(finding['message']), highlight=finding['severity'] == 'high')
                 html += "</tbody>"
         except Exception as e:
             print(f"Error reading image file metadata: {e}")
-            html += f"<p style='color:red;'>Fatal Error reading image metadata: {e}</p>"
+            if metrics: metrics.record_error('metadata')
+            html += f"<p style='color:red;'>Fatal Error reading image metadata: {escape(str(e))}</p>"
         
     else:
         html += _create_row("Error", f"Unsupported file extension: {file_extension}")
@@ -187,115 +456,534 @@ def check_metadata(file_path, file_extension):
     html += "</table>"
     return data, html
 
-def check_strings_with_offsets(file_path):
-    file_extension = file_path.rsplit('.', 1)[-1].lower()
-    
-    if file_extension == 'pdf':
-        output_lines = [
-            "PDF Content Strings (First 10000 bytes) ---", 
-            "%PDF-1.4", 
-            "1 0 obj", 
-            "/Type /Catalog", 
-            "/Creator (Canva)",
-            "/Producer (Canva)",
-            "/Title (FAKE!!!!!!)",
-            "endobj", 
-            "trailer"
-        ]
+def render_jpeg_analysis(jpeg_info):
+    """
+    Renders the JPEG Analysis tab from the header-only marker parse: quality
+    estimate, encoder signature, recompression indicators and the quantization tables.
+    """
+    if not jpeg_info['quant_tables']:
+        return f"""
+            <p><strong>Detected Quality:</strong> N/A (no quantization tables found)</p>
+            <p><strong>Structure:</strong> {escape(jpeg_info['error'] or 'No JPEG frame header found.')}</p>
+        """
+
+    quality = jpeg_info['quality']
+    if jpeg_info['quality_exact']:
+        quality_label = f"{quality} (exact match with the standard libjpeg tables)"
     else:
-        output_lines = [
-            "Binary Strings Analysis (First 1000 bytes) ---",
-            "0x0000000: FF D8 FF E0 (JPEG SOI)", 
-            "0x0000014: Exif (Found signature)", 
-            "0x00000C0: Software: Adobe Photoshop CC 2024 (Windows)",
-            "0x0000850: URL: http://fakeimage.com/source.jpg",
-            "0x00009D4: JPEG SOS"
-        ]
-    
-    html_output = "<pre class='strings-block'>"
-    html_output += '\n'.join(output_lines)
-    html_output += "\nEnd of File."
+        quality_label = f"~{quality} (estimated; chrominance ~{jpeg_info['chroma_quality'] or 'N/A'})"
+
+    indicators = jpeg_info['indicators']
+    likelihood = "HIGH" if len(indicators) >= 2 else "MEDIUM" if indicators else "LOW"
+    frame = jpeg_info['frame'] or {}
+
+    html_output = f"""
+        <p><strong>Detected Quality:</strong> {quality_label}</p>
+        <p><strong>Encoder Signature:</strong> {escape(jpeg_info['encoder'])}</p>
+        <p><strong>Frame:</strong> {escape(frame.get('type', 'N/A'))}, {frame.get('width', 'N/A')}x{frame.get('height', 'N/A')}, chroma subsampling {jpeg_info['subsampling']}</p>
+        <p><strong>Segments:</strong> {escape(' '.join(seg['name'] for seg in jpeg_info['segments']))}</p>
+        <p><strong>Recompression Likelihood:</strong> {likelihood}</p>
+    """
+    if indicators:
+        html_output += "<ul>" + ''.join(f"<li>{escape(i)}</li>" for i in indicators) + "</ul>"
+    if jpeg_info['notes']:
+        html_output += "<p><strong>Notes (not counted):</strong></p><ul>" + ''.join(f"<li>{escape(n)}</li>" for n in jpeg_info['notes']) + "</ul>"
+    if jpeg_info['error']:
+        html_output += f"<p style='color:red;'><strong>Structure Error:</strong> {escape(jpeg_info['error'])}</p>"
+    for table_id, table in sorted(jpeg_info['quant_tables'].items()):
+        name = "Luminance" if table_id == 0 else "Chrominance" if table_id == 1 else f"Table {table_id}"
+        html_output += f"<p><strong>Quantization Table {table_id} ({name}):</strong></p>"
+        html_output += f"<pre class='code-block'>{format_quant_table(table['values'])}</pre>"
+    return html_output
+
+def format_string_line(item, file_sha256=None):
+    """
+    One strings-view line: hex offset, text and any flagged keywords (HTML-escaped).
+    With file_sha256 the offset links into the hex view of the stored upload.
+    """
+    offset_label = f"0x{item['offset']:08X}"
+    if file_sha256:
+        hex_url = url_for('forensics.hex_view_page', file_sha256=file_sha256, offset=item['offset'])
+        offset_label = f"<a href='#' class='hex-jump' data-url='{hex_url}' data-offset='{item['offset']}'>{offset_label}</a>"
+    line = f"{offset_label}: {escape(item['text'])}"
+    if item['encoding'] != 'ascii':
+        line += f" <span class='str-enc'>[{item['encoding']}]</span>"
+    if item['keywords']:
+        line = f"<mark title='{escape(', '.join(item['keywords']))}'>{line}</mark>"
+    return line
+
+def check_strings_with_offsets(file_path, file_sha256=None):
+    """
+    Extracts the first page of printable strings (with byte offsets) from the file.
+    Further pages are fetched lazily from /strings/<sha256>. Returns (html, flagged_keywords).
+    """
+    if extract_strings is None:
+        return "<pre class='strings-block'>String extraction is unavailable on this server.</pre>", []
+
+    try:
+        page = extract_strings(file_path, limit=current_app.config['STRINGS_PAGE_SIZE'],
+                               min_length=current_app.config['STRINGS_MIN_LENGTH'],
+                               keywords=current_app.config['STRINGS_KEYWORDS'])
+    except Exception as e:
+        print(f"Strings extraction failed: {e}")
+        if metrics: metrics.record_error('strings')
+        return f"<pre class='strings-block'>Strings extraction failed: {escape(str(e))}</pre>", []
+
+    flagged = sorted({k for item in page['strings'] for k in item['keywords']})
+
+    html_output = f"<p>File size: {page['file_size']:,} bytes. Highlighted lines match editor, XMP history or URL keywords.</p>"
+    html_output += "<pre class='strings-block' id='strings-lines'>"
+    html_output += '\n'.join(format_string_line(item, file_sha256) for item in page['strings'])
+    if page['next_offset'] is None:
+        html_output += "\nEnd of File."
     html_output += "</pre>"
+    if page['next_offset'] is not None and file_sha256:
+        more_url = url_for('forensics.strings_page', file_sha256=file_sha256, offset=page['next_offset'])
+        html_output += f"<button type='button' class='nav-btn' id='strings-more' data-url='{more_url}'>Load more strings</button>"
 
-    return html_output 
+    return html_output, flagged
+
+def _hex_page_json(file_path, file_sha256, offset=0, rows=None):
+    page = hex_page(file_path, offset=offset, rows=rows or current_app.config['HEX_ROWS_PER_PAGE'])
+    page['lines'] = [f"<span id='hex-row-{row_offset}'>{line}</span>" for row_offset, line in page.pop('rows')]
+    for direction in ('prev', 'next'):
+        target = page[f'{direction}_offset']
+        page[f'{direction}_url'] = url_for('forensics.hex_view_page', file_sha256=file_sha256, offset=target, rows=rows) \
+            if target is not None and file_sha256 else None
+    return page
+
+def render_hex_view(file_path, file_sha256=None):
+    """Renders the first page of the hex view; later pages load lazily from /hex/<sha256>."""
+    if hex_page is None or not file_path:
+        return "<pre class='code-block'>Hex view is unavailable.</pre>"
+    try:
+        page = _hex_page_json(file_path, file_sha256)
+    except Exception as e:
+        print(f"Hex view failed: {e}")
+        return f"<pre class='code-block'>Hex view failed: {escape(str(e))}</pre>"
+
+    html_output = "<div class='hex-nav'>"
+    html_output += f"<button type='button' class='nav-btn hex-page' id='hex-prev' data-url='{page['prev_url'] or ''}' {'disabled' if not page['prev_url'] else ''}>&larr; Previous</button>"
+    html_output += f"<button type='button' class='nav-btn hex-page' id='hex-next' data-url='{page['next_url'] or ''}' {'disabled' if not page['next_url'] else ''}>Next &rarr;</button>"
+    if file_sha256:
+        base_url = url_for('forensics.hex_view_page', file_sha256=file_sha256)
+        html_output += f"<form id='hex-goto' data-url='{base_url}'><input name='offset' placeholder='Offset (e.g. 0x1F40)' class='hex-offset'> <button type='submit' class='nav-btn'>Go</button></form>"
+    html_output += "</div>"
+    html_output += "<pre class='code-block hex-block' id='hex-lines'>" + '\n'.join(page['lines']) + "</pre>"
+    html_output += f"<p>Displayed: Hex dump of the file, {BYTES_PER_ROW} bytes per row with the ASCII gutter on the right ({page['file_size']:,} bytes total). Offsets in the Strings tab jump here.</p>"
+    return html_output
 # ------------------------------------------------
 
 # --- Flask Setup and Routes ---
-app = Flask(__name__)
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-STATIC_FOLDER = r'C:\xampp\htdocs\FakeDocChecker\static' 
+bp = Blueprint('forensics', __name__)
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'pdf'}
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(STATIC_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['STATIC_FOLDER'] = STATIC_FOLDER
+def create_app(config=None):
+    """
+    Application factory. Settings come from the defaults below, then from
+    JEJAKPALSU_* environment variables (e.g. JEJAKPALSU_STATIC_FOLDER=/srv/static),
+    then from config. Folders are created here rather than at import time,
+    and no optional backend is imported until a request needs it.
+    """
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
+    app.config['STATIC_FOLDER'] = os.path.join(app.root_path, 'static')
+
+    # Result cache: repeat uploads of the same document are served from here.
+    app.config['CACHE_FOLDER'] = os.path.join(os.getcwd(), 'cache')
+    app.config['CACHE_MAX_ENTRIES'] = 128
+    app.config['CACHE_MAX_BYTES'] = 256 * 1024 * 1024
+
+    # PDF rasterization limits: keep multi-hundred-page statements inside a memory budget.
+    app.config['PDF_DPI'] = 150
+    app.config['PDF_MAX_DPI'] = 200
+    app.config['PDF_MAX_PAGES'] = 20
+    app.config['PDF_ELA_WORKERS'] = os.cpu_count() or 1
+
+    # Admission control: each analysis's peak memory is estimated from the file header. Analyses over
+    # ADMISSION_MAX_JOB_BYTES or MAX_IMAGE_PIXELS (per PDF page) are downscaled (JPEG draft decoding, PDF
+    # pages down to PDF_MIN_DPI) or rejected. Admitted analyses of every process share MEMORY_BUDGET bytes
+    # through ADMISSION_DB, waiting up to ADMISSION_TIMEOUT seconds for room.
+    app.config['ADMISSION_DB'] = os.path.join(os.getcwd(), 'admission.sqlite3')
+    app.config['MEMORY_BUDGET'] = 2 * 1024 * 1024 * 1024
+    app.config['ADMISSION_MAX_JOB_BYTES'] = 1024 * 1024 * 1024
+    app.config['ADMISSION_TIMEOUT'] = 60
+    app.config['MAX_IMAGE_PIXELS'] = 100_000_000
+    app.config['PDF_MIN_DPI'] = 72
+
+    # Image ELA: scans of at least ELA_TILED_MIN_PIXELS are processed in strips within ELA_MEMORY_BUDGET bytes.
+    app.config['ELA_TILED_MIN_PIXELS'] = ELA_TILED_MIN_PIXELS
+    app.config['ELA_MEMORY_BUDGET'] = ELA_MEMORY_BUDGET
+
+    # Copy-move detection: working image size, smallest reported region (in blocks) and a per-image time budget.
+    app.config['COPY_MOVE_MAX_SIZE'] = 1024
+    app.config['COPY_MOVE_MIN_REGION'] = 500
+    app.config['COPY_MOVE_TIME_BUDGET'] = 5.0
+
+    # Analysis pipeline: independent analyzers of one file run on up to PIPELINE_WORKERS threads (0 runs them in turn).
+    app.config['PIPELINE_WORKERS'] = min(4, os.cpu_count() or 1)
+
+    # Noise analysis: block size of the noise map and the connected region of inconsistent blocks that raises an alert.
+    app.config['NOISE_BLOCK_SIZE'] = 24
+    app.config['NOISE_MIN_REGION'] = 6
+
+    # JPEG ghosts: the ELA sweep's re-save qualities, threads encoding them, the visualization
+    # ('stack', 'animation' or None), the largest image swept and the share of ghost blocks that raises an alert.
+    app.config['GHOST_QUALITIES'] = tuple(range(50, 101, 5))
+    app.config['GHOST_BLOCK_SIZE'] = 16
+    app.config['GHOST_WORKERS'] = min(4, os.cpu_count() or 1)
+    app.config['GHOST_VISUALIZATION'] = 'stack'
+    app.config['GHOST_MAX_PIXELS'] = 40_000_000
+    app.config['GHOST_ALERT_PERCENT'] = 1.0
+
+    # Strings view: pages are bounded so huge files never build one giant <pre>.
+    app.config['STRINGS_PAGE_SIZE'] = 200
+    app.config['STRINGS_MAX_PAGE_SIZE'] = 1000
+    app.config['STRINGS_MIN_LENGTH'] = 4
+    app.config['STRINGS_KEYWORDS'] = DEFAULT_KEYWORDS
+
+    # Hex view: rows per page (each row is 64 bytes) and the most a client may request.
+    app.config['HEX_ROWS_PER_PAGE'] = 32
+    app.config['HEX_MAX_ROWS'] = 256
+
+    # Background analysis jobs: a local SQLite queue drained by worker processes.
+    app.config['JOBS_DB'] = os.path.join(os.getcwd(), 'jobs.sqlite3')
+    app.config['JOB_WORKERS'] = 2
+    app.config['JOB_QUEUE_DEPTH'] = 32
+    app.config['JOB_RETRY_AFTER'] = 5
+    # A running job is requeued only once its worker process is gone or has not renewed it for this long
+    app.config['JOB_LEASE_SECONDS'] = 120
+    # Finished and failed jobs (and their results) are deleted once unchanged for this long
+    app.config['JOB_TTL'] = 24 * 3600
+
+    # Report downloads: results are kept server-side by id, PDFs rendered in a worker pool and cached.
+    app.config['RESULTS_FOLDER'] = os.path.join(os.getcwd(), 'results')
+    app.config['RESULTS_MAX_BYTES'] = 256 * 1024 * 1024
+    app.config['REPORT_CACHE_FOLDER'] = os.path.join(os.getcwd(), 'reports')
+    app.config['REPORT_CACHE_MAX_BYTES'] = 256 * 1024 * 1024
+    app.config['REPORT_WORKERS'] = 1
+    app.config['REPORT_TIMEOUT'] = 60
+
+    # Analysis images: kept under ARTIFACT_MAX_BYTES (LRU) and deleted after ARTIFACT_TTL seconds unused.
+    # ARTIFACT_FOLDER defaults to <STATIC_FOLDER>/artifacts; responses are cached for ARTIFACT_MAX_AGE seconds.
+    app.config['ARTIFACT_FOLDER'] = None
+    app.config['ARTIFACT_MAX_BYTES'] = 512 * 1024 * 1024
+    app.config['ARTIFACT_TTL'] = 7 * 24 * 3600
+    app.config['ARTIFACT_PREVIEW_SIZE'] = 1024
+    app.config['ARTIFACT_MAX_AGE'] = 365 * 24 * 3600
+
+    # Similar submissions: perceptual hashes of every image/PDF page, matched within PHASH_RADIUS bits (max 15).
+    app.config['PHASH_DB'] = os.path.join(os.getcwd(), 'phash.sqlite3')
+    app.config['PHASH_RADIUS'] = 10
+    app.config['PHASH_MAX_MATCHES'] = 10
+    app.config['PHASH_BULK_MAX_QUERIES'] = 500
+
+    # Evidence store: one indexed row per analysis, queried through /evidence and /evidence/export.
+    app.config['EVIDENCE_DB'] = os.path.join(os.getcwd(), 'evidence.sqlite3')
+    app.config['EVIDENCE_PAGE_SIZE'] = 50
+    app.config['EVIDENCE_MAX_PAGE_SIZE'] = 500
+
+    # Metrics: job workers leave snapshots in METRICS_FOLDER for /metrics; results carry their stage timings.
+    app.config['METRICS_FOLDER'] = os.path.join(os.getcwd(), 'metrics')
+    app.config['RESULT_TIMINGS'] = True
+
+    app.config.from_prefixed_env('JEJAKPALSU')
+    if config:
+        app.config.update(config)
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['STATIC_FOLDER'], exist_ok=True)
+    # Page assets are served from STATIC_FOLDER; analysis images have their own route (see artifact)
+    app.static_folder = app.config['STATIC_FOLDER']
+    if not app.config['ARTIFACT_FOLDER']:
+        app.config['ARTIFACT_FOLDER'] = os.path.join(app.config['STATIC_FOLDER'], 'artifacts')
+
+    analysis_cache = None
+    if AnalysisCache:
+        analysis_cache = AnalysisCache(app.config['CACHE_FOLDER'],
+                                       max_entries=app.config['CACHE_MAX_ENTRIES'],
+                                       max_disk_bytes=app.config['CACHE_MAX_BYTES'])
+    artifact_store = None
+    if ArtifactStore:
+        artifact_store = ArtifactStore(app.config['ARTIFACT_FOLDER'],
+                                       max_bytes=app.config['ARTIFACT_MAX_BYTES'],
+                                       ttl=app.config['ARTIFACT_TTL'],
+                                       preview_max_size=app.config['ARTIFACT_PREVIEW_SIZE'])
+    result_store = None
+    if ResultStore:
+        result_store = ResultStore(app.config['RESULTS_FOLDER'], max_disk_bytes=app.config['RESULTS_MAX_BYTES'])
+    app.extensions['forensics'] = {
+        'config': dict(config or {}),
+        'analysis_cache': analysis_cache,
+        'result_store': result_store,
+        'artifact_store': artifact_store,
+        'hash_index': None,
+        'evidence_store': None,
+        'memory_budget': None,
+        'report_renderer': None,
+        'job_queue': None,
+        'job_workers': None,
+        'lock': threading.Lock(),
+    }
+    app.register_blueprint(bp)
+    return app
+
+def _state():
+    return current_app.extensions['forensics']
+
+def store_result(results):
+    """Saves results in the result store and records their id as results['result_id'] for report downloads."""
+    result_store = _state()['result_store']
+    if result_store:
+        results['result_id'] = result_store.save(results)
+    return results
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def run_forensic_analysis_web(file_path, original_filename):
-    file_extension = original_filename.rsplit('.', 1)[1].lower()
-    ela_result_img = None
-    ela_filename = "N/A"
-    
-    # 1. HANDLE PDF -> IMAGE CONVERSION FOR ELA
-    if file_extension == 'pdf':
-        try:
-            # Convert only the first page to a PIL Image for analysis
-            # Note: poppler_path may be needed if not in System PATH
-            pages = convert_from_path(file_path, first_page=1, last_page=1)
-            if pages:
-                ela_result_img = perform_ela(pages[0])
-        except Exception as e:
-            print(f"PDF to Image conversion for ELA failed: {e}")
-    
-    # 2. HANDLE STANDARD IMAGES FOR ELA
-    elif file_extension in ['jpg', 'jpeg']:
-        ela_result_img = perform_ela(file_path)
-
-    # 3. SAVE ELA RESULT IF GENERATED
-    if ela_result_img:
-        ela_filename = f"ELA_{secrets.token_hex(6)}.jpg"
-        ela_static_path = os.path.join(app.config['STATIC_FOLDER'], ela_filename)
-        ela_result_img.save(ela_static_path, format='JPEG')
-
-    # 4. METADATA & STRINGS (Keep your existing logic)
-    metadata_data, metadata_html = check_metadata(file_path, file_extension)
-    strings_offsets_html = check_strings_with_offsets(file_path)
-    
-    with open(file_path, "rb") as f:
-        file_bytes = f.read()
-        file_sha256 = hashlib.sha256(file_bytes).hexdigest()
+def parse_page_range(page_spec):
+    """
+    Parses '3', '2-5', '2-' or '-5' into a (first_page, last_page) tuple; blank
+    means all pages. Raises ValueError for anything else, including inverted
+    ranges such as '5-2', so the request can be refused instead of analyzing nothing.
+    """
+    page_spec = (page_spec or '').strip()
+    if not page_spec:
+        return 1, None
+    first, sep, last = page_spec.partition('-')
+    try:
+        first_page = int(first) if first.strip() else 1
+        last_page = int(last) if last.strip() else (None if sep else first_page)
+    except ValueError:
+        raise ValueError(f"Invalid page range {page_spec!r}: use a page number or a range such as 2-5.") from None
+    if first_page < 1 or (last_page is not None and last_page < first_page):
+        raise ValueError(f"Invalid page range {page_spec!r}: pages start at 1 and the first page cannot come after the last.")
+    return first_page, last_page
 
-    # 5. CONCLUSION LOGIC
-    tamper_score = 3
-    if metadata_data['TAMPER_ALERT'] == 'High': tamper_score += 4
-    elif metadata_data['TAMPER_ALERT'] == 'Medium': tamper_score += 2
-    
-    tamper_percentage = min(100, (tamper_score / 10) * 100)
-    conclusion = "TAMPERING LIKELY" if tamper_score >= 5 else "UNLIKELY"
+def fingerprint_file(file_path, chunk_size=1024 * 1024):
+    """Fallback for files that did not come through ingest_upload: one read, all digests."""
+    if ingest_upload:
+        return ingest_file(file_path, chunk_size)
+    digests = {'sha256': hashlib.sha256(), 'sha1': hashlib.sha1(), 'md5': hashlib.md5()}
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            for digest in digests.values():
+                digest.update(chunk)
+            size += len(chunk)
+    info = {name: digest.hexdigest() for name, digest in digests.items()}
+    info.update(path=file_path, size=size, file_type=None, signature_status='N/A', header_hex='')
+    return info
 
-    # 6. ASSEMBLE RESULTS
-    return {
-        'original_filename': original_filename,
-        'ela_path': url_for('static', filename=ela_filename) if ela_filename != "N/A" else "N/A",
-        'conclusion': conclusion,
-        'tamper_percentage': f"{tamper_percentage:.1f}",
-        'evidence': [
-            f"File Type: {file_extension.upper()}",
-            f"ELA Processed: {'Yes' if ela_filename != 'N/A' else 'No'}",
-            f"Metadata Alert: {metadata_data['TAMPER_ALERT']}"
-        ],
-        'metadata': metadata_html,
-        'strings': strings_offsets_html,
-        'general_summary': f"<p><strong>Type:</strong> {file_extension.upper()}</p><p><strong>Status:</strong> Analysis Complete</p>",
-        'digest': {'SHA-256': file_sha256, 'Hash_Note': 'Cryptographic signatures verified.'},
-        'source_code': "<pre>Binary header check complete.</pre>",
-        'ela_description': "ELA highlights areas that have been re-saved or modified. For PDFs, we convert the page to an image first to visualize compression inconsistencies."
-    }
+def store_upload(file_path, file_sha256, file_extension):
+    """
+    Keeps the analyzed upload under its content hash (<sha256>.<ext>) so the strings
+    view can page through it later. Duplicate uploads are discarded.
+    """
+    stored_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{file_sha256}.{file_extension}")
+    try:
+        if os.path.exists(stored_path):
+            os.remove(file_path)
+        else:
+            os.replace(file_path, stored_path)
+    except OSError as e:
+        print(f"Error storing upload: {e}")
+    return stored_path
+
+def stored_upload_path(file_sha256):
+    """Finds a stored upload by its SHA-256, or returns None."""
+    if not re.fullmatch(r'[0-9a-f]{64}', file_sha256 or ''):
+        return None
+    for file_extension in ALLOWED_EXTENSIONS:
+        stored_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{file_sha256}.{file_extension}")
+        if os.path.exists(stored_path):
+            return stored_path
+    return None
+
+def ela_artifact_name(file_sha256, suffix="", prefix="ELA", ext="jpg"):
+    """ELA images are named after the file's hash, so re-analysis never writes a duplicate."""
+    if AnalysisCache and file_sha256:
+        return artifact_name(file_sha256, prefix=prefix, suffix=suffix, ext=ext)
+    return f"{prefix}_{secrets.token_hex(6)}{suffix}.{ext}"
+
+def artifact_url(name):
+    return url_for('forensics.artifact', name=name)
+
+def artifacts_present(results):
+    """False when an artifact a cached result links to has been evicted from the artifact store."""
+    artifact_store = _state()['artifact_store']
+    if artifact_store is None:
+        return True
+    urls = [results.get(key) for key in ('ela_path', 'ela_preview_path', 'noise_path', 'copy_move_path', 'ghost_path')]
+    urls += [page.get('ela_path') for page in results.get('pdf_pages') or []]
+    return all(artifact_store.exists(os.path.basename(url)) for url in urls if url and url != "N/A")
+
+def run_pdf_page_ela(file_path, first_page=1, last_page=None, file_sha256=None, dpi=None):
+    """
+    Runs ELA over every requested PDF page in parallel. Each page's ELA image is
+    written to the artifact store as soon as its worker finishes, so only one
+    encoded page is held in memory at a time. dpi overrides PDF_DPI (e.g. when
+    admission control lowered it). Returns the per-page results in page order.
+    """
+    pdf_handler = load_backend('pdf2image')
+    artifact_store = _state()['artifact_store']
+    if pdf_handler is None or artifact_store is None:
+        return []
+
+    pages = []
+    try:
+        for page in pdf_handler.iter_pdf_page_ela(file_path, first_page=first_page, last_page=last_page,
+                                                  dpi=dpi or current_app.config['PDF_DPI'],
+                                                  max_dpi=current_app.config['PDF_MAX_DPI'],
+                                                  max_pages=current_app.config['PDF_MAX_PAGES'],
+                                                  workers=current_app.config['PDF_ELA_WORKERS'],
+                                                  quality=ELA_QUALITY, scale=ELA_SCALE, normalize=ELA_NORMALIZE):
+            if 'error' in page:
+                if metrics: metrics.record_error('pages')
+                pages.append({'page': page['page'], 'ela_path': "N/A", 'score': None, 'error': page['error']})
+                continue
 
-@app.route('/', methods=['GET', 'POST'])
+            if metrics: metrics.record_megapixels(page['width'], page['height'])
+            ela_filename = ela_artifact_name(file_sha256, suffix=f"_p{page['page']}")
+            saved = artifact_store.save_bytes(ela_filename, page['ela_jpeg'])
+            pages.append({
+                'page': page['page'],
+                'ela_path': artifact_url(ela_filename) if saved else "N/A",
+                'score': page['score'],
+                'width': page['width'],
+                'height': page['height'],
+                'dpi': page['dpi'],
+                'hashes': to_hex(page['hashes']) if 'hashes' in page and HashIndex else None,
+            })
+    except Exception as e:
+        print(f"PDF to Image conversion for ELA failed: {e}")
+        if metrics: metrics.record_error('pages')
+
+    return sorted(pages, key=lambda p: p['page'])
+
+def perform_noise_analysis(image_source, file_sha256=None):
+    """
+    Noise-inconsistency map (see forensic_tools.noise.noise_map) of an image
+    source; pass the PIL Image already decoded for ELA to avoid a second decode.
+    Saves the heatmap to the artifact store and returns (result, heatmap_url),
+    or (None, "N/A") when the analysis could not run.
+    """
+    artifact_store = _state()['artifact_store']
+    if noise_map is None or artifact_store is None:
+        return None, "N/A"
+    try:
+        result = noise_map(image_source, block_size=current_app.config['NOISE_BLOCK_SIZE'])
+        heatmap = result.pop('image')
+        if heatmap is None:
+            return result, "N/A"
+        heatmap_filename = ela_artifact_name(file_sha256, prefix="NOISE")
+        if not artifact_store.save_image(heatmap_filename, heatmap):
+            return result, "N/A"
+        return result, artifact_url(heatmap_filename)
+    except Exception as e:
+        print(f"Noise analysis failed: {e}")
+        if metrics: metrics.record_error('noise')
+        return None, "N/A"
+
+def perform_ghost_analysis(image_source, file_sha256=None, primary_quality=None):
+    """
+    Multi-quality ELA sweep and JPEG ghost search (see forensic_tools.ghost.ghost_sweep).
+    Saves the sweep visualization to the artifact store and returns (summary, visualization_url),
+    or (None, "N/A") when the analysis could not run.
+    """
+    artifact_store = _state()['artifact_store']
+    if ghost_sweep is None or artifact_store is None:
+        return None, "N/A"
+    config = current_app.config
+    try:
+        result = ghost_sweep(image_source, qualities=config['GHOST_QUALITIES'], block_size=config['GHOST_BLOCK_SIZE'],
+                             primary_quality=primary_quality, workers=config['GHOST_WORKERS'],
+                             visualize=config['GHOST_VISUALIZATION'], max_pixels=config['GHOST_MAX_PIXELS'])
+        stack, animation = result.pop('image'), result.pop('animation')
+        if animation:
+            name = ela_artifact_name(file_sha256, prefix="GHOST", ext="webp")
+            saved = artifact_store.save_bytes(name, animation)
+        elif stack:
+            name = ela_artifact_name(file_sha256, prefix="GHOST")
+            saved = artifact_store.save_image(name, stack, quality=90)
+        else:
+            return result, "N/A"
+        return result, artifact_url(name) if saved else "N/A"
+    except Exception as e:
+        print(f"JPEG ghost analysis failed: {e}")
+        if metrics: metrics.record_error('ghost')
+        return None, "N/A"
+
+def run_copy_move(image_source, file_sha256=None, overlay_source=None):
+    """
+    Copy-move (clone) detection, stopped after COPY_MOVE_TIME_BUDGET seconds so one
+    large image cannot stall a worker. Saves the overlay image to the artifact store,
+    drawn over overlay_source (e.g. the colour image when image_source is grayscale).
+    Returns (detection, overlay_url); detection is None when the check could not run.
+    """
+    artifact_store = _state()['artifact_store']
+    if detect_copy_move is None or artifact_store is None:
+        return None, "N/A"
+    try:
+        detection = detect_copy_move(image_source, max_size=current_app.config['COPY_MOVE_MAX_SIZE'],
+                                     min_region=current_app.config['COPY_MOVE_MIN_REGION'],
+                                     time_budget=current_app.config['COPY_MOVE_TIME_BUDGET'])
+        overlay_filename = ela_artifact_name(file_sha256, prefix="CLONE")
+        saved = artifact_store.exists(overlay_filename)
+        if not saved:
+            overlay_source = image_source if overlay_source is None else overlay_source
+            if hasattr(overlay_source, 'seek'):
+                overlay_source.seek(0)
+            overlay = render_overlay(overlay_source, detection, max_size=current_app.config['COPY_MOVE_MAX_SIZE'])
+            saved = artifact_store.save_image(overlay_filename, overlay)
+        del detection['mask']
+        return detection, artifact_url(overlay_filename) if saved else "N/A"
+    except Exception as e:
+        print(f"Copy-move detection failed: {e}")
+        if metrics: metrics.record_error('copy_move')
+        return None, "N/A"
+
+def render_copy_move(detection):
+    """Renders the matched region pairs of a copy-move detection as an HTML table."""
+    if detection is None:
+        return "<p>Copy-move detection is unavailable for this file.</p>"
+
+    html_output = f"<p><strong>Textured blocks compared:</strong> {detection['blocks']:,} in {detection['elapsed']} s"
+    if detection['timed_out']:
+        html_output += " <span style='color:#d29922;'>(time budget reached; results are partial)</span>"
+    html_output += "</p>"
+    if not detection['matches']:
+        return html_output + "<p>No duplicated regions were found.</p>"
+
+    html_output += "<table style='width:100%; border-collapse: collapse; margin-top:10px;'>"
+    html_output += _create_section_header("Duplicated Regions (x0, y0, x1, y1)")
+    html_output += "<tbody>"
+    for n, match in enumerate(detection['matches'], start=1):
+        html_output += _create_row(f"Region {n}: {match['blocks']:,} blocks, shift {match['shift']}",
+                                   f"{match['source']} &rarr; {match['target']}", highlight=True)
+    html_output += "</tbody></table>"
+    return html_output
+
+def save_upload(file):
+    """Stores an uploaded file under a random name. Returns (filepath, original_filename, ingest)."""
+    file_extension = file.filename.rsplit('.', 1)[1].lower()
+    unique_filename = f"{secrets.token_hex(8)}.{file_extension}"
+    original_filename = secure_filename(file.filename)
+    
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+    started = time.perf_counter()
+    if ingest_upload:
+        # Stream to disk while hashing, so the file is only read once
+        ingest = ingest_upload(file.stream, filepath)
+    else:
+        file.save(filepath)
+        ingest = None
+    if metrics:
+        metrics.observe_stage('upload', time.perf_counter() - started)
+        metrics.record_bytes('upload', os.path.getsize(filepath))
+    return filepath, original_filename, ingest
+
+@bp.route('/', methods=['GET', 'POST'])
 def upload_file():
     if request.method == 'POST':
         # Check if the post request has the file part
@@ -308,78 +996,838 @@ def upload_file():
             return redirect(request.url)
             
         if file and allowed_file(file.filename):
-            file_extension = file.filename.rsplit('.', 1)[1].lower()
-            unique_filename = f"{secrets.token_hex(8)}.{file_extension}"
-            original_filename = secure_filename(file.filename)
-            
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(filepath)
+            try:
+                first_page, last_page = parse_page_range(request.form.get('pdf_pages'))
+            except ValueError as e:
+                return f"<p style='color:red;'>Error: {escape(str(e))}</p>", 400
+            filepath, original_filename, ingest = save_upload(file)
             
             # This triggers the analysis logic we built
-            analysis_results = run_forensic_analysis_web(filepath, original_filename)
+            try:
+                analysis_results = run_forensic_analysis_web(filepath, original_filename,
+                                                             first_page=first_page, last_page=last_page,
+                                                             ingest=ingest)
+            except AdmissionRejected as e:
+                return f"<p style='color:red;'>Error: {escape(str(e))}</p>", e.status
             
             return render_template('analysis_result.html', results=analysis_results)
             
     return render_template('index.html')
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
-    return send_from_directory(app.config['STATIC_FOLDER'], filename)
-if __name__ == '__main__':
-    app.run(debug=True)
+# --- Background Jobs ---
+_worker_app = None
+
+def run_analysis_job(job, progress, config=None):
+    """
+    Worker-process entry point: runs one queued analysis inside a request context for url_for.
+    Each worker process builds its own app from the config the web app was created with.
+    """
+    global _worker_app
+    if _worker_app is None:
+        _worker_app = create_app(config)
+    params = job['params']
+    try:
+        with _worker_app.test_request_context('/'):
+            return run_forensic_analysis_web(job['file_path'], job['original_filename'],
+                                             first_page=params.get('first_page', 1),
+                                             last_page=params.get('last_page'),
+                                             ingest=params.get('ingest'),
+                                             progress=progress)
+    finally:
+        if metrics:
+            metrics.dump_snapshot(_worker_app.config['METRICS_FOLDER'])
+
+def _stop_job_workers(job_workers):
+    processes, stop_event = job_workers
+    stop_event.set()
+    for process in processes:
+        process.join(timeout=10)
+
+def get_job_queue():
+    """Opens the job queue and starts the worker pool on first use (None if unavailable)."""
+    if JobQueue is None:
+        return None
+    state = _state()
+    with state['lock']:
+        if state['job_queue'] is None:
+            config = current_app.config
+            state['job_queue'] = JobQueue(config['JOBS_DB'], max_depth=config['JOB_QUEUE_DEPTH'],
+                                          lease_seconds=config['JOB_LEASE_SECONDS'], ttl=config['JOB_TTL'])
+            # Only jobs of dead or hung workers: other web processes may share the queue file
+            state['job_queue'].requeue_running()
+            state['job_queue'].sweep()
+            state['job_workers'] = start_workers(config['JOBS_DB'], partial(run_analysis_job, config=state['config']),
+                                                 config['JOB_WORKERS'], lease_seconds=config['JOB_LEASE_SECONDS'],
+                                                 ttl=config['JOB_TTL'])
+            atexit.register(_stop_job_workers, state['job_workers'])
+    return state['job_queue']
+
+def get_hash_index():
+    """Opens the perceptual-hash index on first use (None if unavailable)."""
+    if HashIndex is None:
+        return None
+    state = _state()
+    with state['lock']:
+        if state['hash_index'] is None:
+            state['hash_index'] = HashIndex(current_app.config['PHASH_DB'])
+    return state['hash_index']
+
+def get_evidence_store():
+    """Opens the evidence store on first use (None if unavailable)."""
+    if EvidenceStore is None:
+        return None
+    state = _state()
+    with state['lock']:
+        if state['evidence_store'] is None:
+            state['evidence_store'] = EvidenceStore(current_app.config['EVIDENCE_DB'])
+    return state['evidence_store']
+
+def get_memory_budget():
+    """The node-wide memory budget shared with the job workers (see forensic_tools.admission.MemoryBudget), or None."""
+    if MemoryBudget is None:
+        return None
+    state = _state()
+    with state['lock']:
+        if state['memory_budget'] is None:
+            state['memory_budget'] = MemoryBudget(current_app.config['ADMISSION_DB'], current_app.config['MEMORY_BUDGET'])
+    return state['memory_budget']
+
+def admit_analysis(source, file_extension, first_page=1, last_page=None):
+    """
+    Header-only admission decision for a file (see forensic_tools.admission.decide); source is
+    its path or memory-mapped view. A rejection is counted and raised as AdmissionRejected.
+    Without forensic_tools.admission every file is admitted as it is.
+    """
+    config = current_app.config
+    if estimate_cost is None:
+        return {'decision': ADMIT, 'reason': None, 'bytes': 0, 'scale': None, 'dpi': None, 'estimate': None}
+    estimate = estimate_cost(source, file_extension, dpi=min(config['PDF_DPI'], config['PDF_MAX_DPI']),
+                             first_page=first_page, last_page=last_page, max_pages=config['PDF_MAX_PAGES'],
+                             workers=config['PDF_ELA_WORKERS'], tiled_min_pixels=config['ELA_TILED_MIN_PIXELS'])
+    # Pillow refuses to open images over twice its MAX_IMAGE_PIXELS, before draft decoding could reduce them
+    max_source_pixels = 2 * Image.MAX_IMAGE_PIXELS if Image and Image.MAX_IMAGE_PIXELS else None
+    admission = decide_admission(estimate, max_bytes=config['ADMISSION_MAX_JOB_BYTES'],
+                                 max_pixels=config['MAX_IMAGE_PIXELS'], min_dpi=config['PDF_MIN_DPI'],
+                                 max_source_pixels=max_source_pixels, tiled_min_pixels=config['ELA_TILED_MIN_PIXELS'])
+    if admission['decision'] == REJECT:
+        if metrics: metrics.record_admission(REJECT, file_extension)
+        raise AdmissionRejected(f"File too large to analyze: {admission['reason']}.", admission)
+    return admission
+
+@contextmanager
+def reserve_memory(admission, file_extension, label=None):
+    """
+    Waits until the admitted analysis fits the memory budget, then holds its lease (renewed
+    in the background, however long the analysis runs) for the duration of the with block.
+    An admitted analysis that had to wait is recorded as 'queue'. Raises AdmissionRejected
+    (status 503) when the budget stays full for ADMISSION_TIMEOUT seconds.
+    """
+    memory_budget = get_memory_budget()
+    if memory_budget is None:
+        yield None
+        return
+    lease_id, waited = memory_budget.acquire(admission['bytes'], timeout=current_app.config['ADMISSION_TIMEOUT'],
+                                             label=label)
+    admission['wait_ms'] = round(waited * 1000, 2)
+    if lease_id is None:
+        admission.update(decision=REJECT, reason="the memory budget stayed full")
+        if metrics: metrics.record_admission(REJECT, file_extension, waited)
+        raise AdmissionRejected("The server is busy with other large files. Please try again shortly.", admission,
+                                status=503)
+    if admission['decision'] == ADMIT and waited >= memory_budget.poll_interval:
+        admission['decision'] = QUEUE
+    if metrics: metrics.record_admission(admission['decision'], file_extension, waited)
+    with memory_budget.hold(lease_id):
+        yield lease_id
+
+def record_evidence(results, cache):
+    """
+    Adds a finished analysis to the evidence store and records the row id as
+    results['evidence_id']. Cache hits get their own row: each submission is kept.
+    """
+    evidence_store = get_evidence_store()
+    if evidence_store is None:
+        return results
+    try:
+        results['evidence_id'] = evidence_store.record(results, cache=cache)
+    except Exception as e:
+        print(f"Evidence store write failed: {e}")
+        if metrics: metrics.record_error('evidence')
+    return results
+
+def find_similar(file_sha256, perceptual_hashes, original_filename):
+    """
+    Earlier submissions whose images look like this file's (see
+    HashIndex.similar), then adds this file to the index. perceptual_hashes
+    is the results' list of {'page', 'ahash', 'dhash', 'phash'} (hex).
+    """
+    hash_index = get_hash_index()
+    if hash_index is None or not perceptual_hashes:
+        return []
+    pages = [(entry['page'], from_hex({name: entry[name] for name in ('ahash', 'dhash', 'phash')}))
+             for entry in perceptual_hashes]
+    try:
+        matches = hash_index.similar(pages, radius=current_app.config['PHASH_RADIUS'],
+                                     limit=current_app.config['PHASH_MAX_MATCHES'], exclude_sha256=file_sha256)
+        hash_index.add(file_sha256, pages, original_filename)
+    except Exception as e:
+        print(f"Similarity search failed: {e}")
+        if metrics: metrics.record_error('similar')
+        return []
+    for match in matches:
+        match['submitted'] = time.strftime('%Y-%m-%d %H:%M', time.localtime(match.pop('created')))
+    return matches
+
+def _job_status(job):
+    status = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'original_filename': job['original_filename'],
+        'stages': job['stages'],
+        'created': job['created'],
+        'updated': job['updated'],
+        'status_url': url_for('forensics.job_status', job_id=job['id']),
+        'result_url': url_for('forensics.job_result', job_id=job['id']),
+        'events_url': url_for('forensics.job_events', job_id=job['id']),
+    }
+    if job['error']:
+        status['error'] = job['error']
+    return status
+
+def _queue_full_response():
+    response = jsonify(error="Analysis queue is full, try again shortly.")
+    response.headers['Retry-After'] = str(current_app.config['JOB_RETRY_AFTER'])
+    return response, 429
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    queue = get_job_queue()
+    if queue is None:
+        # 404 like a server without the endpoint: the upload page then posts the form instead
+        return jsonify(error="Background jobs are not available on this server."), 404
+
+    file = request.files.get('file')
+    if not file or file.filename == '' or not allowed_file(file.filename):
+        return jsonify(error="Upload a JPG, JPEG, PNG or PDF file in the 'file' field."), 400
+    try:
+        first_page, last_page = parse_page_range(request.form.get('pdf_pages'))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # Refuse before reading the body when the queue is already full
+    if queue.depth() >= queue.max_depth:
+        return _queue_full_response()
+
+    filepath, original_filename, ingest = save_upload(file)
+    # Files too large at any size are refused now rather than failing in a worker
+    try:
+        admit_analysis(filepath, original_filename.rsplit('.', 1)[1].lower(), first_page, last_page)
+    except AdmissionRejected as e:
+        os.remove(filepath)
+        return jsonify(error=str(e), admission=e.admission), e.status
+    try:
+        job_id = queue.submit(filepath, original_filename, params={
+            'first_page': first_page, 'last_page': last_page, 'ingest': ingest,
+        })
+    except QueueFull:
+        os.remove(filepath)
+        return _queue_full_response()
+
+    return jsonify(_job_status(queue.get(job_id))), 202
+
+@bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    queue = get_job_queue()
+    job = queue.get(job_id) if queue else None
+    if job is None:
+        return jsonify(error="Unknown job."), 404
+    return jsonify(_job_status(job))
+
+@bp.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    queue = get_job_queue()
+    job = queue.get(job_id) if queue else None
+    if job is None:
+        return jsonify(error="Unknown job."), 404
+    if job['status'] == FAILED:
+        return jsonify(_job_status(job)), 500
+    if job['status'] != DONE:
+        return jsonify(_job_status(job)), 202
+    if request.args.get('format') == 'json':
+        return jsonify(job['result'])
+    return render_template('analysis_result.html', results=job['result'])
+
+@bp.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events: one 'progress' event per change, then a final 'done' or 'failed' event."""
+    queue = get_job_queue()
+    if queue is None or queue.get(job_id) is None:
+        return jsonify(error="Unknown job."), 404
+
+    def stream():
+        last_seen = None
+        while True:
+            job = queue.get(job_id)
+            status = _job_status(job)
+            snapshot = (job['status'], json.dumps(job['stages'], sort_keys=True))
+            if snapshot != last_seen:
+                last_seen = snapshot
+                event = job['status'] if job['status'] in (DONE, FAILED) else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(status)}\n\n"
+            if job['status'] in (DONE, FAILED):
+                return
+            time.sleep(0.5)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/strings/<file_sha256>')
+def strings_page(file_sha256):
+    """One page of strings from a stored upload, starting at ?offset= (JSON)."""
+    file_path = stored_upload_path(file_sha256)
+    if file_path is None or extract_strings is None:
+        return jsonify(error="Unknown file."), 404
+
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', current_app.config['STRINGS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['STRINGS_MAX_PAGE_SIZE']))
+    page = extract_strings(file_path, offset=max(0, offset), limit=limit,
+                           min_length=current_app.config['STRINGS_MIN_LENGTH'],
+                           keywords=current_app.config['STRINGS_KEYWORDS'],
+                           flagged_only=request.args.get('flagged') == '1')
+    page['lines'] = [format_string_line(item, file_sha256) for item in page['strings']]
+    if page['next_offset'] is not None:
+        page['next_url'] = url_for('forensics.strings_page', file_sha256=file_sha256,
+                                   offset=page['next_offset'], limit=limit)
+    return jsonify(page)
+
+@bp.route('/hex/<file_sha256>')
+def hex_view_page(file_sha256):
+    """One page of the hex view of a stored upload, starting at ?offset= (decimal or 0x hex) (JSON)."""
+    file_path = stored_upload_path(file_sha256)
+    if file_path is None or hex_page is None:
+        return jsonify(error="Unknown file."), 404
+
+    offset_arg = request.args.get('offset', '0').strip().lower()
+    try:
+        offset = int(offset_arg, 16) if offset_arg.startswith('0x') else int(offset_arg)
+    except ValueError:
+        return jsonify(error="Invalid offset."), 400
+    rows = request.args.get('rows', current_app.config['HEX_ROWS_PER_PAGE'], type=int)
+    rows = max(1, min(rows, current_app.config['HEX_MAX_ROWS']))
+    return jsonify(_hex_page_json(file_path, file_sha256, offset=offset, rows=rows))
+
+@bp.route('/ela/<file_sha256>/full')
+def ela_full_resolution(file_sha256):
+    """Full-resolution ELA heatmap of a stored JPEG upload, rendered in strips on first request."""
+    file_path = stored_upload_path(file_sha256)
+    if file_path is None or not file_path.endswith(('.jpg', '.jpeg')) or compute_ela is None or _state()['artifact_store'] is None:
+        return jsonify(error="Unknown file."), 404
+
+    artifact_store = _state()['artifact_store']
+    ela_filename = ela_artifact_name(file_sha256, suffix="-full")
+    if not artifact_store.exists(ela_filename):
+        ela_result_img = perform_ela(file_path, memory_budget=current_app.config['ELA_MEMORY_BUDGET'], full_resolution=True)
+        if ela_result_img is None or not artifact_store.save_image(ela_filename, ela_result_img):
+            return jsonify(error="ELA failed for this file."), 500
+    # The artifact URL is immutable; this one is not (it depends on the analyzer version)
+    return redirect(artifact_url(ela_filename))
+
+@bp.route('/artifacts/<name>')
+def artifact(name):
+    """
+    Analysis images. An artifact name always refers to the same bytes, so
+    responses carry a strong ETag and are cached as immutable by browsers
+    and proxies; revalidation, if any, gets a 304.
+    """
+    artifact_store = _state()['artifact_store']
+    path = artifact_store.path(name) if artifact_store else None
+    try:
+        if path is None:
+            raise FileNotFoundError(name)
+        etag = artifact_store.etag(name)
+    except OSError:
+        return jsonify(error="Unknown artifact."), 404
+    artifact_store.touch(name)
+    response = send_file(path, mimetype=artifact_store.mimetype(name), etag=etag,
+                         max_age=current_app.config['ARTIFACT_MAX_AGE'], conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@bp.route('/similar', methods=['POST'])
+def similar_bulk():
+    """
+    Bulk search of the perceptual-hash index. JSON body:
+    {"queries": [{"phash": "<16 hex>"} or {"sha256": "<indexed file>"}, ...], "radius": 10, "limit": 10}.
+    A phash query may also carry "ahash"/"dhash" to get those distances. Returns
+    {"results": [{"query", "matches"} or {"query", "error"}]} in query order.
+    """
+    hash_index = get_hash_index()
+    if hash_index is None:
+        return jsonify(error="Similarity search is unavailable on this server."), 503
+    body = request.get_json(silent=True) or {}
+    queries = body.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify(error="Expected a non-empty 'queries' list."), 400
+    if len(queries) > current_app.config['PHASH_BULK_MAX_QUERIES']:
+        return jsonify(error=f"At most {current_app.config['PHASH_BULK_MAX_QUERIES']} queries per request."), 400
+    try:
+        radius = int(body.get('radius', current_app.config['PHASH_RADIUS']))
+        limit = max(1, min(int(body.get('limit', current_app.config['PHASH_MAX_MATCHES'])), 100))
+    except (TypeError, ValueError):
+        return jsonify(error="'radius' and 'limit' must be integers."), 400
+    if not 0 <= radius <= MAX_RADIUS:
+        return jsonify(error=f"'radius' must be between 0 and {MAX_RADIUS}."), 400
+
+    results = []
+    for query in queries:
+        if not isinstance(query, dict):
+            results.append({'query': query, 'error': "Each query must be an object."})
+            continue
+        if 'sha256' in query:
+            pages = hash_index.hashes_for(str(query['sha256']).lower())
+            if not pages:
+                results.append({'query': query, 'error': "File is not in the index."})
+                continue
+            exclude = str(query['sha256']).lower()
+        else:
+            hex_hashes = {name: str(query[name]) for name in ('ahash', 'dhash', 'phash') if name in query}
+            if not re.fullmatch(r'[0-9a-fA-F]{16}', hex_hashes.get('phash', '')) or not all(
+                    re.fullmatch(r'[0-9a-fA-F]{16}', value) for value in hex_hashes.values()):
+                results.append({'query': query, 'error': "Expected 'sha256' or a 16-digit hex 'phash'."})
+                continue
+            pages, exclude = [(0, from_hex(hex_hashes))], None
+        results.append({'query': query,
+                        'matches': hash_index.similar(pages, radius=radius, limit=limit, exclude_sha256=exclude)})
+    return jsonify(results=results)
+
+@bp.route('/evidence')
+def evidence_query():
+    """
+    Past analyses from the evidence store, newest first (JSON). Filters:
+    sha256, file_type, tool (a word of Software/Creator/Producer, e.g. canva),
+    software (substring), filename (substring), min_score/max_score,
+    since/until (ISO date or epoch seconds). Pass next_cursor back as
+    ?cursor= for the next page; ?count=1 adds the total number of matches.
+    """
+    evidence_store = get_evidence_store()
+    if evidence_store is None:
+        return jsonify(error="The evidence store is unavailable on this server."), 503
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    limit = request.args.get('limit', current_app.config['EVIDENCE_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['EVIDENCE_MAX_PAGE_SIZE']))
+    page = evidence_store.query(filters, limit=limit, cursor=request.args.get('cursor', type=int))
+    if request.args.get('count') == '1':
+        page['total'] = evidence_store.count(filters)
+    if page['next_cursor'] is not None:
+        page['next_url'] = url_for('forensics.evidence_query', **dict(request.args.items(), cursor=page['next_cursor']))
+    return jsonify(page)
+
+@bp.route('/evidence/<int:analysis_id>')
+def evidence_item(analysis_id):
+    """One stored analysis (JSON); ?full=1 adds the complete results while they are still in the result store."""
+    evidence_store = get_evidence_store()
+    if evidence_store is None:
+        return jsonify(error="The evidence store is unavailable on this server."), 503
+    item = evidence_store.get(analysis_id)
+    if item is None:
+        return jsonify(error="Unknown analysis."), 404
+    result_store = _state()['result_store']
+    if request.args.get('full') == '1' and result_store and item['result_id']:
+        item['results'] = result_store.load(item['result_id'])
+    return jsonify(item)
+
+@bp.route('/evidence/export')
+def evidence_export():
+    """
+    Every analysis matching the /evidence filters as ?format=csv (default) or
+    jsonl, streamed in batches so large exports never sit in memory.
+    """
+    evidence_store = get_evidence_store()
+    if evidence_store is None:
+        return jsonify(error="The evidence store is unavailable on this server."), 503
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return jsonify(error="'format' must be csv or jsonl."), 400
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    def generate():
+        if export_format == 'jsonl':
+            for item in evidence_store.iter_rows(filters):
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+            return
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EVIDENCE_COLUMNS + ('analyzed_at',))
+        for n, item in enumerate(evidence_store.iter_rows(filters), 1):
+            item['evidence'] = ' | '.join(item['evidence'])
+            writer.writerow([item[column] for column in EVIDENCE_COLUMNS + ('analyzed_at',)])
+            if n % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    filename = f"evidence-{time.strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@bp.route('/capabilities')
+def capabilities():
+    """
+    Which analyses this server can run (JSON). Optional backends are reported
+    without being imported; ?load=1 imports them first, e.g. for a readiness probe.
+    """
+    return jsonify({
+        'analyses': {
+            'ela': compute_ela is not None,
+            'jpeg_markers': analyze_jpeg is not None,
+            'copy_move': detect_copy_move is not None,
+            'noise': noise_map is not None,
+            'ghost': ghost_sweep is not None,
+            'pdf_revisions': scan_pdf_revisions is not None,
+            'strings': extract_strings is not None,
+            'hex_view': hex_page is not None,
+            'cache': _state()['analysis_cache'] is not None,
+            'evidence': EvidenceStore is not None,
+            'jobs': JobQueue is not None,
+        },
+        'backends': backends.capabilities(load_all=request.args.get('load') == '1') if backends else {},
+    })
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format: this process's metrics plus the job workers' snapshots."""
+    if metrics is None:
+        return "Metrics are unavailable on this server.\n", 503, {'Content-Type': 'text/plain'}
+    return Response(metrics.render_prometheus(current_app.config['METRICS_FOLDER']),
+                    mimetype='text/plain; version=0.0.4')
 
 # --- FORENSIC ANALYSIS FUNCTION (Retained Logic) ---
-def run_forensic_analysis_web(file_path, original_filename):
+# --- Analysis Pipeline ---
+# Analyzers declare the inputs they need and ANALYSIS.run computes each input once,
+# running independent analyzers side by side. run_forensic_analysis_web seeds 'bytes'
+# (the memory-mapped upload, or None); the context is its dict of file details, including
+# the admission decision ('admission', see admit_analysis).
+ANALYSIS = Pipeline()
+
+@ANALYSIS.input('markers', 'bytes')
+def _markers_input(analysis, file_view):
+    """Header-only JPEG marker parse: microseconds, so it gates the decode-heavy stages."""
+    if analysis['file_extension'] not in ('jpg', 'jpeg') or not analyze_jpeg:
+        return None
+    return analyze_jpeg(file_view if file_view else analysis['file_path'])
+
+@ANALYSIS.input('image', 'bytes', 'markers')
+def _image_input(analysis, file_view, jpeg_info):
+    """The decoded image, shared by every pixel analyzer; None for PDFs and undecodable files."""
+    if analysis['file_extension'] not in ('jpg', 'jpeg', 'png') or not Image or (jpeg_info and not jpeg_info['valid']):
+        return None
+    try:
+        decoded = Image.open(MappedReader(file_view) if file_view else analysis['file_path'])
+        scale = analysis['admission']['scale']
+        if scale:
+            # Admitted at reduced size: libjpeg scales in the DCT domain, so the full bitmap never exists
+            decoded.draft(decoded.mode, (-(-decoded.width // scale), -(-decoded.height // scale)))
+        decoded.load()
+    except Exception as e:
+        print(f"Failed to decode image: {e}")
+        if metrics: metrics.record_error('image')
+        return None
+    if metrics:
+        metrics.record_bytes('image', decoded.width * decoded.height * len(decoded.getbands()))
+        metrics.record_megapixels(decoded.width, decoded.height)
+    return decoded
+
+@ANALYSIS.input('rgb', 'image')
+def _rgb_input(analysis, decoded):
+    """
+    The decoded JPEG as a uint8 RGB array for ELA. Scans of ELA_TILED_MIN_PIXELS
+    or more get None: ELA processes those in strips straight from the image.
+    """
+    if decoded is None or compute_ela is None or analysis['file_extension'] not in ('jpg', 'jpeg'):
+        return None
+    if decoded.width * decoded.height >= current_app.config['ELA_TILED_MIN_PIXELS']:
+        return None
+    return load_rgb(decoded)
+
+@ANALYSIS.input('gray', 'image')
+def _gray_input(analysis, decoded):
+    """An 8-bit grayscale copy for the noise map, the JPEG ghost sweep and clone detection."""
+    return decoded.convert('L') if decoded is not None else None
+
+@ANALYSIS.input('pages')
+def _pages_input(analysis):
+    """Rasterized PDF pages with their ELA heatmaps already saved (see run_pdf_page_ela); [] for images."""
+    if analysis['file_extension'] != 'pdf':
+        return []
+    pages = run_pdf_page_ela(analysis['file_path'], analysis['first_page'], analysis['last_page'],
+                             file_sha256=analysis['file_sha256'],
+                             dpi=analysis['admission']['dpi'])
+    if metrics: metrics.record_bytes('pages', analysis['file_size'])
+    return pages
+
+@ANALYSIS.analyzer('metadata', 'bytes')
+def _metadata_analyzer(analysis, file_view):
+    result = check_metadata(analysis['file_path'], analysis['file_extension'], file_view=file_view)
+    if metrics: metrics.record_bytes('metadata', analysis['file_size'])
+    return result
+
+@ANALYSIS.analyzer('strings')
+def _strings_analyzer(analysis):
+    result = check_strings_with_offsets(analysis['file_path'], analysis['file_sha256'])
+    if metrics: metrics.record_bytes('strings', analysis['file_size'])
+    return result
+
+@ANALYSIS.analyzer('ela', 'image', 'rgb')
+def _ela_analyzer(analysis, decoded, rgb):
+    """
+    JPEG ELA heatmap, saved with a WebP preview for the page. Returns None when
+    ELA does not apply, else {'generated', 'filename' (None if not saved), 'tiled'}.
+    """
+    if analysis['file_extension'] not in ('jpg', 'jpeg') or decoded is None:
+        return None
+    ela_result = perform_ela(rgb if rgb is not None else decoded, full_result=True,
+                             tiled_min_pixels=current_app.config['ELA_TILED_MIN_PIXELS'],
+                             memory_budget=current_app.config['ELA_MEMORY_BUDGET'])
+    if not ela_result:
+        return {'generated': False, 'filename': None, 'tiled': False}
+
+    ela_filename = ela_artifact_name(analysis['file_sha256'])
+    artifact_store = _state()['artifact_store']
+    try:
+        # The full heatmap goes to reports; the page shows a small WebP preview
+        if artifact_store is None or not artifact_store.save_image(ela_filename, ela_result['image'], preview=True):
+            raise OSError(f"could not write {ela_filename}")
+    except Exception as e:
+        print(f"Failed to save ELA image to static: {e}")
+        if metrics: metrics.record_error('ela')
+        ela_filename = None
+    return {'generated': True, 'filename': ela_filename, 'tiled': ela_result.get('tiled', False)}
+
+@ANALYSIS.analyzer('noise', 'gray')
+def _noise_analyzer(analysis, gray):
+    if gray is None:
+        return None, "N/A"
+    return perform_noise_analysis(gray, analysis['file_sha256'])
+
+@ANALYSIS.analyzer('ghost', 'gray', 'markers')
+def _ghost_analyzer(analysis, gray, jpeg_info):
+    # Only qualities below the last save's can reveal an earlier one
+    if gray is None:
+        return None, "N/A"
+    primary_quality = jpeg_info['quality'] if jpeg_info else None
+    return perform_ghost_analysis(gray, analysis['file_sha256'], primary_quality=primary_quality)
+
+@ANALYSIS.analyzer('copy_move', 'gray', 'image')
+def _copy_move_analyzer(analysis, gray, decoded):
+    # Clone detection is bounded by its own time budget
+    if gray is None:
+        return None, "N/A"
+    return run_copy_move(gray, analysis['file_sha256'], overlay_source=decoded)
+
+@ANALYSIS.analyzer('phash', 'image', 'pages')
+def _phash_analyzer(analysis, decoded, pdf_pages):
+    """Perceptual hashes (hex) of the image, or of each rasterized PDF page."""
+    perceptual_hashes = [dict(page['hashes'], page=page['page']) for page in pdf_pages if page.get('hashes')]
+    if decoded is not None and HashIndex:
+        try:
+            perceptual_hashes.append(dict(to_hex(image_hashes(decoded)), page=0))
+        except Exception as e:
+            print(f"Perceptual hashing failed: {e}")
+            if metrics: metrics.record_error('phash')
+    return perceptual_hashes
+
+@ANALYSIS.analyzer('similar', 'phash')
+def _similar_analyzer(analysis, perceptual_hashes):
+    # Reported, not scored: a shop's genuine receipts share one template too
+    return find_similar(analysis['file_sha256'], perceptual_hashes, analysis['original_filename'])
+
+def run_forensic_analysis_web(file_path, original_filename, first_page=1, last_page=None, ingest=None, progress=None):
+    """
+    progress, if given, is called as progress(stage, status) after each stage for job status
+    reporting: ingest, cache and admission, then every ANALYSIS step as it finishes (markers, image,
+    rgb, gray, pages, metadata, strings, ela, noise, ghost, copy_move, phash, similar; the order varies
+    because independent steps run concurrently), then report.
+    Raises AdmissionRejected (and deletes the upload) when the file is too large to analyze, or
+    when the memory budget stays full for ADMISSION_TIMEOUT seconds.
+    Each stage is also timed for /metrics; with RESULT_TIMINGS the breakdown (ms) is returned in
+    results['timings']. Concurrent stages overlap, so their sum can exceed the total.
+    """
+    if progress is None:
+        progress = lambda stage, status='done': None
+    if metrics:
+        progress = metrics.StageTimer(progress)
     
     file_extension = original_filename.rsplit('.', 1)[1].lower()
     current_file_path = file_path
-    temp_image_path = None
-    
-    run_ela = file_extension in ['jpg', 'jpeg']
-    
+
+    if ingest is None:
+        ingest = fingerprint_file(file_path)
+    file_sha256 = ingest['sha256']
+    file_size = ingest['size']
+    if metrics: metrics.record_bytes('ingest', file_size)
+    progress('ingest')
+    cache_variant = file_extension
     if file_extension == 'pdf':
-        run_ela = False
-        temp_paths = convert_pdf_to_images(file_path)
-        if temp_paths:
-             temp_image_path = temp_paths[0]
-             
-    meta_ext = file_extension
-    metadata_data, metadata_html = check_metadata(file_path, meta_ext)
-    strings_offsets_html = check_strings_with_offsets(file_path)
-
-    ela_result_img = None
-    ela_static_path = None
-    ela_filename = "N/A"
-    
-    if run_ela: 
-        ela_result_img = perform_ela(current_file_path) 
-        
-        if ela_result_img and Image and isinstance(ela_result_img, Image.Image): 
-            ela_filename = f"ELA_{secrets.token_hex(6)}.jpg"
-            ela_static_path = os.path.join(app.config['STATIC_FOLDER'], ela_filename)
-            
-            try:
-                # ELA image is saved to the absolute XAMPP static path
-                ela_result_img.save(ela_static_path, format='JPEG') 
-            except Exception as e:
-                print(f"Failed to save ELA image to static: {e}")
-                ela_filename = "N/A"
-                ela_static_path = None
+        cache_variant += f"-pages{first_page}-{last_page or 'end'}"
+    analysis_cache = _state()['analysis_cache']
+    if analysis_cache:
+        cached_results = analysis_cache.get(file_sha256, cache_variant)
+        if cached_results and artifacts_present(cached_results):
+            store_upload(current_file_path, file_sha256, file_extension)
+            cached_results = dict(cached_results, original_filename=original_filename)
+            progress('cache', 'hit')
+            # Later submissions may have arrived since the result was cached
+            cached_results['similar'] = find_similar(file_sha256, cached_results.get('perceptual_hashes'), original_filename)
+            progress('similar')
+            if metrics:
+                metrics.record_analysis(file_extension, 'hit')
+                if current_app.config['RESULT_TIMINGS']:
+                    cached_results['timings'] = progress.breakdown()
+            return record_evidence(store_result(cached_results), 'hit')
+        progress('cache', 'miss')
     
+    analysis = {
+        'file_path': file_path,
+        'file_extension': file_extension,
+        'file_sha256': file_sha256,
+        'file_size': file_size,
+        'first_page': first_page,
+        'last_page': last_page,
+        'original_filename': original_filename,
+    }
+    # Analyzers share one memory-mapped view of the upload and every input decoded from it.
+    # Nothing is decoded before the header-only estimate is admitted and fits the memory budget.
+    try:
+        with (open_mapped(file_path) if ingest_upload else nullcontext(None)) as file_view:
+            admission = admit_analysis(file_view if file_view is not None else file_path, file_extension,
+                                       first_page, last_page)
+            analysis['admission'] = admission
+            with reserve_memory(admission, file_extension, label=f"{file_sha256[:16]} {original_filename}"):
+                progress('admission', admission['decision'])
+                values = ANALYSIS.run(analysis, seeds={'bytes': file_view}, workers=current_app.config['PIPELINE_WORKERS'],
+                                      on_done=progress.record if metrics else lambda stage, seconds: progress(stage),
+                                      wrap=copy_current_request_context)
+                if values['image'] is not None:
+                    values['image'].close()
+    except AdmissionRejected:
+        # Like a full job queue: a rejected upload is not kept
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        raise
+
+    metadata_data, metadata_html = values['metadata']
+    strings_offsets_html, strings_flagged = values['strings']
+    jpeg_info = values['markers']
+    pdf_pages = values['pages']
+    ela = values['ela']
+    noise, noise_path = values['noise']
+    ghost, ghost_path = values['ghost']
+    copy_move, copy_move_path = values['copy_move']
+    perceptual_hashes = values['phash']
+    similar = values['similar']
+    run_ela = file_extension in ['jpg', 'jpeg'] and not (jpeg_info and not jpeg_info['valid'])
+
     tamper_score = 3
     if metadata_data['TAMPER_ALERT'] == 'High': tamper_score += 4
     elif metadata_data['TAMPER_ALERT'] == 'Medium': tamper_score += 2
+    # Edits recorded in the image's own XMP (history, placed documents, text layers) count on top of the software
+    metadata_history = [f for f in metadata_data.get('Metadata_Findings', []) if f['kind'] != 'software']
+    if any(f['kind'] in ('history', 'composite', 'text_layers') for f in metadata_history): tamper_score += 2
+
+    # Magic bytes sniffed during ingest must agree with the file extension
+    signature_alert = None
+    if ingest_upload:
+        if ingest['file_type'] is None:
+            signature_alert = f"🔴 HEX ALERT: File signature is unknown ({ingest['signature_status']})."
+        elif not signature_matches_extension(ingest['file_type'], file_extension):
+            signature_alert = f"🔴 HEX ALERT: File signature ({ingest['file_type']}) does not match the .{file_extension} extension."
+    if signature_alert: tamper_score += 3
+    if jpeg_info and (jpeg_info['indicators'] or not jpeg_info['valid']): tamper_score += 2
+    if copy_move and copy_move['matches']: tamper_score += 2
+    noise_alert = noise is not None and noise['region_blocks'] >= current_app.config['NOISE_MIN_REGION']
+    if noise_alert: tamper_score += 2
+    ghost_alert = ghost is not None and ghost['ghost_percent'] >= current_app.config['GHOST_ALERT_PERCENT']
+    if ghost_alert: tamper_score += 2
+    pdf_updates = metadata_data.get('Incremental_Updates', 0)
+    if pdf_updates: tamper_score += 2
         
     max_score = 10 
     
     evidence = []
-    if metadata_data['TAMPER_ALERT'] == 'High': evidence.append(f"🔴 METADATA ALERT: Editing software detected ({metadata_data['Software']}).")
+    if signature_alert: evidence.append(signature_alert)
+    if metadata_data['TAMPER_ALERT'] == 'High' and metadata_history and not editing_software([metadata_data['Software']]):
+        evidence.append("🔴 METADATA ALERT: The image metadata records edits after it was created.")
+    elif metadata_data['TAMPER_ALERT'] == 'High': evidence.append(f"🔴 METADATA ALERT: Editing software detected ({metadata_data['Software']}).")
     elif metadata_data['TAMPER_ALERT'] == 'Medium': evidence.append("🟡 METADATA CHECK: Low-level editing signature detected.")
     else: evidence.append("🟢 METADATA CHECK: No strong editing signature detected.")
+    for finding in metadata_history:
+        evidence.append(f"{'🔴' if finding['severity'] == 'high' else '🟡'} METADATA HISTORY: {finding['message']}")
+
+    if pdf_updates:
+        evidence.append(f"🟡 PDF REVISIONS: The document was saved {pdf_updates} more time(s) after it was created. Review the PDF Revisions table in the metadata.")
+    elif 'Revisions' in metadata_data:
+        evidence.append("🟢 PDF REVISIONS: No incremental updates after the original save.")
+
+    if jpeg_info and not jpeg_info['valid']:
+        evidence.append(f"🔴 JPEG STRUCTURE: Marker segments are damaged or incomplete ({jpeg_info['error'] or 'no frame/scan header'}).")
+    elif jpeg_info and jpeg_info['indicators']:
+        evidence.append(f"🟡 JPEG CHECK: Recompression indicators found ({len(jpeg_info['indicators'])}): {' '.join(jpeg_info['indicators'])}")
+    elif jpeg_info:
+        evidence.append(f"🟢 JPEG CHECK: Quantization tables consistent with a single save (quality ~{jpeg_info['quality']}).")
+
+    if noise_alert:
+        x0, y0, x1, y1 = noise['region_box']
+        evidence.append(f"🟡 NOISE CHECK: A region of {noise['region_blocks']} blocks (around {x0},{y0}-{x1},{y1}) has a noise level inconsistent with the rest (typical level {noise['median_sigma']}). Review the Noise Analysis heatmap.")
+    elif noise:
+        evidence.append(f"🟢 NOISE CHECK: Noise level is consistent across the image (no connected region of outlier blocks; {noise['inconsistency']}% scattered outliers).")
+
+    if ghost_alert:
+        x0, y0, x1, y1 = ghost['ghost_box']
+        evidence.append(f"🟡 JPEG GHOST: {ghost['ghost_percent']}% of the textured blocks (around {x0},{y0}-{x1},{y1}) match an earlier save at quality ~{ghost['ghost_quality']}. Review the JPEG Ghosts sweep.")
+    elif ghost and not ghost['skipped']:
+        evidence.append("🟢 JPEG GHOST: No region matches an earlier save at a different quality.")
+
+    if copy_move and copy_move['matches']:
+        largest = max(copy_move['matches'], key=lambda m: m['blocks'])
+        evidence.append(f"🟡 CLONE CHECK: {len(copy_move['matches'])} duplicated region(s) found (largest at {largest['source']}, copied by {largest['shift']}). Review the Clone Detection overlay.")
+    elif copy_move:
+        evidence.append("🟢 CLONE CHECK: No duplicated regions found" + (" within the time budget." if copy_move['timed_out'] else "."))
+
+    if admission['decision'] == DOWNSCALE:
+        evidence.append(f"🟡 ADMISSION: {admission['reason']} to stay within the memory limits, so the pixel-level checks are less sensitive than at full resolution.")
 
-    if run_ela and ela_result_img and Image and isinstance(ela_result_img, Image.Image):
+    if strings_flagged:
+        evidence.append(f"🟡 STRINGS CHECK: Editor/URL keywords found in the file: {', '.join(strings_flagged)}.")
+
+    pdf_ela_pages = [p for p in pdf_pages if p['ela_path'] != "N/A"]
+
+    if ela and ela['generated']:
         evidence.append("🟢 ELA GENERATED: Review ELA output for bright areas indicating re-compression/edits.")
-    elif run_ela and not ela_result_img:
+    elif pdf_ela_pages:
+        worst_page = max(pdf_ela_pages, key=lambda p: p['score'])
+        evidence.append(f"🟢 ELA GENERATED: {len(pdf_ela_pages)} PDF page(s) analyzed. Highest error level on page {worst_page['page']} (score {worst_page['score']}).")
+    elif file_extension == 'pdf':
+        pdf_handler = load_backend('pdf2image')
+        page_count = pdf_handler.get_pdf_page_count(file_path) if pdf_handler else 0
+        if page_count and first_page > page_count:
+            evidence.append(f"🟡 ELA SKIPPED: No pages in range {first_page}-{last_page or 'end'}; the document has {page_count} page(s).")
+        else:
+            evidence.append("🔴 ELA ERROR: Could not rasterize the PDF pages (Poppler missing or file corrupted).")
+    elif jpeg_info and not jpeg_info['valid']:
+        evidence.append("🔴 ELA SKIPPED: The JPEG headers are invalid, so the image cannot be decoded reliably.")
+    elif run_ela:
         evidence.append("🔴 ELA ERROR: Could not generate ELA image (File corruption or dependency issue).")
     else:
         evidence.append(f"🟡 ELA SKIPPED: Analysis not applicable to {file_extension.upper()} format.")
@@ -391,10 +1839,7 @@ def run_forensic_analysis_web(file_path, original_filename):
     elif tamper_score > 0: conclusion = "SUSPICION NOTED (LOW CONCERN)"
     else: conclusion = "TAMPERING UNLIKELY"
         
-    try:
-        if os.path.exists(current_file_path): os.remove(current_file_path)
-        if temp_image_path and os.path.exists(temp_image_path): os.remove(temp_image_path)
-    except Exception as e: print(f"Error during file cleanup: {e}")
+    stored_path = store_upload(current_file_path, file_sha256, file_extension)
         
     results = {}
     
@@ -404,26 +1849,60 @@ def run_forensic_analysis_web(file_path, original_filename):
     results['original_filename'] = original_filename
     
     # URL is generated correctly using the static file name
-    results['ela_path'] = url_for('static', filename=ela_filename) if ela_static_path else "N/A"
+    ela_filename = ela['filename'] if ela else None
+    results['ela_path'] = artifact_url(ela_filename) if ela_filename else "N/A"
+    results['ela_preview_path'] = artifact_url(preview_name(ela_filename)) if ela_filename else None
+    if pdf_ela_pages:
+        results['ela_path'] = pdf_ela_pages[0]['ela_path']
+    results['pdf_pages'] = pdf_pages
+    results['copy_move_path'] = copy_move_path
+    results['noise_path'] = noise_path
+    results['noise'] = noise
+    results['ghost_path'] = ghost_path
+    results['ghost'] = ghost
+    results['copy_move'] = render_copy_move(copy_move)
+    results['perceptual_hashes'] = perceptual_hashes
+    results['similar'] = similar
+    results['admission'] = admission
+    # Tiled (large scan) ELA shows a reduced preview; the full heatmap is rendered on request
+    results['ela_full_url'] = url_for('forensics.ela_full_resolution', file_sha256=file_sha256) if ela_filename and ela['tiled'] else None
     
     results['conclusion'] = conclusion
     results['tamper_percentage'] = f"{tamper_percentage:.1f}"
     results['evidence'] = evidence
+    # Plain values for the evidence store; cached with the rest, so cache hits are recorded alike
+    results['properties'] = {
+        'file_type': file_extension,
+        'software': None if metadata_data['Software'] == 'N/A' else metadata_data['Software'],
+        'creator': metadata_data.get('Creator'),
+        'producer': metadata_data.get('Producer'),
+        'created': metadata_data.get('Created'),
+        'modified': metadata_data.get('Modified'),
+        'width': None if img_width == 'N/A' else img_width,
+        'height': None if img_height == 'N/A' else img_height,
+        'tamper_score': tamper_score,
+    }
     results['metadata'] = metadata_html
     results['strings'] = strings_offsets_html 
 
     results['general_summary'] = f"""
         <p><strong>File Type:</strong> {file_extension.upper()}</p>
-        <p><strong>File Size:</strong> N/A</p>
+        <p><strong>File Size:</strong> {ingest['size']:,} bytes</p>
         <p><strong>Dimensions:</strong> {img_width}x{img_height}</p>
         <p><strong>Conclusion:</strong> {conclusion}</p>
     """
     results['digest'] = {
-        'SHA-256': '3a2c4e5f6b7c8d9e0a1b2c3d4e5f6b7c8d9e0a1b2c3d4e5f6b7c8d9e0a1b2c3d',
+        'SHA-256': file_sha256,
+        'SHA-1': ingest['sha1'],
+        'MD5': ingest['md5'],
+        'Size': ingest['size'],
         'Hash_Note': 'Hashes are calculated from the original file bytes.'
     }
     
-    if run_ela: 
+    if jpeg_info:
+        results['jpeg_analysis'] = render_jpeg_analysis(jpeg_info)
+        results['ela_description'] = 'Error Level Analysis compares the original image to a known, high-quality re-save. **Bright areas in the ELA image indicate potential edits** because those pixels compressed differently from the rest of the image.'
+    elif run_ela: 
         results['jpeg_analysis'] = """
             <p><strong>Detected Quality:</strong> N/A (requires further analysis)</p>
             <p><strong>Recompression Likelihood:</strong> LOW/MEDIUM</p>
@@ -439,64 +1918,123 @@ def run_forensic_analysis_web(file_path, original_filename):
             <p><strong>Conclusion:</strong> Focus forensic investigation on metadata and object streams (Strings/Source tabs).</p>
         """
         results['ela_description'] = f'**ELA Skipped:** ELA is only relevant for lossy compressed images (like JPEG). For {file_extension.upper()} files, the appropriate forensic steps are Metadata analysis, Binary String review, and Source Code inspection for embedded data that indicates editing or manipulation.'
+        if pdf_ela_pages:
+            results['ela_description'] = 'Each PDF page is rasterized and compared against a high-quality JPEG re-save. **Bright areas indicate content that compressed differently from the rest of the page**, such as a pasted total or an edited line item. Compare the scores across pages: a page that stands out deserves a closer look.'
 
 
-    results['source_code'] = """
-        <pre class=code-block>
-        --- FILE HEADER (First 64 Bytes) ---
-        00000000: 25 50 44 46 2D 31 2E 34 0A 25 E2 E3 CF D3 0A 31 
-        00000010: 20 30 20 6F 62 6A 0A 3C 3C 2F 54 79 70 65 20 2F 
-        00000020: 43 61 74 61 6C 6F 67 2F 56 65 72 73 69 6F 6E 20 
-        00000030: 2F 43 72 65 61 74 6F 72 20 28 43 61 6E 76 61 29 
-        --- End of Header ---
-        </pre>
-        <p>Displayed: Hex dump of the file header (PDF Start). Note the <code>/Creator (Canva)</code> string found early in the file, confirming the Metadata findings.</p>
-    """
+    results['source_code'] = render_hex_view(stored_path, file_sha256)
+    progress('report')
+    if metrics:
+        metrics.record_analysis(file_extension, 'miss')
+        if current_app.config['RESULT_TIMINGS']:
+            results['timings'] = progress.breakdown()
+    store_result(results)
+    record_evidence(results, 'miss')
     
+    if analysis_cache:
+        analysis_cache.put(file_sha256, results, cache_variant)
+
     return results
 
 # --- Flask Routes (upload_file, download_report, serve_static) ---
 # ... (These routes remain identical to the previous script) ...
 
-@app.route('/download_report', methods=['POST'])
+def get_report_renderer():
+    """The app's report renderer; its worker pool starts on the first render (None if unavailable)."""
+    if ReportRenderer is None:
+        return None
+    state = _state()
+    with state['lock']:
+        if state['report_renderer'] is None:
+            config = current_app.config
+            state['report_renderer'] = ReportRenderer(config['REPORT_CACHE_FOLDER'],
+                                                      workers=config['REPORT_WORKERS'],
+                                                      timeout=config['REPORT_TIMEOUT'],
+                                                      max_disk_bytes=config['REPORT_CACHE_MAX_BYTES'])
+            atexit.register(state['report_renderer'].close)
+    return state['report_renderer']
+
+def local_artifact_uri(artifact_url):
+    """file:// URI of an artifact in the artifact store, so WeasyPrint reads it from disk instead of over HTTP."""
+    artifact_store = _state()['artifact_store']
+    if not artifact_url or artifact_url == "N/A" or artifact_store is None:
+        return "N/A"
+    artifact_path = artifact_store.path(os.path.basename(artifact_url))
+    if artifact_path is None or not os.path.exists(artifact_path):
+        return "N/A"
+    return Path(os.path.abspath(artifact_path)).as_uri()
+
+def report_context(results):
+    """The fields report_template.html uses, taken from stored analysis results."""
+    digest = results.get('digest', {})
+    context = {key: results.get(key, "") for key in ('original_filename', 'conclusion', 'tamper_percentage',
+                                                     'general_summary', 'metadata', 'ela_description')}
+    context.update(
+        evidence=results.get('evidence', []),
+        digest_sha=digest.get('SHA-256', ""),
+        digest_sha1=digest.get('SHA-1', ""),
+        digest_md5=digest.get('MD5', ""),
+        ela_path=local_artifact_uri(results.get('ela_path')),
+        source_code="",
+    )
+    # The interactive hex view does not belong in a PDF; print the file header instead
+    file_path = stored_upload_path(digest['SHA-256']) if digest.get('SHA-256') else None
+    if file_path and hex_page:
+        page = hex_page(file_path, rows=16)
+        context['source_code'] = "<pre>" + '\n'.join(line for _, line in page['rows']) + "</pre>"
+    return context
+
+@bp.route('/download_report', methods=['POST'])
 def download_report():
-    # Capture all data sent from the analysis_result.html form
-    results_data = request.form.to_dict()
-    
-    # Process evidence string back into a list for the template loop
-    evidence_str = results_data.get('evidence', '')
-    results_data['evidence'] = evidence_str.split('\n') if evidence_str else []
-    
-    # Ensure WeasyPrint is available
-    if not HTML or not CSS:
-        return "<p style='color:red;'>Error: WeasyPrint not found on server.</p>", 500
+    # The form only carries the result id; the analysis itself is loaded from the result store
+    result_store = _state()['result_store']
+    results = result_store.load(request.form.get('result_id')) if result_store else None
+    if results is None:
+        return "<p style='color:red;'>Error: This analysis has expired. Please analyze the file again.</p>", 404
 
-    # Render the PDF template with the results dictionary
-    report_html = render_template('report_template.html', 
-                                  results=results_data, 
-                                  report_date=time.strftime("%Y-%m-%d %H:%M:%S"))
+    # WeasyPrint is only imported in the render workers; checking for it here is import-free
+    renderer = get_report_renderer()
+    if renderer is None or not backends.is_installed('weasyprint'):
+        return "<p style='color:red;'>Error: WeasyPrint not found on server.</p>", 500
 
+    key = report_key(results['result_id'])
     try:
-        # Generate PDF
-        pdf_file = HTML(string=report_html, base_url=request.url_root).write_pdf(
-            stylesheets=[CSS(string='@page { size: A4; margin: 1cm; }')]
-        )
-
-        buffer = BytesIO(pdf_file)
-        buffer.seek(0)
-        
-        filename = results_data.get('original_filename', 'Forensic_Report')
-        safe_name = "".join([c for c in filename if c.isalnum() or c in (' ', '.', '_')]).rstrip()
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"JejakPalsu_Report_{safe_name}.pdf",
-            mimetype='application/pdf'
-        )
+        pdf_file = renderer.get(key)
+        if pdf_file is None:
+            report_html = render_template('report_template.html',
+                                          results=report_context(results),
+                                          report_date=time.strftime("%Y-%m-%d %H:%M:%S"))
+            base_url = Path(os.path.abspath(current_app.config['STATIC_FOLDER'])).as_uri() + '/'
+            pdf_file = renderer.render(key, report_html, base_url)
+    except RenderTimeout as e:
+        print(f"PDF Error: {e}")
+        if metrics: metrics.record_error('report_pdf')
+        return f"<p style='color:red;'>Error generating PDF: {e}</p>", 504
+    except ReportUnavailable as e:
+        return f"<p style='color:red;'>Error: {e}</p>", 500
     except Exception as e:
         print(f"PDF Error: {e}")
+        if metrics: metrics.record_error('report_pdf')
         return f"<p style='color:red;'>Error generating PDF: {e}</p>", 500
 
+    filename = results.get('original_filename') or 'Forensic_Report'
+    safe_name = "".join([c for c in filename if c.isalnum() or c in (' ', '.', '_')]).rstrip()
+
+    return send_file(
+        BytesIO(pdf_file),
+        as_attachment=True,
+        download_name=f"JejakPalsu_Report_{safe_name}.pdf",
+        mimetype='application/pdf'
+    )
+
+def __getattr__(name):
+    # `gunicorn app:app` and other WSGI servers look up a module-level app. It is created on first
+    # access, so importing this module (job workers, benchmarks, tests) creates no folders or backends.
+    global app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    app = create_app()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,174 @@
+# benchmarks/corpus.py
+"""
+Reproducible synthetic corpus for the benchmarks: receipt-like JPEGs at
+several resolutions and qualities, PNGs, and multi-page PDFs with and
+without an incremental edit. Everything is drawn locally from fixed seeds,
+so the same Pillow/NumPy versions always produce byte-identical files.
+
+    python benchmarks/corpus.py benchmarks/.corpus
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Bump whenever the generated files change, so stale corpora are rebuilt.
+CORPUS_VERSION = "1"
+FIXED_DATE = time.gmtime(1735689600)  # 2025-01-01, keeps PDF dates reproducible
+
+RESOLUTIONS = {
+    'small': (800, 1400),     # phone screenshot
+    'medium': (1654, 2339),   # A4 at 200 dpi
+    'large': (2480, 3508),    # A4 at 300 dpi
+}
+JPEG_QUALITIES = (75, 92)
+PDF_PAGES = 3
+PDF_PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+
+ITEMS = ("NASI LEMAK", "TEH TARIK", "ROTI CANAI", "MEE GORENG", "AIR SIRAP", "AYAM GORENG",
+         "KUEH LAPIS", "CENDOL", "SATAY (10)", "TOSAI")
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has only the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def receipt_image(size, seed, edited=False):
+    """
+    A receipt-like RGB image: header, item lines, a total and paper noise.
+    With edited=True the total is repainted without noise, the way a
+    digitally altered amount looks, so the analyses have something to find.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    img = Image.new('RGB', size, (250, 248, 242))
+    draw = ImageDraw.Draw(img)
+    line = max(12, height // 45)
+    font, big = _font(int(line * 0.7)), _font(line)
+    margin = width // 12
+
+    draw.text((margin, line), "KEDAI MAKAN JEJAK SDN BHD", fill=(20, 20, 20), font=big)
+    draw.text((margin, line * 2.2), f"No. Resit: {seed:06d}   2025-01-01 12:{seed % 60:02d}", fill=(40, 40, 40), font=font)
+    y, total = line * 4, 0.0
+    for n in range(int(rng.integers(8, 14))):
+        price = float(rng.integers(150, 2500)) / 100
+        total += price
+        draw.text((margin, y), f"{n + 1:2d}  {ITEMS[int(rng.integers(len(ITEMS)))]}", fill=(30, 30, 30), font=font)
+        draw.text((width - margin * 3, y), f"{price:8.2f}", fill=(30, 30, 30), font=font)
+        y += line
+    draw.line((margin, y + line // 2, width - margin, y + line // 2), fill=(60, 60, 60), width=2)
+    total_box = (width - margin * 4, y + line, width - margin, y + line * 2)
+    draw.text((margin, y + line), "JUMLAH", fill=(10, 10, 10), font=big)
+    draw.text(total_box[:2], f"RM {total:7.2f}", fill=(10, 10, 10), font=big)
+
+    # Paper and sensor noise plus a soft lighting gradient
+    pixels = np.asarray(img, dtype=np.float32)
+    pixels += rng.normal(0, 3.0, pixels.shape).astype(np.float32)
+    pixels *= np.linspace(1.0, 0.93, height, dtype=np.float32)[:, None, None]
+    img = Image.fromarray(pixels.clip(0, 255).astype(np.uint8))
+
+    if edited:
+        patch = Image.new('RGB', (total_box[2] - total_box[0], total_box[3] - total_box[1]), (250, 248, 242))
+        ImageDraw.Draw(patch).text((0, 0), f"RM {total * 0.6:7.2f}", fill=(10, 10, 10), font=big)
+        img.paste(patch, total_box[:2])
+    return img
+
+
+def append_incremental_update(pdf_bytes, producer="Canva", mod_date="D:20250102090000Z"):
+    """
+    Appends one incremental update that replaces the Info dictionary, the way
+    an online editor re-saves a document: new object, xref section and a
+    trailer pointing back at the previous one with /Prev.
+    """
+    startxref = int(re.findall(rb'startxref\s+(\d+)', pdf_bytes)[-1])
+    size = int(re.findall(rb'/Size\s+(\d+)', pdf_bytes)[-1])
+    root = re.findall(rb'/Root\s+(\d+\s+\d+\s+R)', pdf_bytes)[-1].decode()
+
+    data = bytearray(pdf_bytes if pdf_bytes.endswith(b'\n') else pdf_bytes + b'\n')
+    offset = len(data)
+    data += (f"{size} 0 obj\n<<\n/Producer ({producer})\n/ModDate ({mod_date})\n>>\nendobj\n").encode()
+    xref_offset = len(data)
+    data += f"xref\n{size} 1\n{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<<\n/Size {size + 1}\n/Root {root}\n/Info {size} 0 R\n/Prev {startxref}\n>>\n".encode()
+    data += f"startxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(data)
+
+
+def _corpus_files():
+    """(name, group, builder) for every corpus file; builder returns the file bytes."""
+    import io
+
+    def jpeg(size, quality, seed, edited):
+        buffer = io.BytesIO()
+        receipt_image(size, seed, edited).save(buffer, 'JPEG', quality=quality)
+        return buffer.getvalue()
+
+    def png(size, seed, edited):
+        buffer = io.BytesIO()
+        receipt_image(size, seed, edited).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def pdf(seed, incremental):
+        pages = [receipt_image(PDF_PAGE_SIZE, seed + n) for n in range(PDF_PAGES)]
+        buffer = io.BytesIO()
+        pages[0].save(buffer, 'PDF', save_all=True, append_images=pages[1:], resolution=150, quality=85,
+                      producer="ScanSnap Manager", creationDate=FIXED_DATE, modDate=FIXED_DATE)
+        data = buffer.getvalue()
+        return append_incremental_update(data) if incremental else data
+
+    files = []
+    for label, size in RESOLUTIONS.items():
+        for quality in JPEG_QUALITIES:
+            group = f"jpeg-{label}-q{quality}"
+            for seed, edited in ((1, False), (2, True)):
+                files.append((f"{group}-{seed}.jpg", group,
+                              lambda s=size, q=quality, n=seed, e=edited: jpeg(s, q, n, e)))
+    for seed, edited in ((3, False), (4, True)):
+        files.append((f"png-medium-{seed}.png", "png-medium",
+                      lambda n=seed, e=edited: png(RESOLUTIONS['medium'], n, e)))
+    for group, incremental in (("pdf-3p", False), ("pdf-3p-incremental", True)):
+        files.append((f"{group}-5.pdf", group, lambda i=incremental: pdf(5, i)))
+    return files
+
+
+def ensure_corpus(folder):
+    """
+    Generates the corpus into folder unless a manifest of the same
+    CORPUS_VERSION is already there. Returns the manifest:
+    {'version', 'files': [{'name', 'group', 'size', 'sha256'}]}.
+    """
+    manifest_path = os.path.join(folder, 'manifest.json')
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == CORPUS_VERSION and all(
+                os.path.exists(os.path.join(folder, entry['name'])) for entry in manifest['files']):
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(folder, exist_ok=True)
+    manifest = {'version': CORPUS_VERSION, 'files': []}
+    for name, group, build in _corpus_files():
+        data = build()
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(data)
+        manifest['files'].append({'name': name, 'group': group, 'size': len(data),
+                                  'sha256': hashlib.sha256(data).hexdigest()})
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '.corpus')
+    for entry in ensure_corpus(target)['files']:
+        print(f"{entry['sha256'][:16]}  {entry['size']:>10,}  {entry['name']}")
@@ -0,0 +1,243 @@
+# benchmarks/run.py
+"""
+Benchmark suite: runs the full web analysis (run_forensic_analysis_web) over
+the synthetic corpus from benchmarks/corpus.py and reports, per corpus
+group, the time of every pipeline stage (from results['timings']; stages
+that run concurrently overlap), peak RSS and files/sec per core. Each group
+runs in a fresh process with one PDF worker, so RSS and per-core numbers
+are not skewed by earlier groups.
+
+    python benchmarks/run.py                        # run, compare with benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline        # record this machine's numbers
+    python benchmarks/run.py --groups jpeg-large-q92,pdf-3p --repeat 5
+    python benchmarks/run.py --pipeline-workers 0   # analyzers one at a time
+    python benchmarks/run.py --ci                   # also fail when there is nothing to compare with
+
+Exits with status 1 when a stage, a group total or the peak RSS is more
+than --tolerance slower/larger than the baseline. Baselines are only
+comparable on the machine that recorded them, so none is committed: a
+missing or stale baseline (or a group the baseline does not cover) is
+reported as a warning, and with --ci (the default when $CI is set) the
+run exits with status 2 instead of passing without having checked anything.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, '.corpus')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_group(corpus, group, repeat, pipeline_workers=None):
+    """
+    Runs in the worker process: analyzes every file of group repeat times
+    and returns {'group', 'files', 'stages': {stage: ms}, 'total_ms',
+    'files_per_sec_per_core', 'rss_mb'} with per-file medians, averaged over files.
+    """
+    sys.path.insert(0, REPO_ROOT)
+    import app as webapp
+
+    with open(os.path.join(corpus, 'manifest.json'), 'r', encoding='utf-8') as f:
+        entries = [e for e in json.load(f)['files'] if e['group'] == group]
+
+    work_dir = tempfile.mkdtemp(prefix='jejakpalsu-bench-')
+    try:
+        config = {
+            'UPLOAD_FOLDER': os.path.join(work_dir, 'uploads'),
+            'STATIC_FOLDER': os.path.join(work_dir, 'static'),
+            'CACHE_FOLDER': os.path.join(work_dir, 'cache'),
+            'RESULTS_FOLDER': os.path.join(work_dir, 'results'),
+            'REPORT_CACHE_FOLDER': os.path.join(work_dir, 'reports'),
+            'JOBS_DB': os.path.join(work_dir, 'jobs.sqlite3'),
+            'PHASH_DB': os.path.join(work_dir, 'phash.sqlite3'),
+            'EVIDENCE_DB': os.path.join(work_dir, 'evidence.sqlite3'),
+            'ADMISSION_DB': os.path.join(work_dir, 'admission.sqlite3'),
+            'PDF_ELA_WORKERS': 1,
+            'RESULT_TIMINGS': True,
+        }
+        if pipeline_workers is not None:
+            config['PIPELINE_WORKERS'] = pipeline_workers
+        app = webapp.create_app(config)
+        state = app.extensions['forensics']
+        per_file = []
+        for entry in entries:
+            samples = []
+            for _ in range(repeat):
+                # Every run is a cold analysis of a fresh upload
+                if state['analysis_cache']:
+                    state['analysis_cache'].clear()
+                if state['artifact_store']:
+                    state['artifact_store'].clear()
+                upload = os.path.join(work_dir, f"upload-{entry['name']}")
+                shutil.copyfile(os.path.join(corpus, entry['name']), upload)
+
+                with app.test_request_context('/'):
+                    results = webapp.run_forensic_analysis_web(upload, entry['name'])
+                stages = dict(results['timings'])
+                samples.append((stages, stages.pop('total')))
+
+            names = list(dict.fromkeys(stage for stages, _ in samples for stage in stages))
+            per_file.append({
+                'stages': {s: statistics.median(st.get(s, 0.0) for st, _ in samples) for s in names},
+                'total_ms': statistics.median(total for _, total in samples),
+            })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stage_names = list(dict.fromkeys(s for f in per_file for s in f['stages']))  # order of completion
+    total_ms = statistics.mean(f['total_ms'] for f in per_file)
+    return {
+        'group': group,
+        'files': len(per_file),
+        'stages': {s: round(statistics.mean(f['stages'].get(s, 0.0) for f in per_file), 2) for s in stage_names},
+        'total_ms': round(total_ms, 2),
+        'files_per_sec_per_core': round(1000.0 / total_ms, 3) if total_ms else None,
+        'rss_mb': round(_peak_rss_mb(), 1) if _peak_rss_mb() is not None else None,
+    }
+
+
+def _run_worker(corpus, group, repeat, pipeline_workers=None):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', group, '--corpus', corpus, '--repeat', str(repeat)]
+    if pipeline_workers is not None:
+        command += ['--pipeline-workers', str(pipeline_workers)]
+    completed = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"benchmark worker for {group} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance, rss_tolerance, min_ms):
+    """
+    Regressions against baseline as messages. Stages faster than min_ms in
+    the baseline are skipped: at that scale timer noise exceeds any tolerance.
+    """
+    regressions = []
+    for group, result in results.items():
+        base = baseline.get('groups', {}).get(group)
+        if base is None:
+            continue
+        checks = [(f"{group} total", result['total_ms'], base['total_ms'])]
+        checks += [(f"{group} {stage}", ms, base['stages'][stage])
+                   for stage, ms in result['stages'].items() if stage in base['stages']]
+        for label, current, previous in checks:
+            if previous >= min_ms and current > previous * (1 + tolerance):
+                regressions.append(f"{label}: {current:.1f} ms vs baseline {previous:.1f} ms "
+                                   f"(+{(current / previous - 1) * 100:.0f}%)")
+        if result['rss_mb'] and base.get('rss_mb') and result['rss_mb'] > base['rss_mb'] * (1 + rss_tolerance):
+            regressions.append(f"{group} RSS: {result['rss_mb']:.0f} MB vs baseline {base['rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_table(results):
+    stages = []
+    for result in results.values():
+        stages += [s for s in result['stages'] if s not in stages]
+    header = f"{'group':<22}" + ''.join(f"{s[:9]:>10}" for s in stages) + f"{'total ms':>11}{'files/s/c':>10}{'RSS MB':>8}"
+    print(header)
+    print('-' * len(header))
+    for group, result in results.items():
+        row = f"{group:<22}" + ''.join(f"{result['stages'].get(s, 0.0):>10.1f}" for s in stages)
+        row += f"{result['total_ms']:>11.1f}{result['files_per_sec_per_core'] or 0:>10.2f}{result['rss_mb'] or 0:>8.0f}"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks of the forensic pipeline.")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="corpus folder (generated if missing)")
+    parser.add_argument('--groups', help="comma-separated corpus groups (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per file; the median is kept")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="groups run in parallel (numbers are only comparable at the same -j)")
+    parser.add_argument('--pipeline-workers', type=int,
+                        help="analyzer threads per file (default: the app's PIPELINE_WORKERS; 0 runs them in turn)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--rss-tolerance', type=float, default=0.25, help="allowed RSS growth")
+    parser.add_argument('--min-ms', type=float, default=10.0, help="ignore stages faster than this in the baseline")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--ci', action=argparse.BooleanOptionalAction, default=bool(os.environ.get('CI')),
+                        help="exit with status 2 when the baseline is missing, stale or incomplete (default: on when $CI is set)")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_group(args.corpus, args.worker, max(1, args.repeat), args.pipeline_workers)))
+        return 0
+
+    sys.path.insert(0, BENCH_DIR)
+    from corpus import ensure_corpus
+    manifest = ensure_corpus(args.corpus)
+    groups = list(dict.fromkeys(entry['group'] for entry in manifest['files']))
+    if args.groups:
+        wanted = args.groups.split(',')
+        unknown = set(wanted) - set(groups)
+        if unknown:
+            parser.error(f"unknown group(s): {', '.join(sorted(unknown))}; available: {', '.join(groups)}")
+        groups = [g for g in groups if g in wanted]
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        outcomes = list(pool.map(lambda g: _run_worker(args.corpus, g, args.repeat, args.pipeline_workers), groups))
+    results = {outcome['group']: outcome for outcome in outcomes}
+    print_table(results)
+
+    report = {
+        'corpus_version': manifest['version'],
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count(), 'jobs': args.jobs, 'repeat': args.repeat,
+                    'pipeline_workers': args.pipeline_workers},
+        'groups': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    unchecked = 2 if args.ci else 0
+    if not os.path.exists(args.baseline):
+        print(f"WARNING: no baseline at {args.baseline}, nothing was compared; "
+              f"run with --save-baseline on this machine to record one.", file=sys.stderr)
+        return unchecked
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('corpus_version') != manifest['version']:
+        print("WARNING: the baseline was recorded on a different corpus version, nothing was compared; "
+              "re-record it with --save-baseline.", file=sys.stderr)
+        return unchecked
+    missing = [group for group in results if group not in baseline.get('groups', {})]
+    if missing:
+        print(f"WARNING: the baseline has no numbers for {', '.join(missing)}; those groups were not compared.",
+              file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance, args.rss_tolerance, args.min_ms)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    if regressions:
+        return 1
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return unchecked if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# benchmarks/startup.py
+"""
+Startup benchmark: how long a fresh worker takes to import app.py and build
+the app, and how much memory it holds once ready. Each run is a new Python
+process, so nothing is shared with earlier runs.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --max-import-ms 1500 --max-rss-mb 150
+
+Exits with status 1 when the median exceeds a budget, or when an optional
+backend (weasyprint, pypdf, pdf2image) was imported during startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('weasyprint', 'pypdf', 'pdf2image')
+
+# Runs in the child process; prints one JSON line.
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({'UPLOAD_FOLDER': sys.argv[1] + '/uploads', 'STATIC_FOLDER': sys.argv[1] + '/static',
+                'CACHE_FOLDER': sys.argv[1] + '/cache', 'JOBS_DB': sys.argv[1] + '/jobs.sqlite3'})
+ready = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+except ImportError:  # Windows
+    rss_mb = None
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (ready - imported) * 1000,
+    'rss_mb': rss_mb,
+    'eager_backends': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once(work_dir):
+    """One cold start in a child process. Returns the probe's JSON dict."""
+    completed = subprocess.run([sys.executable, '-c', PROBE, work_dir], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(runs):
+    """Medians over runs cold starts: {'runs', 'import_ms', 'create_app_ms', 'rss_mb', 'eager_backends'}."""
+    samples = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(runs):
+            samples.append(measure_once(work_dir))
+    rss = [s['rss_mb'] for s in samples if s['rss_mb'] is not None]
+    return {
+        'runs': runs,
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'create_app_ms': round(statistics.median(s['create_app_ms'] for s in samples), 1),
+        'rss_mb': round(statistics.median(rss), 1) if rss else None,
+        'eager_backends': sorted({name for s in samples for name in s['eager_backends']}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app.py cold-start time and memory.")
+    parser.add_argument('--runs', type=int, default=5, help="cold starts to take the median of")
+    parser.add_argument('--max-import-ms', type=float, default=1500.0, help="budget for import + create_app")
+    parser.add_argument('--max-rss-mb', type=float, default=150.0, help="budget for peak RSS once ready")
+    args = parser.parse_args(argv)
+
+    result = run(max(1, args.runs))
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    startup_ms = result['import_ms'] + result['create_app_ms']
+    if startup_ms > args.max_import_ms:
+        failures.append(f"startup took {startup_ms:.0f} ms (budget {args.max_import_ms:.0f} ms)")
+    if result['rss_mb'] is not None and result['rss_mb'] > args.max_rss_mb:
+        failures.append(f"RSS is {result['rss_mb']:.0f} MB (budget {args.max_rss_mb:.0f} MB)")
+    if result['eager_backends']:
+        failures.append(f"optional backends imported at startup: {', '.join(result['eager_backends'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+# forensic_tools/__init__.py
+
+# This file makes the 'forensic_tools' directory a Python package.
+
+# The helpers below are imported on first use (PEP 562), so importing any
+# submodule does not pull in numpy and Pillow: pipeline, admission, jobs,
+# ingest, pdf_revisions and image_metadata need only the standard library.
+import importlib
+
+_EXPORTS = {
+    "perform_ela": ".ela",
+    "compute_ela": ".ela",
+    "check_metadata": ".metadata_check",
+    "check_file_signature": ".metadata_check",
+    "get_dct_coefficients": ".dct_analysis",
+}
+
+__all__ = [
+    "perform_ela",
+    "compute_ela",
+    "check_metadata",
+    "check_file_signature",
+    "get_dct_coefficients"
+]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,347 @@
+# forensic_tools/admission.py
+"""
+Admission control: decide from a file's header alone how much memory its
+analysis will need, before a single pixel is decoded.
+
+estimate_cost reads the JPEG frame header (SOFn), the PNG IHDR chunk or the
+PDF MediaBox and page count, and predicts the analysis's peak memory. A
+12-byte header can claim a 60000x60000 image, so this is also the guard
+against decompression bombs. decide turns the estimate into a decision:
+
+    admit      - fits the per-analysis limits as it is
+    downscale  - fits once a JPEG is decoded at 1/2, 1/4 or 1/8 scale
+                 (Pillow draft mode, in the DCT domain) or PDF pages are
+                 rasterized at a lower DPI
+    reject     - does not fit at any size
+
+MemoryBudget then holds the admitted analyses of every process on the node
+to a shared total: an analysis waits ("queue") until its bytes fit.
+
+Stdlib only, so the package can always import it.
+"""
+import math
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager, nullcontext
+from functools import partial
+
+from .ingest import open_mapped
+from .jobs import Heartbeat, pid_alive
+
+ADMIT = 'admit'
+QUEUE = 'queue'
+DOWNSCALE = 'downscale'
+REJECT = 'reject'
+
+# Peak memory model, calibrated by measuring peak RSS over full analyses of 5-30 MP scans
+ANALYSIS_OVERHEAD = 256 * 1024 * 1024   # re-save buffers, thread pools and strips that do not grow with the image
+IMAGE_BYTES_PER_PIXEL = 20              # decoded image, RGB array for ELA, grayscale copy and the analyzers' arrays
+TILED_BYTES_PER_PIXEL = 10              # scans ELA processes in strips (see ELA_TILED_MIN_PIXELS)
+PDF_PROCESS_BYTES = 96 * 1024 * 1024    # each page worker process
+PDF_BYTES_PER_PIXEL = 24                # one rasterized page and its ELA arrays, per worker
+PDF_DEFAULT_PAGE = (612.0, 792.0)       # US Letter, assumed when no MediaBox is visible (compressed object streams)
+JPEG_SCALES = (2, 4, 8)
+MAX_HEADER_SEGMENTS = 512
+
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}   # palette images are expanded to RGB by the analyzers
+_MEDIA_BOX = re.compile(rb'/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]')
+_PAGE_COUNT = re.compile(rb'/Count\s+(\d{1,7})\b')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    label TEXT,
+    expires REAL NOT NULL
+);
+"""
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when an analysis cannot run: too large at any size (status 413),
+    or the memory budget stayed full for the whole wait (status 503).
+    admission is the decision dict.
+    """
+
+    def __init__(self, message, admission=None, status=413):
+        super().__init__(message)
+        self.admission = admission
+        self.status = status
+
+
+def _jpeg_frame(view):
+    """(width, height, components) from the first SOFn segment, walking the marker segments only."""
+    pos, size = 2, len(view)
+    for _ in range(MAX_HEADER_SEGMENTS):
+        while pos < size and view[pos] == 0xFF and pos + 1 < size and view[pos + 1] == 0xFF:
+            pos += 1    # fill bytes
+        if pos + 4 > size or view[pos] != 0xFF:
+            return None
+        marker = view[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in (0xDA, 0xD9):
+            return None   # scan data before any frame header
+        length = int.from_bytes(view[pos + 2:pos + 4], 'big')
+        if marker in SOF_MARKERS:
+            payload = bytes(view[pos + 4:pos + 10])
+            if len(payload) < 6:
+                return None
+            return int.from_bytes(payload[3:5], 'big'), int.from_bytes(payload[1:3], 'big'), payload[5]
+        pos += 2 + length
+    return None
+
+
+def _png_header(view):
+    """(width, height, channels, bit depth) from the IHDR chunk, which must come first."""
+    header = bytes(view[8:29])
+    if len(header) < 21 or header[4:8] != b'IHDR':
+        return None
+    width, height = int.from_bytes(header[8:12], 'big'), int.from_bytes(header[12:16], 'big')
+    return width, height, PNG_CHANNELS.get(header[17], 4), header[16]
+
+
+def _pdf_pages(view):
+    """(largest MediaBox (width, height) in points or None, page count or None)."""
+    largest = None
+    for match in _MEDIA_BOX.finditer(view):
+        try:
+            x0, y0, x1, y1 = (float(v) for v in match.groups())
+        except ValueError:
+            continue
+        box = (abs(x1 - x0), abs(y1 - y0))
+        if largest is None or box[0] * box[1] > largest[0] * largest[1]:
+            largest = box
+    counts = [int(m.group(1)) for m in _PAGE_COUNT.finditer(view)]
+    return largest, (max(counts) if counts else None)
+
+
+def image_bytes(pixels, tiled_min_pixels=None):
+    """Predicted peak memory of analyzing a decoded image of this many pixels."""
+    tiled = tiled_min_pixels is not None and pixels >= tiled_min_pixels
+    return ANALYSIS_OVERHEAD + pixels * (TILED_BYTES_PER_PIXEL if tiled else IMAGE_BYTES_PER_PIXEL)
+
+
+def pdf_bytes(page_pixels, concurrent_pages):
+    """Predicted peak memory of rasterizing pages of this size, concurrent_pages at a time."""
+    return ANALYSIS_OVERHEAD + concurrent_pages * (PDF_PROCESS_BYTES + page_pixels * PDF_BYTES_PER_PIXEL)
+
+
+def _page_pixels(box, dpi):
+    return math.ceil(box[0] / 72 * dpi) * math.ceil(box[1] / 72 * dpi)
+
+
+def estimate_cost(source, file_type, dpi=150, first_page=1, last_page=None, max_pages=None, workers=1,
+                  tiled_min_pixels=None):
+    """
+    Header-only cost of analyzing a file: source is a path or a bytes-like
+    view (e.g. from ingest.open_mapped). PDFs are costed at dpi, with
+    min(workers, pages to analyze) pages rasterized at a time.
+
+    Returns {'kind' ('jpeg', 'png', 'pdf' or None), 'width', 'height' (pixels;
+    per page for PDFs), 'pixels', 'pages', 'page_size' (points), 'dpi',
+    'concurrent_pages', 'bytes' (predicted peak memory), 'assumed' (True when
+    the page size had to be guessed), 'error'}. An unreadable header costs
+    ANALYSIS_OVERHEAD: the decoders will refuse the file anyway.
+    """
+    estimate = {'kind': None, 'width': None, 'height': None, 'pixels': 0, 'pages': None, 'page_size': None,
+                'dpi': None, 'concurrent_pages': None, 'bytes': ANALYSIS_OVERHEAD, 'assumed': False, 'error': None}
+    file_type = file_type.lower()
+    with (open_mapped(source) if isinstance(source, (str, os.PathLike)) else nullcontext(source)) as view:
+        if file_type in ('jpg', 'jpeg'):
+            frame = _jpeg_frame(view) if bytes(view[:2]) == b'\xff\xd8' else None
+            if frame is None:
+                estimate['error'] = "no JPEG frame header"
+                return estimate
+            estimate.update(kind='jpeg', width=frame[0], height=frame[1])
+        elif file_type == 'png':
+            header = _png_header(view) if bytes(view[:8]) == b'\x89PNG\r\n\x1a\n' else None
+            if header is None:
+                estimate['error'] = "no PNG IHDR chunk"
+                return estimate
+            estimate.update(kind='png', width=header[0], height=header[1])
+        elif file_type == 'pdf':
+            box, page_count = _pdf_pages(view)
+            if box is None:
+                box, estimate['assumed'] = PDF_DEFAULT_PAGE, True
+            last = min(page_count, last_page or page_count) if page_count else last_page
+            pages = (last - max(1, first_page) + 1) if last else None
+            if max_pages:
+                pages = min(pages, max_pages) if pages else max_pages
+            pages = max(1, pages or 1)
+            estimate.update(kind='pdf', width=math.ceil(box[0] / 72 * dpi), height=math.ceil(box[1] / 72 * dpi),
+                            pages=pages, dpi=dpi, concurrent_pages=max(1, min(workers or 1, pages)),
+                            page_size=box)
+        else:
+            estimate['error'] = f"unsupported file type {file_type!r}"
+            return estimate
+
+    estimate['pixels'] = estimate['width'] * estimate['height']
+    if estimate['kind'] == 'pdf':
+        estimate['bytes'] = pdf_bytes(estimate['pixels'], estimate['concurrent_pages'])
+    else:
+        estimate['bytes'] = image_bytes(estimate['pixels'], tiled_min_pixels)
+    return estimate
+
+
+def decide(estimate, max_bytes, max_pixels, min_dpi=72, max_source_pixels=None, tiled_min_pixels=None):
+    """
+    Admission decision for an estimate: {'decision' (admit, downscale or
+    reject), 'reason', 'bytes' (memory to reserve), 'scale' (JPEG decode
+    divisor) or 'dpi' (PDF rasterization DPI) when downscaled, 'estimate'}.
+    max_pixels bounds the decoded image (each PDF page); max_source_pixels,
+    if given, bounds what a JPEG may claim before draft decoding is refused too.
+    tiled_min_pixels is the one estimate_cost was given.
+    """
+    kind, pixels = estimate['kind'], estimate['pixels']
+    admission = {'decision': ADMIT, 'reason': None, 'bytes': estimate['bytes'], 'scale': None, 'dpi': None,
+                 'estimate': estimate}
+    if kind is None or (estimate['bytes'] <= max_bytes and pixels <= max_pixels):
+        return admission
+
+    megapixels = f"{estimate['width']}x{estimate['height']} ({pixels / 1e6:.1f} MP)"
+    if kind == 'jpeg' and (max_source_pixels is None or pixels <= max_source_pixels):
+        for scale in JPEG_SCALES:
+            scaled = math.ceil(estimate['width'] / scale) * math.ceil(estimate['height'] / scale)
+            cost = image_bytes(scaled, tiled_min_pixels)
+            if cost <= max_bytes and scaled <= max_pixels:
+                admission.update(decision=DOWNSCALE, bytes=cost, scale=scale,
+                                 reason=f"{megapixels} decoded at 1/{scale} scale")
+                return admission
+    elif kind == 'pdf' and max_bytes > ANALYSIS_OVERHEAD:
+        box, concurrent = estimate['page_size'], estimate['concurrent_pages']
+        dpi = estimate['dpi']
+        while dpi >= min_dpi:
+            page_pixels = _page_pixels(box, dpi)
+            cost = pdf_bytes(page_pixels, concurrent)
+            if cost <= max_bytes and page_pixels <= max_pixels:
+                admission.update(decision=DOWNSCALE, bytes=cost, dpi=dpi,
+                                 reason=f"{megapixels} pages rasterized at {dpi} DPI instead of {estimate['dpi']}")
+                return admission
+            # Pixels grow with the square of the DPI
+            dpi = min(dpi - 1, int(dpi * math.sqrt(min(max_pixels / page_pixels,
+                                                       (max_bytes - ANALYSIS_OVERHEAD) / (cost - ANALYSIS_OVERHEAD)))))
+
+    what = "each page" if kind == 'pdf' else "the image"
+    admission.update(decision=REJECT, reason=f"{what} is {megapixels} and needs ~{estimate['bytes'] / 2**20:,.0f} MB "
+                                             f"to analyze, over the limit even when reduced")
+    return admission
+
+
+class MemoryBudget:
+    """
+    Decode memory shared by every analysis on the node: the web process's
+    threads and the job worker processes hold leases of their estimated
+    bytes in one SQLite file, and an analysis only starts once its lease
+    fits under total_bytes. Like JobQueue, every call opens its own
+    connection.
+
+    Held through hold(), a lease is renewed while its holder works, however
+    long that takes. A lease whose process is gone is reclaimed at once, and
+    one that has not been renewed for lease_seconds (a hung holder, a reused
+    pid) is reclaimed too.
+    """
+
+    def __init__(self, db_path, total_bytes, lease_seconds=120, poll_interval=0.05):
+        self.db_path = db_path
+        self.total_bytes = total_bytes
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _reclaim(conn, now):
+        """Deletes expired leases and those of processes that no longer exist."""
+        stale = [(lease_id,) for lease_id, pid, expires in conn.execute("SELECT id, pid, expires FROM leases")
+                 if expires < now or not pid_alive(pid)]
+        conn.executemany("DELETE FROM leases WHERE id = ?", stale)
+
+    def try_acquire(self, nbytes, label=None):
+        """
+        Takes a lease of nbytes if it fits now and returns its id, else None.
+        A lease larger than the whole budget is granted when nothing else
+        holds one, so it runs alone instead of never.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn, now)
+            used = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM leases").fetchone()[0]
+            if used and used + nbytes > self.total_bytes:
+                conn.execute("COMMIT")
+                return None
+            lease_id = conn.execute("INSERT INTO leases (bytes, pid, label, expires) VALUES (?, ?, ?, ?)",
+                                    (int(nbytes), os.getpid(), label, now + self.lease_seconds)).lastrowid
+            conn.execute("COMMIT")
+            return lease_id
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, nbytes, timeout=60, label=None):
+        """Waits up to timeout seconds for a lease. Returns (lease id or None on timeout, seconds waited)."""
+        started = time.monotonic()
+        while True:
+            lease_id = self.try_acquire(nbytes, label)
+            waited = time.monotonic() - started
+            if lease_id is not None or waited >= timeout:
+                return lease_id, waited
+            time.sleep(self.poll_interval)
+
+    def renew(self, lease_id):
+        """Extends a lease by lease_seconds from now."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE leases SET expires = ? WHERE id = ?", (time.time() + self.lease_seconds, lease_id))
+        finally:
+            conn.close()
+
+    def release(self, lease_id):
+        if lease_id is None:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+        finally:
+            conn.close()
+
+    @contextmanager
+    def hold(self, lease_id):
+        """Renews the lease every lease_seconds / 4 for the duration of a with block, then releases it."""
+        try:
+            with Heartbeat(partial(self.renew, lease_id), self.lease_seconds / 4):
+                yield lease_id
+        finally:
+            self.release(lease_id)
+
+    def in_use(self):
+        """Bytes held by live leases."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn, time.time())
+            used = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM leases").fetchone()[0]
+            conn.execute("COMMIT")
+            return used
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
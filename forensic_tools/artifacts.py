@@ -0,0 +1,188 @@
+# forensic_tools/artifacts.py
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+from PIL import Image, features
+
+PREVIEW_MAX_SIZE = 1024
+# Expired files are only noticed by a sweep; sweep at least this often while writing
+SWEEP_INTERVAL = 3600
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*\.(jpg|webp)$')
+MIMETYPES = {'jpg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+def preview_name(name):
+    """Name of an artifact's preview: ELA_<key>.jpg -> ELA_<key>-preview.webp (or .jpg without WebP support)."""
+    stem = name.rsplit('.', 1)[0]
+    return f"{stem}-preview.{'webp' if features.check('webp') else 'jpg'}"
+
+
+def encode_preview(image, max_size=PREVIEW_MAX_SIZE):
+    """A downscaled copy of image as WebP, or as a progressive JPEG where Pillow lacks WebP."""
+    preview = image.convert('RGB') if image.mode != 'RGB' else image.copy()
+    preview.thumbnail((max_size, max_size), Image.BILINEAR)
+    buffer = io.BytesIO()
+    if features.check('webp'):
+        preview.save(buffer, format='WEBP', quality=80, method=4)
+    else:
+        preview.save(buffer, format='JPEG', quality=85, progressive=True, optimize=True)
+    return buffer.getvalue()
+
+
+class ArtifactStore:
+    """
+    Image artifacts of analyses (ELA, noise and clone heatmaps) in one folder.
+
+    Names are derived from the analyzed file's content hash, so a name always
+    refers to the same bytes and can be served as immutable. A file is never
+    rewritten once it exists. The folder is kept under max_bytes by deleting
+    the least recently used files (by mtime, refreshed when served), and
+    files not used for ttl seconds are deleted by the periodic sweep.
+
+    Worker processes keep their own byte count; every sweep re-reads the folder,
+    so the counts converge on the next sweep.
+    """
+
+    def __init__(self, folder, max_bytes=512 * 1024 * 1024, ttl=7 * 24 * 3600, preview_max_size=PREVIEW_MAX_SIZE):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.preview_max_size = preview_max_size
+        self._etags = {}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._disk_bytes = self.sweep()
+
+    def path(self, name):
+        """Absolute path of a valid artifact name (whether or not it exists), or None."""
+        if not name or not NAME_PATTERN.match(name):
+            return None
+        return os.path.join(self.folder, name)
+
+    def exists(self, name):
+        path = self.path(name)
+        return path is not None and os.path.exists(path)
+
+    def mimetype(self, name):
+        return MIMETYPES[name.rsplit('.', 1)[1]]
+
+    def save_bytes(self, name, data):
+        """Writes an encoded artifact unless it already exists. Returns False if it could not be written."""
+        path = self.path(name)
+        if path is None:
+            raise ValueError(f"Invalid artifact name: {name!r}")
+        if os.path.exists(path):
+            return True
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            st = os.stat(path)
+        except OSError as e:
+            print(f"  [ARTIFACT ERROR] Could not write {name}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        with self._lock:
+            self._etags[name] = (st.st_ino, st.st_size, hashlib.sha256(data).hexdigest()[:32])
+            self._disk_bytes += len(data)
+            due = self._disk_bytes > self.max_bytes or (self.ttl and time.time() - self._last_sweep > SWEEP_INTERVAL)
+        if due:
+            self.sweep()
+        return True
+
+    def save_image(self, name, image, preview=False, **save_args):
+        """
+        Saves a PIL image as a JPEG artifact, and with preview=True also its
+        downscaled preview under preview_name(name). Existing files are not
+        re-encoded. Returns False if a file could not be written.
+        """
+        if not self.exists(name):
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', **save_args)
+            if not self.save_bytes(name, buffer.getvalue()):
+                return False
+        small_name = preview_name(name)
+        if preview and not self.exists(small_name):
+            return self.save_bytes(small_name, encode_preview(image, self.preview_max_size))
+        return True
+
+    def etag(self, name):
+        """
+        Strong ETag of an artifact: a hash of its bytes, computed once per file.
+        Files are replaced, never rewritten, so (inode, size) identifies the bytes
+        even though touch() keeps changing the mtime.
+        """
+        path = self.path(name)
+        st = os.stat(path)
+        with self._lock:
+            known = self._etags.get(name)
+        if known and known[:2] == (st.st_ino, st.st_size):
+            return known[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+        with self._lock:
+            self._etags[name] = (st.st_ino, st.st_size, etag)
+        return etag
+
+    def touch(self, name):
+        """Marks an artifact as recently used, so LRU eviction keeps it."""
+        try:
+            os.utime(self.path(name))
+        except (OSError, TypeError):
+            pass
+
+    def sweep(self):
+        """
+        Deletes artifacts unused for ttl seconds, then the least recently used
+        ones until the folder is under 90% of max_bytes. Returns the bytes that remain.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.folder):
+            if not NAME_PATTERN.match(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, name in sorted(entries):
+            expired = self.ttl and now - mtime > self.ttl
+            if not expired and total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+                total -= size
+            except OSError:
+                continue
+            with self._lock:
+                self._etags.pop(name, None)
+
+        with self._lock:
+            self._disk_bytes = total
+            self._last_sweep = now
+        return total
+
+    def clear(self):
+        for name in os.listdir(self.folder):
+            if NAME_PATTERN.match(name):
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+        with self._lock:
+            self._etags.clear()
+            self._disk_bytes = 0
@@ -0,0 +1,72 @@
+# forensic_tools/backends.py
+"""
+Optional backends that are imported on first use instead of at startup.
+
+WeasyPrint in particular costs hundreds of milliseconds and tens of MB per
+process, yet only the PDF report download needs it. load() imports a
+backend once per process (thread-safe) and remembers the outcome, so a
+missing dependency is reported the same way every time.
+"""
+import importlib
+import importlib.util
+import threading
+import time
+
+# package name -> (module to import, feature that needs it)
+BACKENDS = {
+    'weasyprint': ('weasyprint', "PDF report download"),
+    'pypdf': ('pypdf', "PDF metadata fallback for compressed Info dictionaries"),
+    'pdf2image': ('forensic_tools.pdf_handler', "PDF page ELA (pdf2image + Poppler)"),
+}
+
+_lock = threading.Lock()
+_loaded = {}  # name -> {'module', 'error', 'import_ms'}
+
+
+def load(name):
+    """Imports backend name on first call; returns the module, or None if it is unavailable."""
+    state = _loaded.get(name)
+    if state is None:
+        with _lock:
+            state = _loaded.get(name)
+            if state is None:
+                module_name, _ = BACKENDS[name]
+                started = time.perf_counter()
+                try:
+                    state = {'module': importlib.import_module(module_name), 'error': None}
+                except Exception as e:  # ImportError, or OSError for missing native libraries
+                    state = {'module': None, 'error': f"{type(e).__name__}: {e}"}
+                    print(f"WARNING: {name} could not be loaded ({state['error']}). {BACKENDS[name][1]} is unavailable.")
+                state['import_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                _loaded[name] = state
+    return state['module']
+
+
+def is_installed(package):
+    """True if package can be imported, checked without importing it."""
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def capabilities(load_all=False):
+    """
+    Status of every backend without importing it (unless load_all):
+    {'<name>': {'feature', 'installed', 'loaded', 'available', 'error', 'import_ms'}}.
+    'available' is None until the backend has been loaded once.
+    """
+    report = {}
+    for name, (_, feature) in BACKENDS.items():
+        if load_all:
+            load(name)
+        state = _loaded.get(name)
+        report[name] = {
+            'feature': feature,
+            'installed': is_installed(name),
+            'loaded': state is not None,
+            'available': None if state is None else state['module'] is not None,
+            'error': state['error'] if state else None,
+            'import_ms': state['import_ms'] if state else None,
+        }
+    return report
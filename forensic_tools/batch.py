@@ -0,0 +1,234 @@
+# forensic_tools/batch.py
+"""
+Batch mode: analyzes every receipt in a directory (or listed in a manifest)
+across a process pool and writes one JSON line per file.
+
+    python -m forensic_tools.batch receipts/ -o results.jsonl -j 8
+    python -m forensic_tools.batch --manifest nightly.txt -o results.jsonl
+    python -m forensic_tools.batch receipts/ -o results.jsonl --index phash.sqlite3
+
+The output file doubles as the checkpoint: re-running the same command
+skips every path already recorded there, so an interrupted run resumes
+where it stopped. Nothing is written to the CWD and no browser is opened.
+With --index, every file's perceptual hashes are added to that index (the
+web app's PHASH_DB) and each record lists the similar files found there.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from pdf2image import convert_from_path
+from PIL import Image
+
+from .ela import compute_ela, compute_ela_tiled, ela_score
+from .ingest import ingest_file, signature_matches_extension
+from .jpeg_markers import analyze_jpeg
+from .main import conclude
+from .metadata_check import check_metadata
+from .pdf_handler import get_pdf_page_count
+from .pdf_revisions import editing_tools, scan_pdf_file
+from .phash import HashIndex, image_hashes, to_hex
+
+SUPPORTED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'pdf'}
+ELA_QUALITY = 90
+# Larger images are analyzed in strips to keep each worker's memory bounded
+TILED_MIN_PIXELS = 12_000_000
+
+
+def iter_directory(root):
+    """Yields supported files below root in a stable (sorted) order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.rsplit('.', 1)[-1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(dirpath, name)
+
+
+def iter_manifest(manifest_path):
+    """Yields paths from a manifest: one path per line, blank lines and '#' comments ignored."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def load_checkpoint(output_path):
+    """
+    Returns the set of paths already recorded in the JSONL output. A partial
+    last line (from a run killed mid-write) is truncated so the file stays valid.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    valid_bytes = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['path'])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+
+    if valid_bytes != os.path.getsize(output_path):
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def _pdf_page_ela(file_path, max_pages, dpi):
+    pages = []
+    for page_number in range(1, min(get_pdf_page_count(file_path), max_pages) + 1):
+        images = convert_from_path(file_path, dpi=dpi, first_page=page_number,
+                                   last_page=page_number, thread_count=1)
+        if not images:
+            continue
+        result = compute_ela(images[0], quality=ELA_QUALITY)
+        hashes = to_hex(image_hashes(images[0]))
+        images[0].close()
+        pages.append({'page': page_number, 'stats': result['stats'], 'score': ela_score(result['stats']),
+                      'hashes': hashes})
+    return pages
+
+
+def analyze_file(file_path, max_pages=5, dpi=150):
+    """
+    Runs the forensic checks on one file and returns a JSON-serializable
+    record with digests, scores and findings. Never raises: failures are
+    reported in the record's 'error' field.
+    """
+    started = time.perf_counter()
+    record = {'path': file_path, 'findings': []}
+    try:
+        extension = file_path.rsplit('.', 1)[-1].lower()
+        ingest = ingest_file(file_path)
+        record.update({key: ingest[key] for key in ('size', 'sha256', 'sha1', 'md5', 'file_type', 'signature_status')})
+
+        tamper_score = 0
+        if ingest['file_type'] is None or not signature_matches_extension(ingest['file_type'], extension):
+            tamper_score += 3
+            record['findings'].append("HEX ALERT: File signature is suspicious or inconsistent with the file extension.")
+
+        jpeg = None
+        if extension in ('jpg', 'jpeg'):
+            # Header-only check; a JPEG whose headers do not parse is not worth decoding
+            jpeg = analyze_jpeg(file_path)
+            record['jpeg'] = {key: jpeg[key] for key in ('valid', 'error', 'quality', 'quality_exact', 'encoder', 'subsampling', 'indicators', 'notes')}
+            if jpeg['indicators'] or not jpeg['valid']:
+                tamper_score += 2
+                record['findings'].extend(f"JPEG ALERT: {indicator}" for indicator in jpeg['indicators'])
+
+        if extension == 'pdf':
+            revisions = scan_pdf_file(file_path)
+            record['pdf'] = {key: revisions[key] for key in ('version', 'linearized', 'incremental_updates', 'software', 'error')}
+            if revisions['incremental_updates']:
+                tamper_score += 2
+                record['findings'].append(f"PDF ALERT: {revisions['incremental_updates']} incremental update(s) after the original save.")
+            tools = editing_tools(revisions['software'])
+            if tools:
+                record['findings'].append(f"METADATA ALERT: PDF producer history mentions editing tools ({', '.join(tools)}).")
+            record['ela_pages'] = _pdf_page_ela(file_path, max_pages, dpi)
+            record['ela_score'] = max((p['score'] for p in record['ela_pages']), default=None)
+            record['perceptual_hashes'] = [dict(p.pop('hashes'), page=p['page']) for p in record['ela_pages']]
+        else:
+            # One open (and at most one decode) serves the metadata check, ELA and the hashes
+            with Image.open(file_path) as image:
+                metadata_results, _ = check_metadata(file_path)
+                findings = metadata_results.pop('Findings', [])
+                record['metadata'] = {key: str(value) for key, value in metadata_results.items()}
+                if metadata_results.get('TAMPER_ALERT') == "High":
+                    tamper_score += 4
+                record['findings'].extend(f"METADATA ALERT: {finding}" for finding in findings)
+
+                if jpeg is None or jpeg['valid']:
+                    image.load()
+                    ela_function = compute_ela_tiled if image.width * image.height >= TILED_MIN_PIXELS else compute_ela
+                    ela = ela_function(image, quality=ELA_QUALITY)
+                    record['ela_stats'] = ela['stats']
+                    record['ela_score'] = ela_score(ela['stats'])
+                    record['perceptual_hashes'] = [dict(to_hex(image_hashes(image)), page=0)]
+
+        conclusion, _, tamper_percentage = conclude(tamper_score)
+        record.update(tamper_score=tamper_score, tamper_percentage=round(tamper_percentage, 1), conclusion=conclusion)
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    record['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+def _analyze_task(args):
+    return analyze_file(*args)
+
+
+def _index_record(hash_index, record):
+    # Runs in the parent process, so the index has a single writer
+    pages = [(entry['page'], {name: int(entry[name], 16) for name in ('ahash', 'dhash', 'phash')})
+             for entry in record.get('perceptual_hashes', [])]
+    if not pages:
+        return
+    record['similar'] = hash_index.similar(pages, exclude_sha256=record['sha256'])
+    hash_index.add(record['sha256'], pages, os.path.basename(record['path']))
+
+
+def run_batch(paths, output_path, workers=None, max_pages=5, dpi=150, restart=False, progress_every=100,
+              index_path=None):
+    """
+    Analyzes paths across a process pool, appending one JSON line per file
+    to output_path. With index_path, files are also added to that perceptual-hash
+    index and matched against it. Returns (processed, skipped) counts.
+    """
+    if restart and os.path.exists(output_path):
+        os.remove(output_path)
+    done = load_checkpoint(output_path)
+
+    pending = ((path, max_pages, dpi) for path in paths if path not in done)
+    processed = 0
+    started = time.perf_counter()
+    hash_index = HashIndex(index_path) if index_path else None
+
+    with open(output_path, 'a', encoding='utf-8') as out, Pool(processes=workers) as pool:
+        for record in pool.imap_unordered(_analyze_task, pending, chunksize=4):
+            if hash_index:
+                _index_record(hash_index, record)
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+            processed += 1
+            if progress_every and processed % progress_every == 0:
+                rate = processed / (time.perf_counter() - started)
+                print(f"[INFO] {processed} files analyzed ({rate:.1f} files/sec)", file=sys.stderr)
+
+    return processed, len(done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Batch forensic analysis of receipts and documents. Writes one JSON line per file."
+    )
+    parser.add_argument("directory", nargs='?', help="Directory to scan recursively for JPG, PNG and PDF files")
+    parser.add_argument("--manifest", help="Text file listing one path per line (instead of a directory)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file; also used as the resume checkpoint")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-pages", type=int, default=5, help="Maximum PDF pages to run ELA on per file")
+    parser.add_argument("--dpi", type=int, default=150, help="Rasterization DPI for PDF pages")
+    parser.add_argument("--restart", action="store_true", help="Ignore the existing output and start over")
+    parser.add_argument("--index", help="Perceptual-hash index (SQLite) to add files to and search for similar ones")
+    args = parser.parse_args(argv)
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("give either a directory or --manifest")
+
+    paths = iter_manifest(args.manifest) if args.manifest else iter_directory(args.directory)
+    processed, skipped = run_batch(paths, args.output, workers=args.workers, max_pages=args.max_pages,
+                                   dpi=args.dpi, restart=args.restart, index_path=args.index)
+    print(f"[SUCCESS] {processed} files analyzed, {skipped} already in {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
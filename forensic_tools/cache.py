@@ -0,0 +1,225 @@
+# forensic_tools/cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Bump whenever the analysis output changes, so stale cached results are ignored.
+ANALYZER_VERSION = "21"
+
+
+def cache_key(sha256, variant=""):
+    """Builds the cache key from the file's content hash, analyzer version and options."""
+    key = f"{sha256}-v{ANALYZER_VERSION}"
+    return f"{key}-{variant}" if variant else key
+
+
+def artifact_name(sha256, prefix="ELA", suffix="", ext="jpg"):
+    """Content-addressed file name for an analysis artifact, e.g. ELA_<sha256>-v1_p2.jpg."""
+    return f"{prefix}_{cache_key(sha256)}{suffix}.{ext}"
+
+
+class AnalysisCache:
+    """
+    Two-tier cache for analysis results keyed by content hash.
+
+    Tier 1 is an in-process LRU of result dicts. Tier 2 is a folder of JSON
+    files; when it grows beyond max_disk_bytes the least recently used files
+    (by modification time, refreshed on every hit) are evicted.
+    """
+
+    def __init__(self, cache_dir, max_entries=128, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((name, st.st_size, st.st_mtime))
+        return entries
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, sha256, variant=""):
+        """Returns the cached result dict, or None on a miss."""
+        key = cache_key(sha256, variant)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._remember(key, result)
+        return result
+
+    def put(self, sha256, result, variant=""):
+        """Stores a JSON-serializable result dict in both tiers."""
+        key = cache_key(sha256, variant)
+        with self._lock:
+            self._remember(key, result)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            new_size = os.path.getsize(path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"  [CACHE ERROR] Could not write cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += new_size - old_size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop the oldest entries until the folder is back under 90% of its budget.
+        target = self.max_disk_bytes * 0.9
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        self._disk_bytes = sum(size for _, size, _ in entries)
+        for name, size, _ in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                self._disk_bytes -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for name, _, _ in self._disk_entries():
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+
+def prune_folder(folder, max_bytes, suffix):
+    """
+    Deletes the least recently used (oldest mtime) files ending in suffix until
+    the folder is back under 90% of max_bytes. Returns the bytes that remain.
+    """
+    entries = []
+    for name in os.listdir(folder):
+        if not name.endswith(suffix):
+            continue
+        try:
+            st = os.stat(os.path.join(folder, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes * 0.9:
+            break
+        try:
+            os.remove(os.path.join(folder, name))
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+class ResultStore:
+    """
+    Finished analysis results stored server-side by id, so a report download
+    only has to send the id instead of posting the whole analysis back.
+
+    The id is a hash of the result itself: identical results share one entry
+    (and one cached report). Entries are JSON files; beyond max_disk_bytes the
+    least recently used ones are evicted.
+    """
+
+    ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, folder, max_disk_bytes=256 * 1024 * 1024):
+        self.folder = folder
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._disk_bytes = prune_folder(folder, max_disk_bytes, '.json')
+
+    def _path(self, result_id):
+        return os.path.join(self.folder, f"{result_id}.json")
+
+    @staticmethod
+    def result_id(results):
+        """Content id of a result dict (its own 'result_id' field excluded)."""
+        payload = json.dumps({k: v for k, v in results.items() if k != 'result_id'}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def save(self, results):
+        """Stores a JSON-serializable result dict. Returns its id."""
+        result_id = self.result_id(results)
+        path = self._path(result_id)
+        if os.path.exists(path):
+            os.utime(path)
+            return result_id
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(results, result_id=result_id), f, default=str)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"  [CACHE ERROR] Could not store result {result_id}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return result_id
+
+        with self._lock:
+            self._disk_bytes += size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._disk_bytes = prune_folder(self.folder, self.max_disk_bytes, '.json')
+        return result_id
+
+    def load(self, result_id):
+        """The stored result dict, or None for an unknown, expired or malformed id."""
+        if not result_id or not self.ID_PATTERN.match(result_id):
+            return None
+        path = self._path(result_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return results
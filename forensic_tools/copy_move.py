@@ -0,0 +1,273 @@
+# forensic_tools/copy_move.py
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+BLOCK_SIZE = 8
+FEATURE_SIZE = 4            # keep the 4x4 lowest-frequency DCT coefficients of each block
+QUANT_STEP = 8.0            # feature quantization step; absorbs recompression and resampling noise
+MIN_AC_ENERGY = 1000.0      # blocks flatter than this (blank paper, solid fills) are never matched
+MIN_SHIFT = BLOCK_SIZE * 2  # shorter shifts are just neighbouring, overlapping blocks
+# Blocks in one connected region sharing a shift. Repeated words in a receipt's
+# font match too, but only as many small, scattered regions.
+MIN_REGION = 500
+MAX_CANDIDATE_SHIFTS = 32   # most-voted shift vectors checked for a connected region
+SEARCH_WINDOW = 3           # neighbours compared in the sorted feature list
+# Matched pairs kept for voting, nearest in the sorted list first. Periodic
+# textures (guilloche, halftone) match almost everywhere and would
+# otherwise produce millions.
+MAX_PAIRS = 2_000_000
+MAX_REGION = 200_000        # a region stops growing at this many blocks; it is reported either way
+MAX_SIZE = 1024             # long side of the working image
+STRIP_ROWS = 64             # block rows whose features are computed at once, between deadline checks
+TIME_BUDGET = 5.0           # seconds
+
+OVERLAY_COLORS = ((248, 81, 73), (88, 166, 255), (63, 185, 80), (210, 153, 34), (188, 140, 255))
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an (n, n) matrix: row k is the k-th basis vector."""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+def load_gray(image_source, max_size=MAX_SIZE):
+    """
+    Decodes an image source (path, file-like, PIL Image or array) to a float32
+    grayscale array whose long side is at most max_size. JPEGs are opened in
+    draft mode, so the decoder downscales in the DCT domain instead of
+    decoding full resolution first. Returns (gray, scale) where scale maps
+    working coordinates back to the original image.
+    """
+    if isinstance(image_source, np.ndarray):
+        img = Image.fromarray(image_source)
+    elif isinstance(image_source, Image.Image):
+        img = image_source
+    else:
+        img = Image.open(image_source)
+
+    original_width = img.size[0]
+    if img.format == 'JPEG':
+        img.draft('L', (max_size, max_size))
+    img = img.convert('L')
+    if max(img.size) > max_size:
+        img.thumbnail((max_size, max_size), Image.BILINEAR)
+    return np.asarray(img, dtype=np.float32), original_width / img.size[0]
+
+
+def block_features(gray, block_size=BLOCK_SIZE, feature_size=FEATURE_SIZE):
+    """
+    Low-frequency DCT coefficients of every overlapping block_size block, as an
+    array of shape (H - b + 1, W - b + 1, feature_size ** 2).
+
+    The 2-D DCT is separable, so it is applied as two sliding 1-D transforms
+    (rows, then columns) over strided views; no block is ever copied out.
+    """
+    basis = _dct_matrix(block_size)[:feature_size]
+    windows = np.lib.stride_tricks.sliding_window_view(gray, block_size, axis=1)
+    rows = windows @ basis.T                                   # (H, W-b+1, k)
+    windows = np.lib.stride_tricks.sliding_window_view(rows, block_size, axis=0)
+    features = np.einsum('lj,yxkj->yxlk', basis, windows)     # (H-b+1, W-b+1, k, k)
+    return features.reshape(features.shape[0], features.shape[1], -1)
+
+
+def _largest_region(points, deadline=None, max_region=MAX_REGION):
+    """
+    Largest 8-connected set among (y, x) block positions, as an (n, 2) array,
+    and whether the deadline (a time.perf_counter() value) cut the search
+    short. A region stops growing at max_region blocks.
+    """
+    remaining = set(map(tuple, points.tolist()))
+    best = []
+    steps = 0
+    while remaining:
+        queue = deque([remaining.pop()])
+        region = []
+        while queue and len(region) < max_region:
+            steps += 1
+            if deadline is not None and steps % 1024 == 0 and time.perf_counter() > deadline:
+                return np.array(max(best, region, key=len), dtype=np.int64).reshape(-1, 2), True
+            y, x = queue.popleft()
+            region.append((y, x))
+            for neighbour in ((y - 1, x - 1), (y - 1, x), (y - 1, x + 1), (y, x - 1),
+                              (y, x + 1), (y + 1, x - 1), (y + 1, x), (y + 1, x + 1)):
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    queue.append(neighbour)
+        if len(region) > len(best):
+            best = region
+        if len(best) >= max_region:
+            break
+    return np.array(best, dtype=np.int64).reshape(-1, 2), False
+
+
+def _block_mask(points, shape, block_size):
+    """Marks every pixel covered by a block whose top-left corner is in points (summed-area dilation)."""
+    corners = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int32)
+    corners[points[:, 0] + 1, points[:, 1] + 1] = 1
+    table = corners.cumsum(axis=0).cumsum(axis=1)
+    y0 = np.clip(np.arange(shape[0]) - block_size + 1, 0, None)
+    x0 = np.clip(np.arange(shape[1]) - block_size + 1, 0, None)
+    y1, x1 = np.arange(1, shape[0] + 1), np.arange(1, shape[1] + 1)
+    covered = table[y1][:, x1] - table[y0][:, x1] - table[y1][:, x0] + table[y0][:, x0]
+    return covered > 0
+
+
+def detect_copy_move(image_source, block_size=BLOCK_SIZE, max_size=MAX_SIZE, time_budget=TIME_BUDGET,
+                     min_region=MIN_REGION, min_shift=MIN_SHIFT, quant_step=QUANT_STEP):
+    """
+    Detects copy-move (cloned) regions with overlapping-block DCT matching.
+
+    Every block position gets a quantized low-frequency DCT feature vector;
+    the vectors are lexicographically sorted so that near-identical blocks
+    end up next to each other, which replaces the all-pairs comparison with
+    an O(n log n) sort. Matching pairs vote for their shift vector, and a
+    shift is reported when its matches form one connected region of at least
+    min_region blocks.
+
+    Stops early (with 'timed_out' set) once time_budget seconds have passed;
+    the deadline is checked between feature strips, between phases and inside
+    the region search, so decoding aside the budget is overshot by one
+    sort or vote step at most (a fraction of a second at MAX_SIZE).
+    Returns {'matches': [{'shift', 'blocks', 'source', 'target'}], 'mask',
+    'scale', 'blocks', 'elapsed', 'timed_out'}; shifts and (x0, y0, x1, y1)
+    boxes are in original image pixels, mask is at working size.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    gray, scale = load_gray(image_source, max_size)
+    result = {'matches': [], 'mask': np.zeros(gray.shape, dtype=bool), 'scale': scale,
+              'blocks': 0, 'elapsed': 0.0, 'timed_out': False}
+
+    def finish(timed_out=False):
+        result['timed_out'] = result['timed_out'] or timed_out
+        result['elapsed'] = round(time.perf_counter() - started, 3)
+        return result
+
+    if min(gray.shape) <= block_size:
+        return finish()
+
+    textured, quantized = [], []
+    for top in range(0, gray.shape[0] - block_size + 1, STRIP_ROWS):
+        if time.perf_counter() > deadline:
+            return finish(timed_out=True)
+        features = block_features(gray[top:top + STRIP_ROWS + block_size - 1], block_size)
+        width = features.shape[1]
+        features = features.reshape(-1, features.shape[-1])
+        strip = np.flatnonzero((features[:, 1:] ** 2).sum(axis=1) >= MIN_AC_ENERGY)
+        textured.append(strip + top * width)
+        quantized.append(np.round(features[strip] / quant_step).astype(np.int32))
+    textured, quantized = np.concatenate(textured), np.concatenate(quantized)
+    result['blocks'] = len(textured)
+    if len(textured) < min_region:
+        return finish()
+    if time.perf_counter() > deadline:
+        return finish(timed_out=True)
+
+    order = np.lexsort(quantized.T[::-1])
+    sorted_features = quantized[order]
+    positions = np.stack(np.divmod(textured[order], width), axis=1)  # (y, x)
+
+    pairs_a, pairs_b = [], []
+    room = MAX_PAIRS
+    for distance in range(1, SEARCH_WINDOW + 1):
+        if time.perf_counter() > deadline:
+            return finish(timed_out=True)
+        close = np.flatnonzero(np.abs(sorted_features[distance:] - sorted_features[:-distance]).max(axis=1) <= 1)
+        close = close[:room]
+        pairs_a.append(close)
+        pairs_b.append(close + distance)
+        room -= len(close)
+        if not room:
+            break
+    a = positions[np.concatenate(pairs_a)]
+    b = positions[np.concatenate(pairs_b)]
+
+    # Orient every pair the same way so a shift and its opposite vote together
+    swap = (b[:, 0] < a[:, 0]) | ((b[:, 0] == a[:, 0]) & (b[:, 1] < a[:, 1]))
+    a[swap], b[swap] = b[swap], a[swap]
+    shifts = b - a
+    far = np.hypot(shifts[:, 0], shifts[:, 1]) >= min_shift
+    a, shifts = a[far], shifts[far]
+    if not len(shifts):
+        return finish()
+
+    if time.perf_counter() > deadline:
+        return finish(timed_out=True)
+
+    # Vote on one integer per shift; np.unique over rows is an order of magnitude slower
+    span = 2 * width + 1
+    keys, counts = np.unique(shifts[:, 0] * span + shifts[:, 1], return_counts=True)
+    unique_shifts = np.stack(np.divmod(keys + width, span), axis=1) - (0, width)
+    claimed = np.zeros(len(shifts), dtype=bool)
+    for group in np.argsort(-counts)[:MAX_CANDIDATE_SHIFTS]:
+        if counts[group] < min_region:
+            break
+        if time.perf_counter() > deadline:
+            return finish(timed_out=True)
+        # Resampling to the working size can move part of a clone by one pixel
+        peak = unique_shifts[group]
+        members = ~claimed & (np.abs(shifts - peak).max(axis=1) <= 1)
+        source, timed_out = _largest_region(a[members], deadline)
+        if timed_out:
+            return finish(timed_out=True)
+        if len(source) < min_region:
+            continue
+        claimed |= members
+
+        target = source + peak
+        result['mask'] |= _block_mask(np.concatenate([source, target]), gray.shape, block_size)
+        dy, dx = (int(v) for v in peak)
+        result['matches'].append({
+            'shift': (round(dx * scale), round(dy * scale)),
+            'blocks': len(source),
+            'source': _bounding_box(source, block_size, scale),
+            'target': _bounding_box(target, block_size, scale),
+        })
+    return finish()
+
+
+def _bounding_box(points, block_size, scale):
+    y0, x0 = points.min(axis=0)
+    y1, x1 = points.max(axis=0) + block_size
+    return tuple(int(round(v * scale)) for v in (x0, y0, x1, y1))
+
+
+def render_overlay(image_source, detection, max_size=MAX_SIZE):
+    """
+    Draws the matched region pairs over a working-size copy of the image:
+    cloned blocks are tinted, and each source/target pair gets a box of the
+    same colour joined by a line. Returns a PIL RGB Image.
+    """
+    if isinstance(image_source, np.ndarray):
+        img = Image.fromarray(image_source)
+    elif isinstance(image_source, Image.Image):
+        img = image_source
+    else:
+        img = Image.open(image_source)
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_size, max_size))
+    img = img.convert('RGB')
+    mask = detection['mask']
+    if img.size != (mask.shape[1], mask.shape[0]):
+        img = img.resize((mask.shape[1], mask.shape[0]), Image.BILINEAR)
+
+    pixels = np.asarray(img).copy()
+    pixels[mask] = (pixels[mask] * 0.5 + np.array([248, 81, 73]) * 0.5).astype(np.uint8)
+    overlay = Image.fromarray(pixels)
+
+    draw = ImageDraw.Draw(overlay)
+    scale = detection['scale']
+    for n, match in enumerate(detection['matches']):
+        color = OVERLAY_COLORS[n % len(OVERLAY_COLORS)]
+        boxes = [tuple(v / scale for v in match[key]) for key in ('source', 'target')]
+        for box in boxes:
+            draw.rectangle(box, outline=color, width=2)
+        centers = [((x0 + x1) / 2, (y0 + y1) / 2) for x0, y0, x1, y1 in boxes]
+        draw.line(centers, fill=color, width=1)
+    return overlay
@@ -0,0 +1,60 @@
+import numpy as np
+from PIL import Image
+
+from .jpeg_markers import analyze_jpeg
+
+# A common way to analyze DCT is by looking at the coefficient histograms
+# for blocks (8x8 pixels) which is the unit of JPEG compression.
+
+def get_dct_coefficients(image_path, jpeg=None):
+    """
+    Checks the 8x8 block structure of an image. For JPEG files the dimensions
+    and quantization tables come straight from the marker segments (see
+    jpeg_markers.analyze_jpeg), so no pixels are decoded; other formats fall
+    back to Pillow for the dimensions. Pass jpeg if the markers were already parsed.
+    """
+    try:
+        if jpeg is None:
+            jpeg = analyze_jpeg(image_path)
+        if jpeg['frame']:
+            width, height = jpeg['frame']['width'], jpeg['frame']['height']
+        else:
+            with Image.open(image_path) as img:
+                width, height = img.size
+        
+        # JPEG compression works on 8x8 blocks. Tampering often aligns 
+        # the pasted area incorrectly relative to the original image's grid.
+        
+        # Check if dimensions are divisible by 8 (ideal for JPEG)
+        block_mismatch_w = width % 8
+        block_mismatch_h = height % 8
+        
+        print(f"  [DCT CHECK] Image Width Modulo 8: {block_mismatch_w}")
+        print(f"  [DCT CHECK] Image Height Modulo 8: {block_mismatch_h}")
+
+        if block_mismatch_w != 0 or block_mismatch_h != 0:
+             print("  [DCT ALERT] Dimensions are not aligned to 8x8 block grid, common after cropping/resizing.")
+
+        result = {"DCT_ALIGNMENT_STATUS": "ALIGNED", "SCORE_IMPACT": 0}
+        if block_mismatch_w != 0 or block_mismatch_h != 0:
+            result = {"DCT_ALIGNMENT_STATUS": "MISALIGNED", "SCORE_IMPACT": 2}
+
+        # Quantization tables: quality estimate, encoder and recompression indicators
+        if jpeg['quant_tables']:
+            label = "exact" if jpeg['quality_exact'] else "estimated"
+            print(f"  [DCT CHECK] Quality: {jpeg['quality']} ({label}), Encoder: {jpeg['encoder']}")
+            for indicator in jpeg['indicators']:
+                print(f"  [DCT ALERT] {indicator}")
+            result.update(QUALITY=jpeg['quality'], QUALITY_EXACT=jpeg['quality_exact'],
+                          ENCODER=jpeg['encoder'], RECOMPRESSION_INDICATORS=jpeg['indicators'])
+            if jpeg['indicators']:
+                result["SCORE_IMPACT"] += 2
+
+        return result
+
+    except Exception as e:
+        print(f"  [DCT ERROR] Failed to perform DCT check: {e}")
+        return {"DCT_ALIGNMENT_STATUS": "ERROR", "SCORE_IMPACT": 0}
+
+if __name__ == '__main__':
+    print("This module contains the DCT check function and should be run via main.py.")
\ No newline at end of file
@@ -0,0 +1,280 @@
+# forensic_tools/ela.py
+import math
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+NORMALIZE_MODES = ('max', 'scale', 'none')
+
+# Rows per JPEG MCU with the 4:2:0 chroma subsampling Pillow saves by default.
+# Tiled ELA cuts strips on this grid so every block is recompressed as in the whole image.
+MCU_SIZE = 16
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+PREVIEW_MAX_SIZE = 2048
+# Working set per pixel of a strip: original, resaved and error (uint8 RGB),
+# two int16 RGB copies for the difference, and the JPEG encode buffer.
+STRIP_BYTES_PER_PIXEL = 24
+# Tiled error levels match compute_ela to within this many levels per pixel
+TILE_TOLERANCE = 1
+
+
+def load_rgb(image_source):
+    """
+    Decodes an image source (file path, file-like object, PIL Image or
+    an existing uint8 array) into an (H, W, 3) uint8 RGB array.
+    """
+    if isinstance(image_source, np.ndarray):
+        return image_source
+    if isinstance(image_source, Image.Image):
+        return np.asarray(image_source.convert('RGB'))
+    with Image.open(image_source) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def image_size(image_source):
+    """(width, height) of an image source, read from the header only. File-like sources are rewound."""
+    if isinstance(image_source, np.ndarray):
+        return image_source.shape[1], image_source.shape[0]
+    if isinstance(image_source, Image.Image):
+        return image_source.size
+    with Image.open(image_source) as img:
+        size = img.size
+    if hasattr(image_source, 'seek'):
+        image_source.seek(0)
+    return size
+
+
+def recompress(rgb, quality):
+    """
+    Re-encodes an RGB array as JPEG entirely in memory and decodes it back.
+    Nothing touches the disk, so concurrent callers never share a temp file.
+    """
+    buffer = BytesIO()
+    Image.fromarray(rgb).save(buffer, format='JPEG', quality=quality)
+    buffer.seek(0)
+    with Image.open(buffer) as resaved:
+        return np.asarray(resaved.convert('RGB'))
+
+
+def error_statistics(error):
+    """Per-channel mean, 99th percentile and max of an (H, W, 3) error array."""
+    flat = error.reshape(-1, error.shape[-1])
+    return {
+        'mean': [round(float(v), 3) for v in flat.mean(axis=0)],
+        'p99': [float(v) for v in np.percentile(flat, 99, axis=0)],
+        'max': [int(v) for v in flat.max(axis=0)],
+    }
+
+
+def histogram_statistics(histogram):
+    """
+    The same statistics as error_statistics, computed from per-channel
+    256-bin histograms of the error levels, so they can be accumulated strip
+    by strip. The percentile uses the same linear interpolation as NumPy.
+    """
+    levels = np.arange(256)
+    count = int(histogram[0].sum())
+    stats = {'mean': [], 'p99': [], 'max': []}
+    for channel in histogram:
+        if count == 0:
+            stats['mean'].append(0.0)
+            stats['p99'].append(0.0)
+            stats['max'].append(0)
+            continue
+        cumulative = np.cumsum(channel)
+        position = 0.99 * (count - 1)
+        lower = int(position)
+        low_value = int(np.searchsorted(cumulative, lower, side='right'))
+        high_value = int(np.searchsorted(cumulative, min(lower + 1, count - 1), side='right'))
+        stats['mean'].append(round(float((channel * levels).sum() / count), 3))
+        stats['p99'].append(float(low_value + (high_value - low_value) * (position - lower)))
+        stats['max'].append(int(np.nonzero(channel)[0].max()))
+    return stats
+
+
+def ela_score(stats):
+    """
+    Collapses ELA statistics into one comparable number: the mean of the
+    per-channel 99th percentile error levels. Higher means more error.
+    """
+    return round(sum(stats['p99']) / len(stats['p99']), 2)
+
+
+def normalize_error(error, normalize='max', scale=None, max_value=None):
+    """
+    Maps a raw error array to a displayable uint8 array.
+
+    'max'   stretches the largest error to 255 (optionally multiplied by scale),
+    'scale' multiplies every error by a fixed scale factor,
+    'none'  returns the raw error levels.
+
+    max_value overrides the largest error, for arrays that are only part of
+    (or a reduced copy of) the full error image.
+    """
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"Unknown ELA normalization mode: {normalize}")
+
+    if normalize == 'none':
+        return error
+
+    if normalize == 'max':
+        if max_value is not None:
+            max_diff = int(max_value)
+        else:
+            max_diff = int(error.max()) if error.size else 0
+        if max_diff == 0:
+            return error
+        factor = 255.0 / max_diff
+        if scale:
+            factor *= scale
+    else:
+        factor = float(scale if scale is not None else 1)
+
+    return np.clip(error * np.float32(factor), 0, 255).astype(np.uint8)
+
+
+def compute_ela(image_source, quality=90, scale=None, normalize='max'):
+    """
+    Performs Error Level Analysis (ELA) using NumPy array operations.
+
+    The image is recompressed in memory at the given JPEG quality and the
+    absolute difference with the original is computed per pixel. Returns a dict:
+        'image'  - the normalized ELA result as a PIL Image
+        'error'  - the raw (H, W, 3) uint8 error array
+        'stats'  - per-channel summary statistics (mean, p99, max)
+        plus the quality, scale and normalize parameters that were used.
+    """
+    original = load_rgb(image_source)
+    resaved = recompress(original, quality)
+
+    error = np.abs(original.astype(np.int16) - resaved.astype(np.int16)).astype(np.uint8)
+    visual = normalize_error(error, normalize=normalize, scale=scale)
+
+    return {
+        'image': Image.fromarray(visual, 'RGB'),
+        'error': error,
+        'stats': error_statistics(error),
+        'quality': quality,
+        'scale': scale,
+        'normalize': normalize,
+    }
+
+
+def strip_rows(width, memory_budget=DEFAULT_MEMORY_BUDGET, align=MCU_SIZE):
+    """Strip height (a multiple of align) whose working set fits in memory_budget bytes."""
+    rows = memory_budget // max(1, width * STRIP_BYTES_PER_PIXEL)
+    return max(align, rows // align * align)
+
+
+def compute_ela_tiled(image_source, quality=90, scale=None, normalize='max',
+                      memory_budget=DEFAULT_MEMORY_BUDGET, preview_size=PREVIEW_MAX_SIZE,
+                      full_resolution=False):
+    """
+    Error Level Analysis in horizontal strips, for scans too large for
+    compute_ela. Only the decoded source image is held in full; each strip is
+    converted, recompressed and compared on its own, with strip heights
+    chosen from memory_budget.
+
+    Strips start on the MCU grid and are recompressed with one MCU row of
+    context above and below, so block boundaries and chroma upsampling match
+    the whole-image recompression (error levels agree within TILE_TOLERANCE).
+    Statistics come from per-channel histograms and are exact.
+
+    The on-screen preview is reduced from each strip as it is produced, to at
+    most preview_size pixels on the long side. The full-resolution heatmap is
+    only built when full_resolution is True. Returns the compute_ela dict,
+    with 'image' being the full heatmap (or the preview), 'preview' the
+    reduced heatmap, 'error' None, and 'tiled', 'strip_rows' and 'reduce_factor' added.
+    """
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"Unknown ELA normalization mode: {normalize}")
+
+    if isinstance(image_source, np.ndarray):
+        img, owned = Image.fromarray(image_source), True
+    elif isinstance(image_source, Image.Image):
+        img, owned = image_source, False
+    else:
+        img, owned = Image.open(image_source), True
+
+    try:
+        width, height = img.size
+        factor = max(1, math.ceil(max(width, height) / preview_size)) if preview_size else 1
+        rows = strip_rows(width, memory_budget, align=math.lcm(MCU_SIZE, factor))
+
+        histogram = np.zeros((3, 256), dtype=np.int64)
+        preview = np.zeros((math.ceil(height / factor), math.ceil(width / factor), 3), dtype=np.uint8)
+        full = np.empty((height, width, 3), dtype=np.uint8) if full_resolution else None
+
+        for top in range(0, height, rows):
+            bottom = min(top + rows, height)
+            context_top, context_bottom = max(0, top - MCU_SIZE), min(height, bottom + MCU_SIZE)
+            with img.crop((0, context_top, width, context_bottom)) as strip:
+                original = np.asarray(strip.convert('RGB'))
+            resaved = recompress(original, quality)
+
+            inner = slice(top - context_top, bottom - context_top)
+            error = np.abs(original[inner].astype(np.int16) - resaved[inner].astype(np.int16)).astype(np.uint8)
+            del original, resaved
+
+            for channel in range(3):
+                histogram[channel] += np.bincount(error[..., channel].ravel(), minlength=256)
+            reduced = np.asarray(Image.fromarray(error, 'RGB').reduce(factor)) if factor > 1 else error
+            preview[top // factor:top // factor + reduced.shape[0]] = reduced
+            if full is not None:
+                full[top:bottom] = error
+
+        stats = histogram_statistics(histogram)
+        max_value = max(stats['max'])
+        preview_image = Image.fromarray(normalize_error(preview, normalize, scale, max_value=max_value), 'RGB')
+
+        image = preview_image
+        if full is not None:
+            # Normalize in place, strip by strip, so no float copy of the whole image is made
+            for top in range(0, height, rows):
+                full[top:top + rows] = normalize_error(full[top:top + rows], normalize, scale, max_value=max_value)
+            image = Image.fromarray(full, 'RGB')
+    finally:
+        if owned:
+            img.close()
+
+    return {
+        'image': image,
+        'preview': preview_image,
+        'error': None,
+        'stats': stats,
+        'quality': quality,
+        'scale': scale,
+        'normalize': normalize,
+        'tiled': True,
+        'strip_rows': rows,
+        'reduce_factor': factor,
+    }
+
+
+def perform_ela(image_path, quality=90):
+    """
+    Performs Error Level Analysis (ELA) and returns the resulting PIL Image.
+    image_path may also be an image that is already decoded (see load_rgb).
+
+    ELA works by resaving the image at a known quality (e.g., 90) and
+    calculating the difference between the original and the resaved version.
+    Areas that are uniform in the original image will have low errors (dark),
+    while newly added/manipulated areas (which haven't been compressed before)
+    will have high errors (bright).
+    """
+    try:
+        result = compute_ela(image_path, quality=quality, normalize='max', scale=1.2)
+
+        if max(result['stats']['max']) == 0:
+            print("  [ELA WARNING] No measurable difference found. Image may be a clean save or already heavily compressed.")
+
+        return result['image']
+
+    except Exception as e:
+        print(f"  [ELA ERROR] Failed to process image: {e}")
+        return None
+
+if __name__ == '__main__':
+    # This block is for testing the module directly
+    print("This module contains the ELA function and should be run via main.py.")
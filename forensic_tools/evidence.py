@@ -0,0 +1,277 @@
+# forensic_tools/evidence.py
+"""
+Evidence store: one row per completed analysis in a local SQLite file, so
+past submissions can be searched by file hash, type, editing software,
+tamper score, dimensions or date without analyzing anything again.
+
+The columns auditors filter by are indexed. Software, Creator and Producer
+are also split into lowercase words in a side table with its own index,
+so "every receipt produced by Canva last month" is two index lookups:
+
+    store.query({'tool': 'canva', 'since': '2025-01-01', 'until': '2025-02-01'})
+
+Results are returned newest first and paginated by id (keyset), so a page
+deep into a large store costs the same as the first one.
+"""
+import json
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    original_filename TEXT,
+    file_type TEXT NOT NULL,
+    size INTEGER,
+    software TEXT,
+    creator TEXT,
+    producer TEXT,
+    document_created TEXT,
+    document_modified TEXT,
+    width INTEGER,
+    height INTEGER,
+    tamper_score INTEGER,
+    tamper_percentage REAL,
+    conclusion TEXT,
+    evidence TEXT,
+    result_id TEXT,
+    cache TEXT,
+    analyzed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_sha256 ON analyses (sha256);
+CREATE INDEX IF NOT EXISTS analyses_analyzed ON analyses (analyzed);
+CREATE INDEX IF NOT EXISTS analyses_type_analyzed ON analyses (file_type, analyzed);
+CREATE INDEX IF NOT EXISTS analyses_score ON analyses (tamper_score);
+CREATE TABLE IF NOT EXISTS analysis_terms (
+    term TEXT NOT NULL,
+    analysis_id INTEGER NOT NULL,
+    PRIMARY KEY (term, analysis_id)
+) WITHOUT ROWID;
+"""
+
+# Columns of query results and exports, in order; 'evidence' is decoded from JSON
+COLUMNS = ('id', 'sha256', 'original_filename', 'file_type', 'size', 'software', 'creator', 'producer',
+           'document_created', 'document_modified', 'width', 'height', 'tamper_score', 'tamper_percentage',
+           'conclusion', 'evidence', 'result_id', 'cache', 'analyzed')
+FILTERS = ('sha256', 'file_type', 'tool', 'software', 'filename', 'min_score', 'max_score', 'since', 'until')
+MIN_TERM_LENGTH = 2
+
+
+def terms(*texts):
+    """Lowercase words of the software fields, e.g. 'Adobe Photoshop CC 2019' -> {'adobe', 'photoshop', 'cc', '2019'}."""
+    words = set()
+    for text in texts:
+        if text:
+            words.update(w for w in re.findall(r'[a-z0-9]+', str(text).lower()) if len(w) >= MIN_TERM_LENGTH)
+    return words
+
+
+def parse_time(value):
+    """Epoch seconds of an ISO date/datetime ('2025-01-31', '2025-01-31T08:00') or a number. Raises ValueError."""
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Expected an ISO date or epoch seconds, got {value!r}") from None
+
+
+def parse_filters(args):
+    """
+    The known filters of a mapping (e.g. request.args), validated: scores as
+    ints, since/until as epoch seconds, text lowercased where matching is
+    case-insensitive. Blank values are ignored. Raises ValueError.
+    """
+    filters = {}
+    for name in FILTERS:
+        value = args.get(name)
+        if value is None or str(value).strip() == '':
+            continue
+        value = str(value).strip()
+        if name in ('min_score', 'max_score'):
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                raise ValueError(f"'{name}' must be an integer.") from None
+        elif name in ('since', 'until'):
+            filters[name] = parse_time(value)
+        elif name == 'tool':
+            words = terms(value)
+            if not words:
+                raise ValueError("'tool' must contain a word of at least two letters or digits.")
+            filters[name] = sorted(words)
+        elif name in ('sha256', 'file_type'):
+            filters[name] = value.lower()
+        else:
+            filters[name] = value
+    return filters
+
+
+def _where(filters):
+    clauses, params = [], []
+    if 'sha256' in filters:
+        clauses.append("sha256 = ?")
+        params.append(filters['sha256'])
+    if 'file_type' in filters:
+        types = ['jpg', 'jpeg'] if filters['file_type'] in ('jpg', 'jpeg') else [filters['file_type']]
+        clauses.append(f"file_type IN ({','.join('?' * len(types))})")
+        params.extend(types)
+    for word in filters.get('tool', ()):
+        clauses.append("id IN (SELECT analysis_id FROM analysis_terms WHERE term = ?)")
+        params.append(word)
+    if 'software' in filters:
+        clauses.append("(software LIKE ? OR creator LIKE ? OR producer LIKE ?)")
+        params.extend([f"%{filters['software']}%"] * 3)
+    if 'filename' in filters:
+        clauses.append("original_filename LIKE ?")
+        params.append(f"%{filters['filename']}%")
+    if 'min_score' in filters:
+        clauses.append("tamper_score >= ?")
+        params.append(filters['min_score'])
+    if 'max_score' in filters:
+        clauses.append("tamper_score <= ?")
+        params.append(filters['max_score'])
+    if 'since' in filters:
+        clauses.append("analyzed >= ?")
+        params.append(filters['since'])
+    if 'until' in filters:
+        clauses.append("analyzed < ?")
+        params.append(filters['until'])
+    return clauses, params
+
+
+def _row(row):
+    item = dict(row)
+    item['evidence'] = json.loads(item['evidence']) if item['evidence'] else []
+    item['analyzed_at'] = datetime.fromtimestamp(item['analyzed']).isoformat(timespec='seconds')
+    return item
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EvidenceStore:
+    """
+    Completed analyses in a local SQLite file, one row per submission (cache
+    hits included, so the store is also an audit log). Like HashIndex, every
+    method opens its own connection, so one EvidenceStore can be shared
+    between threads and worker processes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def record(self, results, cache='miss', analyzed=None):
+        """
+        Stores a finished analysis (the results dict of run_forensic_analysis_web,
+        with its 'properties') and returns the new row id.
+        """
+        properties = results.get('properties') or {}
+        try:
+            tamper_percentage = float(results.get('tamper_percentage'))
+        except (TypeError, ValueError):
+            tamper_percentage = None
+        row = {
+            'sha256': results['digest']['SHA-256'],
+            'original_filename': results.get('original_filename'),
+            'file_type': properties.get('file_type') or results.get('original_filename', '').rsplit('.', 1)[-1].lower(),
+            'size': results['digest'].get('Size'),
+            'software': properties.get('software'),
+            'creator': properties.get('creator'),
+            'producer': properties.get('producer'),
+            'document_created': properties.get('created'),
+            'document_modified': properties.get('modified'),
+            'width': _int_or_none(properties.get('width')),
+            'height': _int_or_none(properties.get('height')),
+            'tamper_score': properties.get('tamper_score'),
+            'tamper_percentage': tamper_percentage,
+            'conclusion': results.get('conclusion'),
+            'evidence': json.dumps(results.get('evidence') or [], ensure_ascii=False),
+            'result_id': results.get('result_id'),
+            'cache': cache,
+            'analyzed': analyzed if analyzed is not None else time.time(),
+        }
+        words = terms(row['software'], row['creator'], row['producer'])
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(f"INSERT INTO analyses ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                                  list(row.values()))
+            analysis_id = cursor.lastrowid
+            conn.executemany("INSERT OR IGNORE INTO analysis_terms (term, analysis_id) VALUES (?, ?)",
+                             [(word, analysis_id) for word in words])
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return analysis_id
+
+    def get(self, analysis_id):
+        """One analysis as a dict, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        finally:
+            conn.close()
+        return _row(row) if row else None
+
+    def query(self, filters=None, limit=50, cursor=None):
+        """
+        Analyses matching filters (as from parse_filters), newest first:
+        {'items': [...], 'next_cursor': id or None}. Pass next_cursor back as
+        cursor to get the following page.
+        """
+        clauses, params = _where(filters or {})
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT * FROM analyses {where} ORDER BY id DESC LIMIT ?",
+                                params + [limit + 1]).fetchall()
+        finally:
+            conn.close()
+        items = [_row(row) for row in rows[:limit]]
+        next_cursor = items[-1]['id'] if len(rows) > limit else None
+        return {'items': items, 'next_cursor': next_cursor}
+
+    def iter_rows(self, filters=None, batch_size=500):
+        """Every matching analysis, newest first, fetched in batches (one short connection each) for exports."""
+        cursor = None
+        while True:
+            page = self.query(filters, limit=batch_size, cursor=cursor)
+            yield from page['items']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    def count(self, filters=None):
+        clauses, params = _where(filters or {})
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,234 @@
+# forensic_tools/ghost.py
+"""
+Multi-quality ELA sweep and JPEG ghost analysis.
+
+A single ELA at one fixed quality only shows a forgery if that quality
+happens to suit it. The sweep re-encodes the image at every quality in
+QUALITIES and measures the squared difference per block, giving each
+block a difference curve over quality. For an image last saved at quality
+Q1 the curve falls steadily as the re-save quality approaches Q1. A
+region that was saved earlier at a lower quality Q0 (a patch pasted from
+another JPEG) also dips near Q0 and rises again after it. That dip is its
+"ghost" (Farid, "Exposing Digital Forgeries from JPEG Ghosts", 2009).
+
+The analysis runs on luma (grayscale), where JPEG keeps most of its
+detail. Each quality is encoded and compared on its own thread; Pillow's
+JPEG codec and NumPy release the GIL, so the sweep scales with cores.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw, features
+
+QUALITIES = tuple(range(50, 101, 5))
+BLOCK_SIZE = 16                # a multiple of the 8x8 JPEG block
+MAX_PIXELS = 40_000_000        # larger images are skipped rather than reduced: resizing erases ghosts
+TEXTURE_MIN = 2.0              # flat blocks (std in grey levels) barely change under re-compression
+MIN_ERROR = 1.0                # blocks that no re-save changes by this much (MSE) are not measured
+QUALITY_MARGIN = 3             # ignore re-save qualities this close to the last save: every block dips there
+MIN_REBOUND = 0.25             # curve rise after a dip, relative to the block's largest difference
+# Ghost blocks need this many ghost neighbours (of 8). Pasted regions are at
+# least two blocks tall and wide; the single rows of blocks along ruled lines
+# and text baselines that also dip are dropped.
+MIN_NEIGHBOURS = 3
+# Share of the measured blocks that makes a ghost. Pristine corpus receipts
+# (q75, q85, q92, seeds 1-3) stay at or below 0.52%. Textured patches saved
+# at q55/q65 and pasted into a q92 save reach 1.4% to 34%.
+ALERT_PERCENT = 1.0
+STRIP_PIXELS = 4_000_000       # difference arithmetic runs in strips of about this many pixels
+TILE_SIZE = 256
+ANIMATION_SIZE = 640
+UNMEASURED = (48, 54, 61)
+GHOST_COLOR = (248, 196, 56)
+
+
+def to_luma(image_source):
+    """uint8 luma array of a path, file-like, PIL Image or array (RGB arrays are converted)."""
+    if isinstance(image_source, np.ndarray):
+        if image_source.ndim == 2:
+            return image_source
+        return np.asarray(Image.fromarray(image_source).convert('L'))
+    if isinstance(image_source, Image.Image):
+        return np.asarray(image_source.convert('L') if image_source.mode != 'L' else image_source)
+    with Image.open(image_source) as img:
+        return np.asarray(img.convert('L'))
+
+
+def block_differences(luma, quality, block_size=BLOCK_SIZE):
+    """
+    Mean squared difference per block between luma and its JPEG re-save at
+    quality, as a (rows, cols) float32 array. Encoding and decoding happen in
+    memory; the difference is taken in strips to bound the working set.
+    """
+    buffer = BytesIO()
+    Image.fromarray(luma).save(buffer, format='JPEG', quality=quality)
+    buffer.seek(0)
+    with Image.open(buffer) as img:
+        resaved = np.asarray(img)
+
+    rows, cols = luma.shape[0] // block_size, luma.shape[1] // block_size
+    width = cols * block_size
+    result = np.empty((rows, cols), dtype=np.float32)
+    step = max(1, STRIP_PIXELS // max(1, width * block_size))
+    for top in range(0, rows, step):
+        bottom = min(rows, top + step)
+        y0, y1 = top * block_size, bottom * block_size
+        diff = luma[y0:y1, :width].astype(np.int32) - resaved[y0:y1, :width]
+        diff *= diff
+        result[top:bottom] = diff.reshape(bottom - top, block_size, cols, block_size).mean(axis=(1, 3))
+    return result
+
+
+def _block_texture(luma, block_size):
+    rows, cols = luma.shape[0] // block_size, luma.shape[1] // block_size
+    blocks = luma[:rows * block_size, :cols * block_size].reshape(rows, block_size, cols, block_size)
+    return blocks.std(axis=(1, 3), dtype=np.float32)
+
+
+def _neighbour_count(mask):
+    padded = np.pad(mask.astype(np.int8), 1)
+    rows, cols = mask.shape
+    total = sum(padded[dy:dy + rows, dx:dx + cols] for dy in range(3) for dx in range(3))
+    return total - mask
+
+
+def _tile(levels, measured, ghosts, size, label):
+    gray = (255 * np.clip(levels, 0, 1)).astype(np.uint8)
+    rgb = np.repeat(gray[..., None], 3, axis=2)
+    rgb[~measured] = UNMEASURED
+    if ghosts is not None:
+        rgb[ghosts] = GHOST_COLOR
+    tile = Image.fromarray(rgb, 'RGB').resize(size, Image.NEAREST)
+    draw = ImageDraw.Draw(tile)
+    draw.rectangle(draw.textbbox((6, 4), label), fill=(13, 17, 23))
+    draw.text((6, 4), label, fill=GHOST_COLOR if ghosts is None else (255, 255, 255))
+    return tile
+
+
+def _tile_size(shape, max_size):
+    rows, cols = shape
+    factor = max_size / max(rows, cols)
+    return max(1, round(cols * factor)), max(1, round(rows * factor))
+
+
+def _visual_levels(differences, measured):
+    """Each quality's map scaled by its own 99th percentile, so every frame uses the full grey range."""
+    levels = []
+    for difference in differences:
+        top = np.percentile(difference[measured], 99) if measured.any() else 0
+        levels.append(difference / top if top > 0 else np.zeros_like(difference))
+    return levels
+
+
+def render_stack(qualities, differences, measured, ghosts, tile_size=TILE_SIZE, columns=4):
+    """
+    Contact sheet of the sweep: one difference map per quality (dark where the
+    block matches that quality), then the ghost map. Returns a PIL RGB Image.
+    """
+    size = _tile_size(measured.shape, tile_size)
+    tiles = [_tile(level, measured, None, size, f"Q{quality}")
+             for quality, level in zip(qualities, _visual_levels(differences, measured))]
+    tiles.append(_tile(np.zeros(measured.shape), measured, ghosts, size, "ghosts"))
+    rows = -(-len(tiles) // columns)
+    sheet = Image.new('RGB', (columns * (size[0] + 4) + 4, rows * (size[1] + 4) + 4), (13, 17, 23))
+    for n, tile in enumerate(tiles):
+        sheet.paste(tile, (4 + (n % columns) * (size[0] + 4), 4 + (n // columns) * (size[1] + 4)))
+    return sheet
+
+
+def render_animation(qualities, differences, measured, ghosts, size=ANIMATION_SIZE, duration=500):
+    """
+    The sweep as an animated WebP (one frame per quality, then the ghost map).
+    Returns the encoded bytes, or None where Pillow lacks WebP.
+    """
+    if not features.check('webp'):
+        return None
+    tile_size = _tile_size(measured.shape, size)
+    frames = [_tile(level, measured, None, tile_size, f"Q{quality}")
+              for quality, level in zip(qualities, _visual_levels(differences, measured))]
+    frames.append(_tile(np.zeros(measured.shape), measured, ghosts, tile_size, "ghosts"))
+    buffer = BytesIO()
+    frames[0].save(buffer, format='WEBP', save_all=True, append_images=frames[1:], duration=duration,
+                   loop=0, quality=80)
+    return buffer.getvalue()
+
+
+def ghost_sweep(image_source, qualities=QUALITIES, block_size=BLOCK_SIZE, primary_quality=None, workers=4,
+                visualize='stack', max_pixels=MAX_PIXELS):
+    """
+    Re-encodes the image at every quality (concurrently, on workers threads)
+    and looks for JPEG ghosts. primary_quality is the quality of the last
+    save if known (e.g. from the quantization tables); only re-save qualities
+    below it, minus QUALITY_MARGIN, are searched for ghosts. visualize is
+    'stack' (contact sheet), 'animation' (animated WebP bytes, or the stack
+    without WebP support) or None.
+
+    Returns a dict:
+        'qualities', 'curve'  - re-save qualities and the mean block MSE at each
+        'ghost_curve'         - the same over ghost blocks only (None without ghosts)
+        'blocks'              - blocks with enough texture to be measured
+        'ghost_blocks', 'ghost_percent'
+        'ghost_quality'       - the most common dip quality of the ghost blocks
+        'ghost_box'           - (x0, y0, x1, y1) around the ghost blocks, in pixels
+        'primary_quality', 'block_size', 'skipped' (reason, or None)
+        'image'               - the stack (PIL Image), or None
+        'animation'           - the animated WebP (bytes), or None
+    """
+    qualities = sorted(set(int(q) for q in qualities))
+    luma = to_luma(image_source)
+    height, width = luma.shape
+    result = {'qualities': qualities, 'curve': [], 'ghost_curve': None, 'blocks': 0, 'ghost_blocks': 0,
+              'ghost_percent': 0.0, 'ghost_quality': None, 'ghost_box': None, 'primary_quality': primary_quality,
+              'block_size': block_size, 'skipped': None, 'image': None, 'animation': None}
+    if width * height > max_pixels:
+        result['skipped'] = f"image too large ({width * height / 1e6:.1f} MP)"
+        return result
+    if height < block_size * 3 or width < block_size * 3:
+        result['skipped'] = "image too small"
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        differences = list(pool.map(lambda q: block_differences(luma, q, block_size), qualities))
+    stacked = np.stack(differences)
+
+    # A region saved before at a low quality barely changes at the coarsest re-saves, so the
+    # block's largest difference over the sweep, not the first one, decides whether it is measured
+    peak = stacked.max(axis=0)
+    measured = (_block_texture(luma, block_size) >= TEXTURE_MIN) & (peak >= MIN_ERROR)
+    result['blocks'] = int(measured.sum())
+    result['curve'] = [round(float(d[measured].mean()), 3) if measured.any() else 0.0 for d in differences]
+
+    # Ghosts: a dip at quality q followed by a rise before the last save's own dip
+    ceiling = (primary_quality if primary_quality else 100) - QUALITY_MARGIN
+    searched = sum(1 for q in qualities if q <= ceiling)
+    ghosts = np.zeros(measured.shape, dtype=bool)
+    dip_index = np.zeros(measured.shape, dtype=np.int64)
+    if searched >= 3 and result['blocks']:
+        curves = stacked[:searched]
+        # A dip needs a higher difference on both sides; the ends of the sweep cannot show one
+        earlier_max = np.maximum.accumulate(curves, axis=0)[:-2]
+        later_max = np.maximum.accumulate(curves[::-1], axis=0)[::-1][2:]
+        rebound = (np.minimum(earlier_max, later_max) - curves[1:-1]) / np.maximum(peak, MIN_ERROR)
+        dip_index = rebound.argmax(axis=0) + 1
+        ghosts = measured & (rebound.max(axis=0) >= MIN_REBOUND)
+        ghosts &= _neighbour_count(ghosts) >= MIN_NEIGHBOURS
+
+    ghost_blocks = int(ghosts.sum())
+    if ghost_blocks:
+        ys, xs = np.nonzero(ghosts)
+        result.update(
+            ghost_blocks=ghost_blocks,
+            ghost_percent=round(100.0 * ghost_blocks / result['blocks'], 2),
+            ghost_quality=Counter(qualities[i] for i in dip_index[ghosts]).most_common(1)[0][0],
+            ghost_box=(int(xs.min()) * block_size, int(ys.min()) * block_size,
+                       int(xs.max() + 1) * block_size, int(ys.max() + 1) * block_size),
+            ghost_curve=[round(float(d[ghosts].mean()), 3) for d in differences],
+        )
+
+    if visualize == 'animation':
+        result['animation'] = render_animation(qualities, differences, measured, ghosts)
+    if visualize == 'stack' or (visualize == 'animation' and result['animation'] is None):
+        result['image'] = render_stack(qualities, differences, measured, ghosts)
+    return result
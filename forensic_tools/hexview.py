@@ -0,0 +1,60 @@
+# forensic_tools/hexview.py
+import mmap
+import os
+from functools import lru_cache
+from html import escape
+
+BYTES_PER_ROW = 64
+DEFAULT_ROWS = 32
+
+
+def read_range(file_path, offset, length):
+    """
+    Reads length bytes starting at offset through a memory map, so only the
+    requested pages of the file are touched. Returns (data, file_size).
+    """
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if offset >= file_size or length <= 0:
+            return b'', file_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return view[offset:offset + length], file_size
+
+
+def format_hex_row(row_offset, row, row_bytes=BYTES_PER_ROW):
+    """'0000A000: 25 50 44 46 ...  |%PDF...|' with the ASCII gutter padded for short rows."""
+    hex_part = ' '.join(f"{b:02X}" for b in row).ljust(row_bytes * 3 - 1)
+    ascii_part = ''.join(chr(b) if 0x20 <= b < 0x7f else '.' for b in row)
+    return f"{row_offset:08X}: {hex_part}  |{ascii_part}|"
+
+
+@lru_cache(maxsize=256)
+def _render_page(file_path, mtime_ns, offset, rows, row_bytes):
+    # mtime_ns is part of the cache key only, so a rewritten file is never served stale
+    data, file_size = read_range(file_path, offset, rows * row_bytes)
+    lines = tuple(
+        (offset + i, escape(format_hex_row(offset + i, data[i:i + row_bytes], row_bytes)))
+        for i in range(0, len(data), row_bytes)
+    )
+    return lines, file_size
+
+
+def hex_page(file_path, offset=0, rows=DEFAULT_ROWS, row_bytes=BYTES_PER_ROW):
+    """
+    Renders one page of a hex dump. offset is aligned down to a row boundary.
+    Returns {'offset', 'rows': [(row_offset, html_line), ...], 'prev_offset',
+    'next_offset', 'file_size'}; prev/next are None at the ends of the file.
+    Rendered pages are cached per (file, mtime, offset, rows).
+    """
+    offset = max(0, int(offset)) // row_bytes * row_bytes
+    mtime_ns = os.stat(file_path).st_mtime_ns
+    lines, file_size = _render_page(file_path, mtime_ns, offset, rows, row_bytes)
+
+    next_offset = offset + rows * row_bytes
+    return {
+        'offset': offset,
+        'rows': list(lines),
+        'prev_offset': max(0, offset - rows * row_bytes) if offset > 0 else None,
+        'next_offset': next_offset if next_offset < file_size else None,
+        'file_size': file_size,
+    }
@@ -0,0 +1,640 @@
+# forensic_tools/image_metadata.py
+"""
+Header-only metadata of JPEG and PNG files: EXIF, XMP, Photoshop IRB (with
+IPTC) and ICC profiles from the JPEG APPn segments, and tEXt, zTXt, iTXt,
+eXIf, iCCP and tIME from the PNG ancillary chunks.
+
+Reading stops at the first image data (the JPEG SOS marker, the PNG IDAT
+chunk). Each segment costs one bounded read, and compressed text is only
+inflated up to MAX_INFLATE_BYTES, so a 50 MB scan costs the same few
+kilobytes of reads as a thumbnail and no pixel is ever decoded.
+
+The XMP edit history (xmpMM:History), derivation (xmpMM:DerivedFrom) and
+the photoshop: namespace (DocumentAncestors, TextLayers, History) are
+parsed into structured fields, and metadata_findings turns them into
+evidence for the tamper score.
+
+    meta = read_image_metadata('receipt.jpg')
+    for finding in metadata_findings(meta):
+        print(finding['severity'], finding['message'])
+
+Stdlib only, so the package can always import it.
+"""
+import html
+import os
+import re
+import struct
+import zlib
+from datetime import datetime
+
+from .pdf_revisions import EDITING_TOOLS
+
+# Image editors on top of the PDF ones; matched in software fields only (never in ICC descriptions)
+IMAGE_EDITING_TOOLS = EDITING_TOOLS + ('adobe', 'lightroom', 'snapseed', 'picsart', 'pixlr', 'paint.net',
+                                       'affinity', 'photopea', 'fotor', 'polarr', 'facetune', 'meitu')
+MAX_SEGMENTS = 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024      # larger PNG metadata chunks are listed but not read
+MAX_INFLATE_BYTES = 1024 * 1024        # zTXt/iTXt/iCCP are inflated up to this much
+MAX_TOTAL_BYTES = 16 * 1024 * 1024     # metadata read per file, all segments together
+MAX_IFD_ENTRIES = 512
+MAX_HISTORY_EVENTS = 200
+DATE_GAP_SECONDS = 60                  # modified this much after creation is reported
+
+JPEG_APP = (
+    (0xE1, b'Exif\x00', 'Exif'),
+    (0xE1, b'http://ns.adobe.com/xap/1.0/\x00', 'XMP'),
+    (0xE1, b'http://ns.adobe.com/xmp/extension/\x00', 'ExtendedXMP'),
+    (0xE2, b'ICC_PROFILE\x00', 'ICC'),
+    (0xED, b'Photoshop 3.0\x00', 'Photoshop IRB'),
+    (0xEE, b'Adobe', 'Adobe'),
+    (0xE0, b'JFIF\x00', 'JFIF'),
+)
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+# TIFF tag id -> name (the names Pillow's ExifTags use), per IFD
+TIFF_TAGS = {
+    0x0100: 'ImageWidth', 0x0101: 'ImageLength', 0x010E: 'ImageDescription', 0x010F: 'Make', 0x0110: 'Model',
+    0x0112: 'Orientation', 0x011A: 'XResolution', 0x011B: 'YResolution', 0x0128: 'ResolutionUnit',
+    0x0131: 'Software', 0x0132: 'DateTime', 0x013B: 'Artist', 0x013C: 'HostComputer', 0x8298: 'Copyright',
+    0x4746: 'Rating', 0x9C9B: 'XPTitle', 0x9C9C: 'XPComment', 0x9C9D: 'XPAuthor',
+}
+EXIF_TAGS = {
+    0x829A: 'ExposureTime', 0x829D: 'FNumber', 0x8822: 'ExposureProgram', 0x8827: 'ISOSpeedRatings',
+    0x9000: 'ExifVersion', 0x9003: 'DateTimeOriginal', 0x9004: 'DateTimeDigitized', 0x9010: 'OffsetTime',
+    0x9011: 'OffsetTimeOriginal', 0x9012: 'OffsetTimeDigitized', 0x9209: 'Flash', 0x920A: 'FocalLength',
+    0x927C: 'MakerNote', 0x9286: 'UserComment', 0x9290: 'SubsecTime', 0x9291: 'SubsecTimeOriginal',
+    0xA001: 'ColorSpace', 0xA002: 'ExifImageWidth', 0xA003: 'ExifImageHeight', 0xA401: 'CustomRendered',
+    0xA402: 'ExposureMode', 0xA403: 'WhiteBalance', 0xA406: 'SceneCaptureType', 0xA420: 'ImageUniqueID',
+    0xA430: 'CameraOwnerName', 0xA431: 'BodySerialNumber', 0xA433: 'LensMake', 0xA434: 'LensModel',
+}
+GPS_TAGS = {
+    0x0001: 'GPSLatitudeRef', 0x0002: 'GPSLatitude', 0x0003: 'GPSLongitudeRef', 0x0004: 'GPSLongitude',
+    0x0006: 'GPSAltitude', 0x0007: 'GPSTimeStamp', 0x0012: 'GPSMapDatum', 0x001D: 'GPSDateStamp',
+}
+EXIF_IFD, GPS_IFD = 0x8769, 0x8825
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+# Photoshop image resource id -> name, for the ones worth showing
+IRB_RESOURCES = {
+    0x03ED: 'ResolutionInfo', 0x0404: 'IPTC-NAA', 0x0406: 'JPEG quality', 0x0408: 'Grid and guides',
+    0x0409: 'Thumbnail (PS4)', 0x040A: 'Copyright flag', 0x040C: 'Thumbnail', 0x040F: 'ICC profile',
+    0x0414: 'Document IDs seed', 0x041A: 'Slices', 0x0421: 'Version info', 0x0422: 'EXIF data 1',
+    0x0424: 'XMP', 0x0425: 'IPTC digest', 0x0426: 'Print scale', 0x043A: 'Print information',
+}
+IPTC_DATASETS = {
+    (2, 5): 'ObjectName', (2, 25): 'Keywords', (2, 55): 'DateCreated', (2, 60): 'TimeCreated',
+    (2, 62): 'DigitalCreationDate', (2, 63): 'DigitalCreationTime', (2, 65): 'OriginatingProgram',
+    (2, 70): 'ProgramVersion', (2, 80): 'By-line', (2, 105): 'Headline', (2, 110): 'Credit',
+    (2, 115): 'Source', (2, 116): 'CopyrightNotice', (2, 120): 'Caption-Abstract',
+}
+
+_XMP_BLOCKS = ('xmpMM:History', 'xmpMM:DerivedFrom', 'xmpMM:Ingredients', 'xmpMM:Pantry',
+               'photoshop:DocumentAncestors', 'photoshop:TextLayers')
+_XMP_SKIP_PREFIXES = {'xmlns', 'rdf', 'x', 'stEvt', 'stRef', 'stDim', 'xmpG', 'xml'}
+_XMP_ATTRIBUTE = re.compile(r'([A-Za-z][\w.-]*):([A-Za-z][\w.-]*)\s*=\s*"([^"]*)"')
+_XMP_ELEMENT = re.compile(r'<([A-Za-z][\w.-]*):([A-Za-z][\w.-]*)>([^<]*)</\1:\2>')
+_XMP_ALT = re.compile(r'<([A-Za-z][\w.-]*):([A-Za-z][\w.-]*)>\s*<rdf:(?:Alt|Seq|Bag)>\s*<rdf:li[^>]*>([^<]*)</rdf:li>')
+_RDF_LI = re.compile(r'<rdf:li\b([^>]*?)(?:/>|>(.*?)</rdf:li>)', re.S)
+
+
+class _Reader:
+    """Bounded reads at an offset, from a path (one open file) or a bytes-like view."""
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb')
+            self._view = None
+            self.size = os.fstat(self._file.fileno()).st_size
+        else:
+            self._file = None
+            self._view = source
+            self.size = len(source)
+        self.bytes_read = 0
+
+    def read(self, offset, length):
+        length = max(0, min(length, self.size - offset))
+        self.bytes_read += length
+        if self._view is not None:
+            return bytes(self._view[offset:offset + length])
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _text(raw):
+    return raw.split(b'\x00', 1)[0].decode('utf-8', errors='replace').strip()
+
+
+def _inflate(data, limit=MAX_INFLATE_BYTES):
+    """zlib data inflated up to limit bytes (a zip bomb stops there)."""
+    try:
+        return zlib.decompressobj().decompress(data, limit)
+    except zlib.error:
+        return b''
+
+
+# --- EXIF (TIFF structure) ---
+
+def _tiff_value(data, endian, kind, count, value_offset):
+    size = TIFF_TYPE_SIZES.get(kind)
+    if size is None:
+        return None
+    raw = data[value_offset:value_offset + size * count]
+    if len(raw) < size * count:
+        return None
+    if kind == 2:
+        return _text(raw)
+    if kind in (1, 6, 7):
+        if count > 64:
+            return f"<{count} bytes>"
+        if kind == 7 and raw[:8] in (b'ASCII\x00\x00\x00', b'UNICODE\x00'):
+            # UserComment: an 8-byte character code, then the text
+            return raw[8:].decode('utf-16' if raw[:7] == b'UNICODE' else 'ascii', errors='replace').strip('\x00 ')
+        values = list(raw)
+    else:
+        fmt = {3: 'H', 4: 'I', 5: 'II', 8: 'h', 9: 'i', 10: 'ii', 11: 'f', 12: 'd'}[kind]
+        values = list(struct.unpack(f"{endian}{fmt * min(count, 64)}", raw[:size * min(count, 64)]))
+        if kind in (5, 10):
+            values = [round(n / d, 6) if d else 0 for n, d in zip(values[::2], values[1::2])]
+    if not values:
+        return None
+    return values[0] if len(values) == 1 else values
+
+
+def _read_ifd(data, endian, offset, names, tags, pointers=()):
+    """Reads one IFD into tags (by name); returns {pointer tag: offset} and the next IFD's offset."""
+    found = {}
+    if offset <= 0 or offset + 2 > len(data):
+        return found, 0
+    count = min(struct.unpack(f"{endian}H", data[offset:offset + 2])[0], MAX_IFD_ENTRIES)
+    for n in range(count):
+        entry = data[offset + 2 + 12 * n:offset + 14 + 12 * n]
+        if len(entry) < 12:
+            break
+        tag, kind, items = struct.unpack(f"{endian}HHI", entry[:8])
+        if tag in pointers:
+            found[tag] = struct.unpack(f"{endian}I", entry[8:12])[0]
+            continue
+        size = TIFF_TYPE_SIZES.get(kind, 0) * items
+        value_offset = offset + 10 + 12 * n if size <= 4 else struct.unpack(f"{endian}I", entry[8:12])[0]
+        value = _tiff_value(data, endian, kind, items, value_offset)
+        if value is not None and value != '':
+            tags[names.get(tag, f"0x{tag:04X}")] = value
+    end = offset + 2 + 12 * count
+    next_ifd = struct.unpack(f"{endian}I", data[end:end + 4])[0] if end + 4 <= len(data) else 0
+    return found, next_ifd
+
+
+def parse_exif(data):
+    """
+    EXIF tags of a TIFF structure (a JPEG APP1 payload after 'Exif\\0\\0', or
+    a PNG eXIf chunk): {'ifd0', 'exif', 'gps'} dicts by tag name, and
+    'thumbnail' (True when IFD1 is present). Returns None if it is not TIFF.
+    """
+    if data[:2] not in (b'II', b'MM') or len(data) < 8:
+        return None
+    endian = '<' if data[:2] == b'II' else '>'
+    exif = {'ifd0': {}, 'exif': {}, 'gps': {}, 'thumbnail': False}
+    try:
+        ifd0 = struct.unpack(f"{endian}I", data[4:8])[0]
+        pointers, next_ifd = _read_ifd(data, endian, ifd0, TIFF_TAGS, exif['ifd0'], (EXIF_IFD, GPS_IFD))
+        exif['thumbnail'] = bool(next_ifd and next_ifd < len(data))
+        if EXIF_IFD in pointers:
+            _read_ifd(data, endian, pointers[EXIF_IFD], EXIF_TAGS, exif['exif'])
+        if GPS_IFD in pointers:
+            _read_ifd(data, endian, pointers[GPS_IFD], GPS_TAGS, exif['gps'])
+    except struct.error:
+        pass
+    return exif
+
+
+# --- XMP ---
+
+def _attributes(text):
+    return {f"{prefix}:{name}": html.unescape(value) for prefix, name, value in _XMP_ATTRIBUTE.findall(text)}
+
+
+def _structs(block):
+    """The rdf:li items of a Seq/Bag, each as {qualified name: value} from attributes and child elements."""
+    items = []
+    for attributes, body in _RDF_LI.findall(block):
+        item = _attributes(attributes)
+        if body:
+            item.update(_attributes(body))
+            item.update({f"{p}:{n}": html.unescape(v.strip()) for p, n, v in _XMP_ELEMENT.findall(body)})
+            if not item and body.strip() and '<' not in body:
+                item['value'] = html.unescape(body.strip())
+        items.append({key: value for key, value in item.items() if not key.startswith(('rdf:', 'xml:'))})
+    return items
+
+
+def _local(item):
+    return {key.split(':', 1)[1]: value for key, value in item.items()} if item else item
+
+
+def parse_xmp(packet):
+    """
+    Fields of an XMP packet (bytes or str):
+        'properties'         - simple properties by qualified name (e.g. 'xmp:CreatorTool')
+        'history'            - xmpMM:History events: [{'action', 'when', 'softwareAgent', 'changed', ...}]
+        'derived_from'       - xmpMM:DerivedFrom references ({'documentID', 'instanceID', ...}) or None
+        'document_ancestors' - photoshop:DocumentAncestors (documents placed or pasted in)
+        'text_layers'        - photoshop:TextLayers: [{'name', 'text'}]
+    """
+    text = packet.decode('utf-8', errors='replace') if isinstance(packet, (bytes, bytearray)) else packet
+    xmp = {'properties': {}, 'history': [], 'derived_from': None, 'document_ancestors': [], 'text_layers': []}
+
+    blocks = {}
+    for name in _XMP_BLOCKS:
+        match = re.search(rf'<{name}\b([^>]*?)(?:/>|>(.*?)</{name}>)', text, re.S)
+        if match:
+            blocks[name] = (match.group(1), match.group(2) or '')
+            text = text[:match.start()] + text[match.end():]
+        else:
+            # Structs may also be written as an attribute-only element or an attribute of rdf:Description
+            attribute = re.search(rf'\b{name}\s*=\s*"([^"]*)"', text)
+            if attribute:
+                blocks[name] = ('', attribute.group(1))
+
+    events = _structs(blocks.get('xmpMM:History', ('', ''))[1])[:MAX_HISTORY_EVENTS]
+    xmp['history'] = [_local(event) for event in events if event]
+    if 'xmpMM:DerivedFrom' in blocks:
+        attributes, body = blocks['xmpMM:DerivedFrom']
+        reference = _attributes(attributes + body)
+        reference.update({f"{p}:{n}": html.unescape(v.strip()) for p, n, v in _XMP_ELEMENT.findall(body)})
+        xmp['derived_from'] = _local({k: v for k, v in reference.items() if k.startswith('stRef:')}) or None
+    ancestors = _structs(blocks.get('photoshop:DocumentAncestors', ('', ''))[1])
+    xmp['document_ancestors'] = [next(iter(item.values())) for item in ancestors if item]
+    layers = _structs(blocks.get('photoshop:TextLayers', ('', ''))[1])
+    xmp['text_layers'] = [{'name': item.get('photoshop:LayerName', ''), 'text': item.get('photoshop:LayerText', '')}
+                          for item in layers if item]
+
+    properties = {}
+    for prefix, name, value in _XMP_ATTRIBUTE.findall(text):
+        if prefix not in _XMP_SKIP_PREFIXES:
+            properties.setdefault(f"{prefix}:{name}", html.unescape(value))
+    for prefix, name, value in _XMP_ALT.findall(text) + _XMP_ELEMENT.findall(text):
+        if prefix not in _XMP_SKIP_PREFIXES and value.strip():
+            properties.setdefault(f"{prefix}:{name}", html.unescape(value.strip()))
+    xmp['properties'] = properties
+    return xmp
+
+
+# --- Photoshop image resources (APP13) and IPTC ---
+
+def _pascal_unicode(data, pos):
+    length = struct.unpack('>I', data[pos:pos + 4])[0]
+    end = pos + 4 + 2 * length
+    return data[pos + 4:end].decode('utf-16-be', errors='replace').rstrip('\x00'), end
+
+
+def parse_iptc(data):
+    """IPTC-NAA datasets (record 2) by name; repeated ones (Keywords) are joined with ', '."""
+    iptc, pos = {}, 0
+    while pos + 5 <= len(data) and data[pos] == 0x1C:
+        record, dataset, length = data[pos + 1], data[pos + 2], struct.unpack('>H', data[pos + 3:pos + 5])[0]
+        if length & 0x8000:
+            break   # extended dataset lengths are not used for these fields
+        value = data[pos + 5:pos + 5 + length].decode('utf-8', errors='replace').strip('\x00 ')
+        name = IPTC_DATASETS.get((record, dataset))
+        if name and value:
+            iptc[name] = f"{iptc[name]}, {value}" if name in iptc else value
+        pos += 5 + length
+    return iptc
+
+
+def parse_photoshop_irb(data):
+    """
+    Photoshop image resources (8BIM blocks): {'resources': [names], 'writer',
+    'reader' (from Version info), 'iptc' (parse_iptc of IPTC-NAA)}.
+    """
+    irb = {'resources': [], 'writer': None, 'reader': None, 'iptc': {}}
+    pos = 0
+    while pos + 12 <= len(data) and data[pos:pos + 4] == b'8BIM':
+        resource_id = struct.unpack('>H', data[pos + 4:pos + 6])[0]
+        name_length = data[pos + 6]
+        pos += 7 + name_length + ((name_length + 1) % 2)   # Pascal name, padded to even
+        if pos + 4 > len(data):
+            break
+        size = struct.unpack('>I', data[pos:pos + 4])[0]
+        body = data[pos + 4:pos + 4 + size]
+        pos += 4 + size + (size % 2)
+        irb['resources'].append(IRB_RESOURCES.get(resource_id, f"0x{resource_id:04X}"))
+        try:
+            if resource_id == 0x0404:
+                irb['iptc'].update(parse_iptc(body))
+            elif resource_id == 0x0421 and len(body) >= 9:
+                irb['writer'], end = _pascal_unicode(body, 5)
+                irb['reader'], _ = _pascal_unicode(body, end)
+        except struct.error:
+            continue
+    return irb
+
+
+# --- ICC profiles ---
+
+def parse_icc(data):
+    """ICC profile header fields and its description: {'description', 'cmm', 'creator', 'device_class', 'color_space', 'version', 'created'}."""
+    if len(data) < 132 or data[36:40] != b'acsp':
+        return None
+    sig = lambda raw: raw.decode('latin-1').strip('\x00 ') or None
+    y, mo, d, h, mi, s = struct.unpack('>6H', data[24:36])
+    icc = {'description': None, 'cmm': sig(data[4:8]), 'creator': sig(data[80:84]),
+           'device_class': sig(data[12:16]), 'color_space': sig(data[16:20]),
+           'version': f"{data[8]}.{data[9] >> 4}", 'created': f"{y:04d}-{mo:02d}-{d:02d}T{h:02d}:{mi:02d}:{s:02d}"}
+    count = struct.unpack('>I', data[128:132])[0]
+    for n in range(min(count, 100, (len(data) - 132) // 12)):
+        tag, offset, size = struct.unpack('>4sII', data[132 + 12 * n:144 + 12 * n])
+        if tag != b'desc':
+            continue
+        body = data[offset:offset + size]
+        if body[:4] == b'desc' and len(body) >= 12:
+            icc['description'] = _text(body[12:12 + struct.unpack('>I', body[8:12])[0]])
+        elif body[:4] == b'mluc' and len(body) >= 28:
+            length, start = struct.unpack('>II', body[20:28])
+            icc['description'] = body[start:start + length].decode('utf-16-be', errors='replace').strip('\x00 ')
+        break
+    return icc
+
+
+# --- Containers ---
+
+def _empty(file_format):
+    return {'format': file_format, 'width': None, 'height': None, 'error': None, 'segments': [], 'exif': None,
+            'xmp': None, 'photoshop': None, 'icc': None, 'comments': [], 'text': {}, 'png_time': None,
+            'dpi': None, 'bytes_read': 0, 'stopped_at': None}
+
+
+def _read_jpeg(reader, meta):
+    icc_chunks, irb, pos = {}, b'', 2
+    for _ in range(MAX_SEGMENTS):
+        header = reader.read(pos, 4)
+        while len(header) >= 2 and header[0] == 0xFF and header[1] == 0xFF:   # fill bytes
+            pos += 1
+            header = reader.read(pos, 4)
+        if len(header) < 2 or header[0] != 0xFF:
+            meta['error'] = f"expected a marker at offset {pos}"
+            break
+        marker = header[1]
+        if marker in JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker in (0xDA, 0xD9):
+            meta['stopped_at'] = pos   # entropy-coded data (or the end) from here on
+            break
+        if len(header) < 4:
+            meta['error'] = f"truncated segment at offset {pos}"
+            break
+        length = struct.unpack('>H', header[2:4])[0]
+        if marker in JPEG_SOF:
+            frame = reader.read(pos + 4, 5)
+            if len(frame) == 5:
+                meta['height'], meta['width'] = struct.unpack('>HH', frame[1:5])
+        elif (0xE0 <= marker <= 0xEF or marker == 0xFE) and reader.bytes_read < MAX_TOTAL_BYTES:
+            payload = reader.read(pos + 4, length - 2)
+            if marker == 0xFE:
+                meta['segments'].append('COM')
+                meta['comments'].append(payload[:500].decode('utf-8', errors='replace').strip('\x00 '))
+            else:
+                kind = next((k for m, prefix, k in JPEG_APP if m == marker and payload.startswith(prefix)),
+                            f"APP{marker - 0xE0}")
+                meta['segments'].append(kind)
+                if kind == 'Exif' and meta['exif'] is None:
+                    meta['exif'] = parse_exif(payload[6:])
+                elif kind == 'XMP' and meta['xmp'] is None:
+                    meta['xmp'] = parse_xmp(payload[29:])
+                elif kind == 'ICC' and len(payload) > 14:
+                    icc_chunks[payload[12]] = payload[14:]
+                elif kind == 'Photoshop IRB':
+                    irb += payload[14:]
+        pos += 2 + length
+    if icc_chunks:
+        meta['icc'] = parse_icc(b''.join(icc_chunks[n] for n in sorted(icc_chunks)))
+    if irb:
+        meta['photoshop'] = parse_photoshop_irb(irb)
+
+
+def _raw_profile(text):
+    """ImageMagick's hex 'Raw profile type ...' text chunks: '\\n<name>\\n<length>\\n<hex lines>' -> bytes."""
+    parts = text.strip().split('\n', 2)
+    try:
+        return bytes.fromhex(''.join(parts[2].split())) if len(parts) == 3 else b''
+    except ValueError:
+        return b''
+
+
+def _png_text(meta, keyword, value):
+    if keyword == 'XML:com.adobe.xmp':
+        meta['xmp'] = meta['xmp'] or parse_xmp(value)
+    elif keyword.startswith('Raw profile type') and keyword.endswith(('exif', 'APP1')):
+        data = _raw_profile(value)
+        meta['exif'] = meta['exif'] or parse_exif(data[6:] if data.startswith(b'Exif\x00') else data)
+    elif keyword.startswith('Raw profile type') and keyword.endswith('iptc'):
+        meta['photoshop'] = meta['photoshop'] or parse_photoshop_irb(_raw_profile(value))
+    else:
+        meta['text'][keyword] = value[:2000]
+
+
+def _read_png(reader, meta):
+    pos = 8
+    for _ in range(MAX_SEGMENTS):
+        header = reader.read(pos, 8)
+        if len(header) < 8:
+            break
+        length, kind = struct.unpack('>I4s', header)
+        kind = kind.decode('latin-1')
+        if kind in ('IDAT', 'IEND'):
+            meta['stopped_at'] = pos
+            break
+        meta['segments'].append(kind)
+        wanted = kind in ('IHDR', 'tEXt', 'zTXt', 'iTXt', 'eXIf', 'iCCP', 'tIME', 'pHYs')
+        if wanted and length <= MAX_CHUNK_BYTES and reader.bytes_read + length <= MAX_TOTAL_BYTES:
+            data = reader.read(pos + 8, length)
+            try:
+                if kind == 'IHDR':
+                    meta['width'], meta['height'] = struct.unpack('>II', data[:8])
+                elif kind == 'tEXt':
+                    keyword, _, value = data.partition(b'\x00')
+                    _png_text(meta, keyword.decode('latin-1'), value.decode('latin-1'))
+                elif kind == 'zTXt':
+                    keyword, _, value = data.partition(b'\x00')
+                    _png_text(meta, keyword.decode('latin-1'), _inflate(value[1:]).decode('latin-1'))
+                elif kind == 'iTXt':
+                    keyword, _, rest = data.partition(b'\x00')
+                    compressed, rest = rest[0], rest[2:]
+                    _, _, rest = rest.partition(b'\x00')    # language tag
+                    _, _, value = rest.partition(b'\x00')   # translated keyword
+                    value = _inflate(value) if compressed else value
+                    _png_text(meta, keyword.decode('latin-1'), value.decode('utf-8', errors='replace'))
+                elif kind == 'eXIf':
+                    meta['exif'] = parse_exif(data)
+                elif kind == 'iCCP':
+                    name, _, value = data.partition(b'\x00')
+                    meta['icc'] = parse_icc(_inflate(value[1:])) or {'description': name.decode('latin-1')}
+                elif kind == 'tIME':
+                    meta['png_time'] = "{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}".format(*struct.unpack('>HBBBBB', data[:7]))
+                elif kind == 'pHYs':
+                    x, y, unit = struct.unpack('>IIB', data[:9])
+                    if unit == 1:
+                        meta['dpi'] = (round(x * 0.0254), round(y * 0.0254))
+            except (struct.error, IndexError, ValueError):
+                continue
+        pos += 12 + length
+
+
+def read_image_metadata(source, file_type=None):
+    """
+    Header-only metadata of a JPEG or PNG file (a path or a bytes-like view),
+    read up to the first image data. Returns a dict:
+        'format', 'width', 'height' - from the frame header / IHDR
+        'segments'      - metadata segments or chunks in file order
+        'exif'          - parse_exif result, or None
+        'xmp'           - parse_xmp result, or None
+        'photoshop'     - parse_photoshop_irb result (IRB or PNG raw IPTC), or None
+        'icc'           - parse_icc result, or None
+        'comments'      - JPEG COM segments
+        'text'          - PNG text chunks by keyword (other than XMP and raw profiles)
+        'png_time', 'dpi'
+        'bytes_read', 'stopped_at' (offset of the image data), 'error'
+    """
+    with _Reader(source) as reader:
+        signature = reader.read(0, 8)
+        if signature[:2] == b'\xff\xd8':
+            meta = _empty('JPEG')
+            _read_jpeg(reader, meta)
+        elif signature == b'\x89PNG\r\n\x1a\n':
+            meta = _empty('PNG')
+            _read_png(reader, meta)
+        else:
+            meta = _empty(None)
+            meta['error'] = f"not a JPEG or PNG file{f' ({file_type})' if file_type else ''}"
+        meta['bytes_read'] = reader.bytes_read
+    return meta
+
+
+# --- Evidence ---
+
+def _parse_date(value):
+    """EXIF ('2024:03:01 10:00:00') or XMP/ISO dates, as naive datetimes (the zone is dropped); None if unparsable."""
+    if not value:
+        return None
+    value = str(value).strip()
+    match = re.match(r'(\d{4})[:-](\d{2})[:-](\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2}))?)?', value)
+    if not match:
+        return None
+    try:
+        return datetime(*(int(v) if v else 0 for v in match.groups()))
+    except ValueError:
+        return None
+
+
+def software_fields(meta):
+    """(source, value) of every field naming the software that wrote or edited the file."""
+    fields = []
+    exif = meta['exif'] or {}
+    if exif.get('ifd0', {}).get('Software'):
+        fields.append(('EXIF Software', str(exif['ifd0']['Software'])))
+    properties = (meta['xmp'] or {}).get('properties', {})
+    for name in ('xmp:CreatorTool', 'pdf:Producer'):
+        if properties.get(name):
+            fields.append((f"XMP {name.split(':')[1]}", properties[name]))
+    photoshop = meta['photoshop'] or {}
+    if photoshop.get('writer'):
+        fields.append(('Photoshop IRB writer', photoshop['writer']))
+    if photoshop.get('iptc', {}).get('OriginatingProgram'):
+        fields.append(('IPTC OriginatingProgram', photoshop['iptc']['OriginatingProgram']))
+    if meta['text'].get('Software'):
+        fields.append(('PNG Software', meta['text']['Software']))
+    return fields
+
+
+def editing_software(values):
+    """The IMAGE_EDITING_TOOLS mentioned in any of the given strings."""
+    lowered = ' '.join(v.lower() for v in values if v)
+    return [tool for tool in IMAGE_EDITING_TOOLS if tool in lowered]
+
+
+def metadata_findings(meta):
+    """
+    Evidence from the metadata, strongest first: [{'severity' ('high' or
+    'medium'), 'kind', 'message'}]. Kinds:
+        software    - an editor in EXIF Software, XMP CreatorTool, the IRB or IPTC
+        history     - XMP edit history saved by an editor, or several saves
+        composite   - other documents placed or pasted in (photoshop:DocumentAncestors)
+        text_layers - Photoshop text layers (typed text, e.g. a changed total)
+        derived     - derived from another document (xmpMM:DerivedFrom)
+        dates       - modified well after it was created
+        dimensions  - the EXIF size differs from the actual frame
+    """
+    findings = []
+    xmp = meta['xmp'] or {'properties': {}, 'history': [], 'derived_from': None, 'document_ancestors': [],
+                          'text_layers': []}
+    exif = meta['exif'] or {'ifd0': {}, 'exif': {}}
+
+    fields = software_fields(meta)
+    tools = editing_software(value for _, value in fields)
+    if tools:
+        named = [f"{value} ({source})" for source, value in fields if editing_software([value])]
+        findings.append({'severity': 'high', 'kind': 'software',
+                         'message': f"Editing software in the metadata: {'; '.join(named)}."})
+
+    history = xmp['history']
+    edits = [event for event in history if event.get('action', '').lower() not in ('', 'created')]
+    edited_by = [event for event in edits if editing_software([event.get('softwareAgent', '')])]
+    if edited_by:
+        last = edited_by[-1]
+        changed = f", changed {last['changed']}" if last.get('changed') else ""
+        findings.append({'severity': 'high', 'kind': 'history',
+                         'message': f"XMP edit history records {len(edits)} event(s) after creation; the last by an editor was "
+                                    f"'{last.get('action')}' with {last.get('softwareAgent')} at {last.get('when', 'an unknown time')}{changed}."})
+    elif len(edits) > 1:
+        findings.append({'severity': 'medium', 'kind': 'history',
+                         'message': f"XMP edit history records {len(edits)} saves or conversions after creation "
+                                    f"({', '.join(sorted({e.get('action', '') for e in edits}))})."})
+    legacy_history = xmp['properties'].get('photoshop:History')
+    if legacy_history and not edited_by:
+        findings.append({'severity': 'medium', 'kind': 'history',
+                         'message': f"Photoshop history log present: {legacy_history[:200]}"})
+
+    if xmp['document_ancestors']:
+        findings.append({'severity': 'high', 'kind': 'composite',
+                         'message': f"{len(xmp['document_ancestors'])} other document(s) were placed or pasted into this "
+                                    f"image (photoshop:DocumentAncestors)."})
+    if xmp['text_layers']:
+        texts = [layer['text'] or layer['name'] for layer in xmp['text_layers']][:5]
+        findings.append({'severity': 'high', 'kind': 'text_layers',
+                         'message': f"Photoshop text layers were typed into this image: {', '.join(repr(t[:60]) for t in texts)}."})
+    document_id = xmp['properties'].get('xmpMM:DocumentID')
+    original_id = xmp['properties'].get('xmpMM:OriginalDocumentID')
+    if xmp['derived_from'] or (original_id and document_id and original_id != document_id):
+        findings.append({'severity': 'medium', 'kind': 'derived',
+                         'message': "The XMP says this file was derived from another document "
+                                    f"({(xmp['derived_from'] or {}).get('documentID') or original_id})."})
+
+    for source, created, modified in (
+            ('EXIF', exif['exif'].get('DateTimeOriginal'), exif['ifd0'].get('DateTime')),
+            ('XMP', xmp['properties'].get('xmp:CreateDate'), xmp['properties'].get('xmp:ModifyDate'))):
+        created_at, modified_at = _parse_date(created), _parse_date(modified)
+        if created_at and modified_at and (modified_at - created_at).total_seconds() > DATE_GAP_SECONDS:
+            findings.append({'severity': 'medium', 'kind': 'dates',
+                             'message': f"{source} modification date {modified} is after the creation date {created}."})
+
+    exif_size = (exif['exif'].get('ExifImageWidth'), exif['exif'].get('ExifImageHeight'))
+    frame = (meta['width'], meta['height'])
+    if all(isinstance(v, int) for v in exif_size) and all(frame) and exif_size not in (frame, frame[::-1]):
+        findings.append({'severity': 'medium', 'kind': 'dimensions',
+                         'message': f"EXIF records {exif_size[0]}x{exif_size[1]} but the image is {frame[0]}x{frame[1]}: "
+                                    f"resized or cropped after the EXIF was written."})
+
+    findings.sort(key=lambda f: f['severity'] != 'high')
+    return findings
@@ -0,0 +1,160 @@
+# forensic_tools/ingest.py
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1024 * 1024
+HEADER_SIZE = 16
+
+# (magic bytes, file type, extensions that are consistent with it)
+FILE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG', {'jpg', 'jpeg'}),
+    (b'\x89PNG\r\n\x1a\n', 'PNG', {'png'}),
+    (b'%PDF', 'PDF', {'pdf'}),
+]
+
+
+def sniff_signature(header):
+    """
+    Identifies a file from its first bytes. Returns (file_type, signature_status),
+    where file_type is None and the status is flagged when the magic is unknown.
+    """
+    for magic, file_type, _ in FILE_SIGNATURES:
+        if header.startswith(magic):
+            return file_type, f"{file_type} (OK)"
+    return None, f"UNKNOWN/SUSPICIOUS (Starts with: {header[:4].hex()}...)"
+
+
+def signature_matches_extension(file_type, extension):
+    for _, known_type, extensions in FILE_SIGNATURES:
+        if known_type == file_type:
+            return extension.lower() in extensions
+    return False
+
+
+class _NullWriter:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, chunk):
+        pass
+
+
+def _ingest(read_chunk, dest_path, chunk_size):
+    sha256, sha1, md5 = hashlib.sha256(), hashlib.sha1(), hashlib.md5()
+    header = b''
+    size = 0
+
+    with open(dest_path, 'wb') if dest_path else _NullWriter() as out:
+        for chunk in iter(lambda: read_chunk(chunk_size), b''):
+            if len(header) < HEADER_SIZE:
+                header += chunk[:HEADER_SIZE - len(header)]
+            sha256.update(chunk)
+            sha1.update(chunk)
+            md5.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+
+    file_type, signature_status = sniff_signature(header)
+    return {
+        'path': dest_path,
+        'size': size,
+        'sha256': sha256.hexdigest(),
+        'sha1': sha1.hexdigest(),
+        'md5': md5.hexdigest(),
+        'file_type': file_type,
+        'signature_status': signature_status,
+        'header_hex': header.hex(),
+    }
+
+
+def ingest_upload(stream, dest_path, chunk_size=CHUNK_SIZE):
+    """
+    Streams an upload (any object with read(n), e.g. a werkzeug FileStorage
+    stream) to dest_path in chunks. In the same pass it computes SHA-256,
+    SHA-1, MD5 and the size, and sniffs the magic bytes, so no later stage
+    has to read the file again just to fingerprint it.
+    """
+    try:
+        return _ingest(stream.read, dest_path, chunk_size)
+    except Exception:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+
+def ingest_file(file_path, chunk_size=CHUNK_SIZE):
+    """Computes the same digests for a file that is already on disk (one read, no copy)."""
+    with open(file_path, 'rb') as f:
+        info = _ingest(f.read, None, chunk_size)
+    info['path'] = file_path
+    return info
+
+
+@contextmanager
+def open_mapped(file_path):
+    """
+    Yields a read-only memory-mapped view of the file. The view supports
+    read/seek/tell, so Pillow and pypdf can parse it without copying the
+    file into memory. Empty files yield an empty bytes object.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view
+        finally:
+            view.close()
+
+
+class MappedReader(io.RawIOBase):
+    """
+    A read-only file object over a memory-mapped view (see open_mapped) with
+    its own position. The view's read/seek cursor is shared by everyone
+    holding it, so consumers running at the same time each wrap the view in
+    a MappedReader instead of seeking the view itself. Nothing is copied
+    beyond the bytes each read returns.
+    """
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        data = self._view[self._position:end]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"invalid whence ({whence})")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self):
+        return self._position
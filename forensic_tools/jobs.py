@@ -0,0 +1,320 @@
+# forensic_tools/jobs.py
+import json
+import multiprocessing
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import traceback
+from functools import partial
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    stages TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    worker_pid INTEGER,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+
+if os.name == 'nt':
+    import ctypes
+
+    def pid_alive(pid):
+        """Whether a process with this pid is running on this machine."""
+        if not pid:
+            return False
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, int(pid))  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # access denied: it exists
+        code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+else:
+    def pid_alive(pid):
+        """Whether a process with this pid is running on this machine."""
+        if not pid:
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+class Heartbeat:
+    """
+    Calls beat() every interval seconds on a background thread for the
+    duration of a with block, to keep a lease alive while its holder works.
+    """
+
+    def __init__(self, beat, interval):
+        self.beat = beat
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"  [HEARTBEAT ERROR] {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the queue is at its configured depth."""
+
+
+class JobQueue:
+    """
+    A small job queue stored in a local SQLite file, so analyses can run in
+    worker processes without any outside service. Every method opens its own
+    connection, which makes one JobQueue safe to share between threads and
+    to re-create inside worker processes.
+
+    A claimed job records its worker's pid, and the worker renews the job's
+    heartbeat while it runs (see worker_loop). A running job is only put
+    back in the queue once that process is gone or its heartbeat is older
+    than lease_seconds, so several web processes can share one queue file.
+    Finished and failed jobs, results included, are deleted by sweep() once
+    they have not changed for ttl seconds.
+    """
+
+    def __init__(self, db_path, max_depth=32, lease_seconds=120, ttl=24 * 3600):
+        self.db_path = db_path
+        self.max_depth = max_depth
+        self.lease_seconds = lease_seconds
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row_to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['stages'] = json.loads(job['stages'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def submit(self, file_path, original_filename, params=None):
+        """Queues a job and returns its id. Raises QueueFull when the queue is at max_depth."""
+        job_id = secrets.token_hex(12)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise QueueFull(f"{pending} jobs pending (limit {self.max_depth})")
+            conn.execute(
+                "INSERT INTO jobs (id, status, file_path, original_filename, params, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, file_path, original_filename, json.dumps(params or {}), now, now),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self):
+        """Atomically takes the oldest queued job and marks it running by this process. Returns None if idle."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated = ?, worker_pid = ?, heartbeat = ? WHERE id = ?",
+                (RUNNING, now, os.getpid(), now, row['id']),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        job = self._row_to_job(row)
+        job['status'] = RUNNING
+        return job
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row)
+
+    def depth(self):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def set_stage(self, job_id, stage, status):
+        """Records per-stage progress, e.g. set_stage(id, 'ela', 'done')."""
+        job = self.get(job_id)
+        if job is None:
+            return
+        stages = job['stages']
+        stages[stage] = status
+        self._update(job_id, stages=json.dumps(stages))
+
+    def finish(self, job_id, result):
+        self._update(job_id, status=DONE, result=json.dumps(result))
+
+    def fail(self, job_id, error):
+        self._update(job_id, status=FAILED, error=str(error))
+
+    def heartbeat(self, job_id):
+        """Renews the lease of a job this process is running."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ? AND worker_pid = ?",
+                         (time.time(), job_id, RUNNING, os.getpid()))
+        finally:
+            conn.close()
+
+    def requeue_running(self):
+        """
+        Puts back in the queue the running jobs whose worker process is gone
+        or whose heartbeat is older than lease_seconds (a hung worker, or a
+        reused pid). Jobs still being worked on are left alone. Returns the
+        number of jobs requeued.
+        """
+        expired = time.time() - self.lease_seconds
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute("SELECT id, worker_pid, heartbeat, updated FROM jobs WHERE status = ?",
+                                (RUNNING,)).fetchall()
+            stale = [row['id'] for row in rows
+                     if (row['heartbeat'] or row['updated']) < expired or not pid_alive(row['worker_pid'])]
+            conn.executemany("UPDATE jobs SET status = ?, worker_pid = NULL WHERE id = ? AND status = ?",
+                             [(QUEUED, job_id, RUNNING) for job_id in stale])
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return len(stale)
+
+    def sweep(self):
+        """Deletes the finished and failed jobs not updated for ttl seconds. Returns the number deleted."""
+        if not self.ttl:
+            return 0
+        conn = self._connect()
+        try:
+            return conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                                (DONE, FAILED, time.time() - self.ttl)).rowcount
+        finally:
+            conn.close()
+
+
+def worker_loop(db_path, runner, stop_event, poll_interval=0.5, lease_seconds=120, ttl=24 * 3600):
+    """
+    Body of a worker process: claims jobs one at a time and calls
+    runner(job, progress), where progress(stage, status) records per-stage
+    completion. The runner's return value is stored as the job result.
+    The job's heartbeat is renewed while it runs, and an idle worker puts
+    back the jobs of dead workers and sweeps out expired ones once per lease.
+    """
+    queue = JobQueue(db_path, lease_seconds=lease_seconds, ttl=ttl)
+    swept = 0.0
+    while not stop_event.is_set():
+        job = queue.claim()
+        if job is None:
+            if time.monotonic() - swept >= lease_seconds:
+                queue.requeue_running()
+                queue.sweep()
+                swept = time.monotonic()
+            stop_event.wait(poll_interval)
+            continue
+
+        def progress(stage, status='done', job_id=job['id']):
+            queue.set_stage(job_id, stage, status)
+
+        try:
+            with Heartbeat(partial(queue.heartbeat, job['id']), lease_seconds / 4):
+                result = runner(job, progress)
+            queue.finish(job['id'], result)
+        except Exception as e:
+            print(f"  [JOB ERROR] Job {job['id']} failed: {e}")
+            traceback.print_exc()
+            queue.fail(job['id'], e)
+
+
+def start_workers(db_path, runner, count, lease_seconds=120, ttl=24 * 3600):
+    """
+    Starts count worker processes running worker_loop. The processes are not
+    daemonic because the analysis itself may start a process pool (PDF pages).
+    Returns (processes, stop_event); set the event and join to shut down.
+    """
+    stop_event = multiprocessing.Event()
+    processes = []
+    for n in range(count):
+        process = multiprocessing.Process(
+            target=worker_loop, args=(db_path, runner, stop_event),
+            kwargs={'lease_seconds': lease_seconds, 'ttl': ttl},
+            name=f"jejakpalsu-worker-{n + 1}",
+        )
+        process.start()
+        processes.append(process)
+    return processes, stop_event
@@ -0,0 +1,381 @@
+# forensic_tools/jpeg_markers.py
+import mmap
+import os
+import re
+import struct
+from functools import lru_cache
+
+# Marker byte (after 0xFF) -> name. SOFn markers describe the frame; C4 (DHT),
+# C8 (JPG) and CC (DAC) share the range but are not frame headers.
+SOF_MARKERS = {
+    0xC0: 'baseline', 0xC1: 'extended sequential', 0xC2: 'progressive', 0xC3: 'lossless',
+    0xC5: 'differential sequential', 0xC6: 'differential progressive', 0xC7: 'differential lossless',
+    0xC9: 'arithmetic sequential', 0xCA: 'arithmetic progressive', 0xCB: 'arithmetic lossless',
+    0xCD: 'differential arithmetic sequential', 0xCE: 'differential arithmetic progressive',
+    0xCF: 'differential arithmetic lossless',
+}
+MARKER_NAMES = {
+    0xD8: 'SOI', 0xD9: 'EOI', 0xDA: 'SOS', 0xDB: 'DQT', 0xC4: 'DHT', 0xDD: 'DRI',
+    0xFE: 'COM', 0xCC: 'DAC', 0xDC: 'DNL', 0xDE: 'DHP', 0xDF: 'EXP',
+}
+MARKER_NAMES.update({m: f"SOF{m - 0xC0}" for m in SOF_MARKERS})
+MARKER_NAMES.update({0xE0 + n: f"APP{n}" for n in range(16)})
+
+# Markers without a length field
+STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+# A marker inside entropy-coded data: FF not followed by a stuffed 00 or an RSTn (a literal
+# first byte lets the regex engine skip ahead, ~1 ms per MB)
+_SCAN_MARKER = re.compile(rb'\xff([^\x00\xd0-\xd7])')
+
+# APPn payload prefixes -> segment kind
+APP_SIGNATURES = (
+    (0xE0, b'JFIF\x00', 'JFIF'),
+    (0xE0, b'JFXX\x00', 'JFXX'),
+    (0xE1, b'Exif\x00', 'Exif'),
+    (0xE1, b'http://ns.adobe.com/xap/1.0/\x00', 'XMP'),
+    (0xE2, b'ICC_PROFILE\x00', 'ICC'),
+    (0xED, b'Photoshop 3.0\x00', 'Photoshop IRB'),
+    (0xEE, b'Adobe', 'Adobe'),
+)
+
+# Comment prefixes written by common re-encoders
+ENCODER_COMMENTS = (
+    (b'CREATOR: gd-jpeg', 'GD library'),
+    (b'Lavc', 'FFmpeg'),
+    (b'Created with GIMP', 'GIMP'),
+)
+
+# Photoshop's quality presets. Pillow ships their tables as PIL.JpegPresets
+# (natural order, luminance then chrominance); the names are Pillow's.
+PHOTOSHOP_PRESETS = {
+    'web_low': "Save for Web: Low", 'web_medium': "Save for Web: Medium", 'web_high': "Save for Web: High",
+    'web_very_high': "Save for Web: Very High", 'web_maximum': "Save for Web: Maximum",
+    'low': "Low", 'medium': "Medium", 'high': "High", 'maximum': "Maximum",
+}
+
+# Natural (row-major) position of each zig-zag coefficient, as stored in DQT
+ZIGZAG = (
+    0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34, 27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63,
+)
+
+# ITU T.81 Annex K example tables (natural order), which libjpeg scales by quality
+STD_LUMINANCE = (
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+)
+STD_CHROMINANCE = (
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+)
+
+
+def ijg_table(standard, quality):
+    """The table libjpeg (and Pillow, which uses it) writes for quality 1-100."""
+    scale = 5000 // quality if quality < 50 else 200 - quality * 2
+    return tuple(min(max((v * scale + 50) // 100, 1), 255) for v in standard)
+
+
+@lru_cache(maxsize=1)
+def _ijg_signatures():
+    # Luminance table -> quality, for an exact lookup of standard libjpeg output
+    signatures = {}
+    for quality in range(1, 101):
+        signatures.setdefault(ijg_table(STD_LUMINANCE, quality), quality)
+    return signatures
+
+
+@lru_cache(maxsize=1)
+def _photoshop_signatures():
+    # (luminance, chrominance) tables -> Photoshop preset; empty without Pillow
+    try:
+        from PIL.JpegPresets import presets
+    except ImportError:
+        return {}
+    return {tuple(tuple(table) for table in presets[name]['quantization'][:2]): label
+            for name, label in PHOTOSHOP_PRESETS.items() if name in presets}
+
+
+def photoshop_preset(quant_tables):
+    """The Photoshop quality preset whose tables these are exactly, or None."""
+    luma, chroma = quant_tables.get(0), quant_tables.get(1)
+    if not luma or not chroma:
+        return None
+    return _photoshop_signatures().get((luma['values'], chroma['values']))
+
+
+def _table_quality(values, standard):
+    """Estimates the IJG quality a table corresponds to from its mean scaling."""
+    scale = sum(values) * 100 / sum(standard)
+    if scale <= 0:
+        return 100
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return int(round(min(max(quality, 1), 100)))
+
+
+def _parse_frame(marker, payload):
+    precision, height, width, count = struct.unpack('>BHHB', payload[:6])
+    components = []
+    for i in range(count):
+        component_id, sampling, table_id = payload[6 + i * 3:9 + i * 3]
+        components.append({'id': component_id, 'h': sampling >> 4, 'v': sampling & 0x0F, 'quant_table': table_id})
+    return {
+        'type': SOF_MARKERS[marker],
+        'progressive': marker in (0xC2, 0xC6, 0xCA, 0xCE),
+        'precision': precision,
+        'width': width,
+        'height': height,
+        'components': components,
+    }
+
+
+def _parse_dqt(payload, tables, redefined):
+    pos = 0
+    while pos < len(payload):
+        precision, table_id = payload[pos] >> 4, payload[pos] & 0x0F
+        size = 128 if precision else 64
+        raw = payload[pos + 1:pos + 1 + size]
+        if len(raw) < size:
+            raise ValueError("truncated DQT segment")
+        zigzag = struct.unpack(f'>{64}H', raw) if precision else tuple(raw)
+        values = [0] * 64
+        for k, v in enumerate(zigzag):
+            values[ZIGZAG[k]] = v
+        if table_id in tables:
+            redefined.add(table_id)
+        tables[table_id] = {'precision': 16 if precision else 8, 'values': tuple(values)}
+        pos += 1 + size
+
+
+def _count_dht(payload):
+    count, pos = 0, 0
+    while pos + 17 <= len(payload):
+        pos += 17 + sum(payload[pos + 1:pos + 17])
+        count += 1
+    return count
+
+
+def find_eoi(view, scan_offset):
+    """
+    Offset of the EOI that ends the image whose first SOS is at scan_offset,
+    or None if the data ends first. Entropy-coded data is skipped (stuffed
+    FF 00 and RSTn markers), and marker segments between scans (DHT, DQT,
+    SOS... in progressive files) are stepped over by their length, so
+    whatever follows the EOI, even a second JPEG, is not searched.
+    """
+    size = len(view)
+    pos = scan_offset
+    while pos < size:
+        match = _SCAN_MARKER.search(view, pos)
+        if match is None:
+            return None
+        marker = match.group(1)[0]
+        if marker == 0xD9:
+            return match.start()
+        if marker == 0xFF:  # fill byte: the marker follows
+            pos = match.start() + 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            pos = match.end()
+            continue
+        length = struct.unpack('>H', view[match.end():match.end() + 2])[0] if match.end() + 2 <= size else 0
+        if length < 2:
+            return None
+        pos = match.end() + length
+    return None
+
+
+def parse_jpeg_markers(view):
+    """
+    Walks the JPEG marker segments of a bytes-like view (bytes or mmap) from
+    SOI up to the first SOS, without decoding any pixel data. Returns a dict:
+        {'valid', 'error', 'segments': [{'offset', 'marker', 'name', 'length'}],
+         'quant_tables': {id: {'precision', 'values' (natural order)}},
+         'redefined_tables', 'frame', 'huffman_tables', 'restart_interval',
+         'app_segments', 'comments', 'scan_offset', 'trailing_bytes'}
+    'valid' is True when a frame header and a scan were both found.
+    """
+    info = {
+        'valid': False, 'error': None, 'segments': [], 'quant_tables': {}, 'redefined_tables': [],
+        'frame': None, 'huffman_tables': 0, 'restart_interval': 0, 'app_segments': [],
+        'comments': [], 'scan_offset': None, 'trailing_bytes': 0,
+    }
+    size = len(view)
+    if view[:2] != b'\xff\xd8':
+        info['error'] = "missing SOI marker"
+        return info
+
+    redefined = set()
+    pos = 2
+    try:
+        while pos < size:
+            if view[pos] != 0xFF:
+                raise ValueError(f"expected a marker at offset {pos}")
+            while pos < size and view[pos] == 0xFF:  # fill bytes
+                pos += 1
+            if pos >= size:
+                break
+            marker = view[pos]
+            offset = pos - 1
+            pos += 1
+            name = MARKER_NAMES.get(marker, f"0x{marker:02X}")
+
+            if marker in STANDALONE_MARKERS:
+                info['segments'].append({'offset': offset, 'marker': marker, 'name': name, 'length': 0})
+                continue
+            if marker == 0xD9:
+                info['segments'].append({'offset': offset, 'marker': marker, 'name': name, 'length': 0})
+                break
+
+            length = struct.unpack('>H', view[pos:pos + 2])[0]
+            if length < 2 or pos + length > size:
+                raise ValueError(f"{name} segment at offset {offset} overruns the file")
+            payload = view[pos + 2:pos + length]
+            info['segments'].append({'offset': offset, 'marker': marker, 'name': name, 'length': length})
+            pos += length
+
+            if marker == 0xDB:
+                _parse_dqt(payload, info['quant_tables'], redefined)
+            elif marker in SOF_MARKERS:
+                info['frame'] = _parse_frame(marker, payload)
+            elif marker == 0xC4:
+                info['huffman_tables'] += _count_dht(payload)
+            elif marker == 0xDD:
+                info['restart_interval'] = struct.unpack('>H', payload[:2])[0]
+            elif marker == 0xFE:
+                info['comments'].append(bytes(payload[:200]))
+            elif 0xE0 <= marker <= 0xEF:
+                kind = next((k for m, prefix, k in APP_SIGNATURES
+                             if m == marker and payload[:len(prefix)] == prefix), name)
+                info['app_segments'].append(kind)
+            elif marker == 0xDA:
+                # Entropy-coded data follows; everything needed is in the headers
+                info['scan_offset'] = offset
+                break
+    except (ValueError, struct.error, IndexError) as e:
+        info['error'] = str(e)
+
+    if info['scan_offset'] is not None:
+        # The first EOI after the scans ends the image; anything appended after it is trailing data
+        eoi = find_eoi(view, info['scan_offset'])
+        if eoi is not None:
+            info['trailing_bytes'] = size - eoi - 2
+
+    info['redefined_tables'] = sorted(redefined)
+    info['valid'] = info['error'] is None and info['frame'] is not None and info['scan_offset'] is not None
+    return info
+
+
+def _subsampling(frame):
+    components = frame['components'] if frame else []
+    if len(components) != 3:
+        return 'grayscale' if len(components) == 1 else 'N/A'
+    y, cb, cr = components
+    if (cb['h'], cb['v']) != (cr['h'], cr['v']) or cb['h'] == 0 or cb['v'] == 0:
+        return 'non-standard'
+    ratio = (y['h'] // cb['h'], y['v'] // cb['v'])
+    return {(1, 1): '4:4:4', (2, 1): '4:2:2', (2, 2): '4:2:0', (1, 2): '4:4:0', (4, 1): '4:1:1'}.get(ratio, 'non-standard')
+
+
+def estimate_quality(quant_tables):
+    """
+    Matches quantization tables against the scaled libjpeg tables. Returns
+    (quality, exact, chroma_quality): exact is True when the tables are exactly
+    what libjpeg writes at that quality, otherwise the quality is estimated
+    from the average scaling of the luminance table.
+    """
+    luma = quant_tables.get(0)
+    if not luma:
+        return None, False, None
+    chroma = quant_tables.get(1)
+
+    quality = _ijg_signatures().get(luma['values'])
+    if quality is not None and (chroma is None or chroma['values'] == ijg_table(STD_CHROMINANCE, quality)):
+        return quality, True, quality
+
+    chroma_quality = _table_quality(chroma['values'], STD_CHROMINANCE) if chroma else None
+    return _table_quality(luma['values'], STD_LUMINANCE), False, chroma_quality
+
+
+def analyze_jpeg(source):
+    """
+    Header-only JPEG analysis of a file path or bytes-like view: marker
+    structure, quantization tables, quality estimate, encoder signature and
+    recompression indicators. It touches only the header bytes, so it is cheap
+    enough to run on every upload before ELA. Returns the parse_jpeg_markers
+    dict extended with 'quality', 'quality_exact', 'chroma_quality',
+    'photoshop_preset', 'encoder', 'subsampling', 'indicators' (a list of
+    strings, each evidence of a re-save) and 'notes' (the same for traits
+    that many cameras and libraries share, which prove nothing on their own).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return analyze_jpeg(b'')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                return analyze_jpeg(view)
+
+    info = parse_jpeg_markers(source)
+    quality, exact, chroma_quality = estimate_quality(info['quant_tables'])
+    preset = photoshop_preset(info['quant_tables'])
+    apps = info['app_segments']
+    info.update(
+        quality=quality, quality_exact=exact, chroma_quality=chroma_quality, photoshop_preset=preset,
+        subsampling=_subsampling(info['frame']), encoder='Unknown', indicators=[], notes=[],
+    )
+    if info['error'] and info['segments']:
+        print(f"  [JPEG ERROR] Marker parse stopped: {info['error']}")
+
+    comment_encoder = next((name for c in info['comments'] for prefix, name in ENCODER_COMMENTS
+                            if c.startswith(prefix)), None)
+    if preset:
+        info['encoder'] = f"Adobe Photoshop ({preset} tables)"
+    elif 'Photoshop IRB' in apps:
+        info['encoder'] = 'Adobe Photoshop or an IPTC editor (image resources)'
+    elif comment_encoder:
+        info['encoder'] = comment_encoder
+    elif exact:
+        info['encoder'] = 'libjpeg (standard IJG tables)'
+    elif quality is not None:
+        info['encoder'] = 'Custom tables (camera firmware or editor)'
+
+    indicators, notes = info['indicators'], info['notes']
+    if preset:
+        indicators.append(f"Quantization tables are Photoshop's \"{preset}\" preset: the file was last saved by Photoshop.")
+    if 'Photoshop IRB' in apps:
+        indicators.append("Photoshop image resources (APP13): written by Photoshop and IPTC metadata editors.")
+    if 'Adobe' in apps:
+        notes.append("Adobe APP14 segment: records the colour transform; libjpeg and many other encoders write it too.")
+    if comment_encoder:
+        indicators.append(f"Comment segment written by {comment_encoder}, a re-encoding tool.")
+    if exact and 'Exif' in apps:
+        notes.append(f"Camera EXIF data alongside standard libjpeg tables (Q{quality}): many cameras and phone apps use these tables.")
+    if 'JFIF' in apps and 'Exif' in apps and apps.index('JFIF') < apps.index('Exif'):
+        indicators.append("JFIF header written in front of the EXIF block, typical of a software re-save.")
+    if info['redefined_tables']:
+        indicators.append(f"Quantization table(s) {info['redefined_tables']} defined more than once.")
+    if not exact and chroma_quality is not None and abs(quality - chroma_quality) > 15:
+        indicators.append(f"Luminance (~Q{quality}) and chrominance (~Q{chroma_quality}) tables are scaled inconsistently.")
+    if info['trailing_bytes']:
+        indicators.append(f"{info['trailing_bytes']:,} bytes of data after the EOI marker.")
+    return info
+
+
+def format_quant_table(values):
+    """8x8 grid of a natural-order table, for display."""
+    return '\n'.join(' '.join(f"{v:3d}" for v in values[row * 8:row * 8 + 8]) for row in range(8))
@@ -0,0 +1,74 @@
+# forensic_tools/metadata_check.py
+import os
+import datetime 
+import io # New import for string handling
+from .image_metadata import metadata_findings, read_image_metadata
+from .ingest import HEADER_SIZE, sniff_signature
+
+def check_metadata(file_path):
+    """
+    Extracts file system and image metadata, returning both structured data and an HTML string.
+    EXIF, XMP and the Photoshop resources are read from the headers only (see image_metadata);
+    results['Findings'] lists the edit evidence found there.
+    """
+    results = {}
+    html_output = ""
+    
+    try:
+        # --- 1. File System Metadata Check (Always Available) ---
+        file_stats = os.stat(file_path)
+        
+        # Capture HTML output for Section 2
+        html_output += "<h4>File System Metadata:</h4>"
+        html_output += f"<ul><li><strong>File Size (Bytes):</strong> {file_stats.st_size}</li>"
+        html_output += f"<li><strong>Creation Time:</strong> {datetime.datetime.fromtimestamp(file_stats.st_ctime)}</li>"
+        html_output += f"<li><strong>Modification Time:</strong> {datetime.datetime.fromtimestamp(file_stats.st_mtime)}</li></ul>"
+        
+        # --- 2. EXIF (Image) Metadata Check ---
+        meta = read_image_metadata(file_path)
+        exif_data = meta['exif']
+        
+        if exif_data:
+            html_output += "<h4>EXIF (Image) Metadata:</h4><ul>"
+            
+            # Standard Tag Extraction
+            tags = dict(exif_data['ifd0'], **exif_data['exif'])
+            for tag in ['DateTimeOriginal', 'Make', 'Model', 'Software', 'Artist']:
+                if tag in tags:
+                    results[tag] = tags[tag]
+                    html_output += f"<li><strong>{tag}:</strong> {tags[tag]}</li>"
+            
+            html_output += "</ul>"
+
+        # Forensic Checks (for scoring): editing software, XMP edit history, placed documents, text layers
+        findings = metadata_findings(meta)
+        if findings:
+            results['TAMPER_ALERT'] = "High" if findings[0]['severity'] == 'high' else "Medium"
+            results['Findings'] = [finding['message'] for finding in findings]
+            html_output += "".join(f"<p class='alert-{finding['severity']}'><strong>[METADATA ALERT]</strong> {finding['message']}</p>"
+                                   for finding in findings)
+        
+        if not exif_data:
+            html_output += "<p>[INFO] No EXIF Metadata found (Common for PNG or converted PDF/scans).</p>"
+            
+    except Exception as e:
+        html_output += f"<p class='alert-high'>[META ERROR] Metadata check failed: {e}</p>"
+
+    # Return structured data and the HTML string
+    return results, html_output
+
+def check_file_signature(file_path):
+    # This function remains unchanged (returns structured data, not HTML)
+    results = {}
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        
+        _, signature_status = sniff_signature(header)
+            
+        results = {"HEX_DATA": header.hex(), "SIGNATURE_STATUS": signature_status}
+
+    except Exception as e:
+        results = {"HEX_DATA": "ERROR", "SIGNATURE_STATUS": f"Error reading file: {e}"}
+    
+    return results
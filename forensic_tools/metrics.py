@@ -0,0 +1,210 @@
+# forensic_tools/metrics.py
+"""
+In-process metrics for the analysis pipeline, exposed in the Prometheus
+text format without needing prometheus_client.
+
+Stage timings come from StageTimer, which turns the pipeline's
+progress(stage) calls into consecutive spans and takes the measured
+durations of stages that ran concurrently (record). Worker processes write
+their own registry to a snapshot file (dump_snapshot), and the web
+process adds those files to its own numbers when rendering /metrics.
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+PREFIX = 'jejakpalsu'
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MEGAPIXEL_BUCKETS = (0.5, 1, 2, 4, 8, 12, 16, 24, 36, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'stage_duration_seconds': ('histogram', "Wall time of each analysis stage.", DURATION_BUCKETS),
+    'stage_bytes_total': ('counter', "Bytes read or decoded by each analysis stage.", None),
+    'stage_errors_total': ('counter', "Errors handled inside each analysis stage.", None),
+    'image_megapixels': ('histogram', "Size of decoded images and rasterized PDF pages.", MEGAPIXEL_BUCKETS),
+    'analyses_total': ('counter', "Completed analyses by file type and cache outcome.", None),
+    'admissions_total': ('counter', "Admission decisions (admit, queue, downscale, reject) by file type.", None),
+    'admission_wait_seconds': ('histogram', "Time admitted analyses waited for the memory budget.", DURATION_BUCKETS),
+}
+
+
+class Registry:
+    """Counters and histograms keyed by (name, sorted label items); safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = METRICS[name][2]
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        """A JSON-serializable copy: {'counters': [[name, labels, value]], 'histograms': [[name, labels, data]]}."""
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), dict(data, buckets=list(data['buckets']))]
+                               for (name, labels), data in self._histograms.items()],
+            }
+
+
+REGISTRY = Registry()
+
+
+def observe_stage(stage, seconds):
+    REGISTRY.observe('stage_duration_seconds', seconds, stage=stage)
+
+
+def record_bytes(stage, count):
+    if count:
+        REGISTRY.inc('stage_bytes_total', int(count), stage=stage)
+
+
+def record_error(stage):
+    """Counts an error that a stage handled itself (logged and carried on)."""
+    REGISTRY.inc('stage_errors_total', stage=stage)
+
+
+def record_megapixels(width, height):
+    REGISTRY.observe('image_megapixels', width * height / 1_000_000)
+
+
+def record_analysis(file_type, cache):
+    REGISTRY.inc('analyses_total', file_type=file_type, cache=cache)
+
+
+def record_admission(decision, file_type, wait=None):
+    REGISTRY.inc('admissions_total', decision=decision, file_type=file_type)
+    if wait is not None:
+        REGISTRY.observe('admission_wait_seconds', wait)
+
+
+class StageTimer:
+    """
+    Times pipeline stages as consecutive spans: each call closes the span
+    that started at the previous call (or at construction), records it in
+    the stage_duration_seconds histogram and in timings (ms), then forwards
+    the call to the wrapped progress callback. Use it as the progress
+    argument of run_forensic_analysis_web.
+    """
+
+    def __init__(self, progress=None):
+        self.timings = {}
+        self._progress = progress
+        self._started = self._last = time.perf_counter()
+
+    def __call__(self, stage, status='done'):
+        now = time.perf_counter()
+        observe_stage(stage, now - self._last)
+        self.timings[stage] = round((now - self._last) * 1000, 2)
+        self._last = now
+        if self._progress:
+            self._progress(stage, status)
+
+    def record(self, stage, seconds, status='done'):
+        """
+        Records a stage measured by the caller (e.g. one of several running at
+        once), forwards it like __call__, and starts the next span from now.
+        """
+        observe_stage(stage, seconds)
+        self.timings[stage] = round(seconds * 1000, 2)
+        self._last = time.perf_counter()
+        if self._progress:
+            self._progress(stage, status)
+
+    def breakdown(self):
+        """
+        The per-stage timings plus the total so far, in milliseconds. Stages
+        passed to record may overlap, so they can add up to more than the total.
+        """
+        return dict(self.timings, total=round((time.perf_counter() - self._started) * 1000, 2))
+
+
+def dump_snapshot(folder):
+    """Writes this process's registry to <folder>/metrics-<pid>.json (atomically)."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"metrics-{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(REGISTRY.snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  [METRICS ERROR] Could not write {path}: {e}")
+
+
+def _merge(total, snapshot):
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(sorted(labels.items())))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, data in snapshot['histograms']:
+        key = (name, tuple(sorted(labels.items())))
+        merged = total['histograms'].setdefault(key, {'buckets': [0] * len(data['buckets']), 'sum': 0.0, 'count': 0})
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], data['buckets'])]
+        merged['sum'] += data['sum']
+        merged['count'] += data['count']
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{str(v)}"'.replace('\n', ' ') for k, v in items) + '}'
+
+
+def render_prometheus(snapshot_folder=None):
+    """
+    This process's metrics plus every worker snapshot in snapshot_folder,
+    in the Prometheus text exposition format (version 0.0.4).
+    """
+    total = {'counters': {}, 'histograms': {}}
+    _merge(total, REGISTRY.snapshot())
+    if snapshot_folder and os.path.isdir(snapshot_folder):
+        own = f"metrics-{os.getpid()}.json"
+        for path in sorted(glob.glob(os.path.join(snapshot_folder, 'metrics-*.json'))):
+            if os.path.basename(path) == own:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    _merge(total, json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        full_name = f"{PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        if kind == 'counter':
+            for (metric, labels), value in sorted(total['counters'].items()):
+                if metric == name:
+                    lines.append(f"{full_name}{_labels(labels)} {value}")
+            continue
+        for (metric, labels), data in sorted(total['histograms'].items()):
+            if metric != name:
+                continue
+            for bound, count in zip(buckets, data['buckets']):
+                lines.append(f"{full_name}_bucket{_labels(labels, le=repr(float(bound)))} {count}")
+            lines.append(f"{full_name}_bucket{_labels(labels, le='+Inf')} {data['count']}")
+            lines.append(f"{full_name}_sum{_labels(labels)} {data['sum']:.6f}")
+            lines.append(f"{full_name}_count{_labels(labels)} {data['count']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,199 @@
+# forensic_tools/noise.py
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+BLOCK_SIZE = 24
+MAX_PIXELS = 16_000_000      # larger images are box-reduced first to bound memory
+EDGE_THRESHOLD = 24.0        # gradient above which a pixel is an edge, not noise
+# Pixels this close to an edge are not measured either: anti-aliasing and JPEG
+# ringing (which spreads over the edge's 8x8 coding block) look like noise.
+EDGE_MARGIN = 8
+SATURATION = (5, 250)        # clipped pixels carry no noise and are ignored
+MIN_VALID_FRACTION = 0.25    # blocks with fewer usable pixels get no noise estimate
+OUTLIER_Z = 3.0              # robust z-score above which a block's noise level is inconsistent
+# Outlier blocks in one 4-connected region that make an edit. Clean receipts
+# of the benchmark corpus (PNG, JPEG q75/q92) have regions of at most 3
+# blocks; the repainted total of the edited ones leaves 12 or more.
+MIN_REGION = 6
+HEATMAP_MAX_SIZE = 1024
+
+# Immerkaer's noise estimation kernel: a Laplacian difference that cancels
+# smooth image structure and leaves the sensor/compression noise.
+HIGH_PASS = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def to_gray(image_source, max_pixels=MAX_PIXELS):
+    """
+    Float32 grayscale array of an image source (path, file-like, PIL Image
+    or RGB array). A PIL Image that has already been decoded (e.g. for ELA)
+    is converted in memory, so the file is not decoded again. Returns (gray, scale).
+    """
+    if isinstance(image_source, np.ndarray):
+        img = Image.fromarray(image_source)
+    elif isinstance(image_source, Image.Image):
+        img = image_source
+    else:
+        img = Image.open(image_source)
+
+    gray = img.convert('L')
+    factor = 1
+    while gray.width * gray.height / (factor * factor) > max_pixels:
+        factor += 1
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return np.asarray(gray, dtype=np.float32), factor
+
+
+def high_pass(gray):
+    """Applies HIGH_PASS with shifted-slice arithmetic; returns the (H-2, W-2) residual."""
+    height, width = gray.shape
+    residual = np.zeros((height - 2, width - 2), dtype=np.float32)
+    for dy in range(3):
+        for dx in range(3):
+            residual += HIGH_PASS[dy, dx] * gray[dy:dy + height - 2, dx:dx + width - 2]
+    return residual
+
+
+def _summed_area(values):
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(values, axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def _near(mask, radius):
+    """mask grown by radius pixels in every direction (a square window), using running sums along each axis."""
+    grown = mask
+    for axis in (0, 1):
+        length = grown.shape[axis]
+        counts = np.zeros((length + 1, grown.shape[1]) if axis == 0 else (grown.shape[0], length + 1), dtype=np.int32)
+        np.cumsum(grown, axis=axis, dtype=np.int32, out=counts[1:] if axis == 0 else counts[:, 1:])
+        index = np.arange(length)
+        upper = np.take(counts, np.minimum(index + radius + 1, length), axis=axis)
+        lower = np.take(counts, np.maximum(index - radius, 0), axis=axis)
+        grown = upper > lower
+    return grown
+
+
+def _block_sums(table, block_size, rows, cols):
+    y = np.arange(rows + 1) * block_size
+    x = np.arange(cols + 1) * block_size
+    corners = table[y][:, x]
+    return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+
+def block_noise(gray, block_size=BLOCK_SIZE):
+    """
+    Noise level (standard deviation of the high-pass residual) of every
+    block_size block, as a (rows, cols) array with NaN for blocks that are
+    mostly edges (or within EDGE_MARGIN pixels of one) or clipped
+    highlights/shadows.
+
+    Sums of the residual, its square and the valid-pixel count come from
+    summed-area tables, so the cost is O(pixels) whatever the block size.
+    """
+    residual = high_pass(gray)
+    inner = gray[1:-1, 1:-1]
+    gradient = np.abs(gray[1:-1, 2:] - gray[1:-1, :-2]) + np.abs(gray[2:, 1:-1] - gray[:-2, 1:-1])
+    valid = ~_near(gradient >= EDGE_THRESHOLD, EDGE_MARGIN) & (inner > SATURATION[0]) & (inner < SATURATION[1])
+
+    residual *= valid
+    rows, cols = residual.shape[0] // block_size, residual.shape[1] // block_size
+    if rows == 0 or cols == 0:
+        return np.full((0, 0), np.nan)
+
+    count = _block_sums(_summed_area(valid.astype(np.float32)), block_size, rows, cols)
+    total = _block_sums(_summed_area(residual), block_size, rows, cols)
+    squares = _block_sums(_summed_area(residual * residual), block_size, rows, cols)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(squares / count - mean * mean, 0)
+    # The kernel's gain is sqrt(36) = 6, so divide to get the noise in grey levels
+    sigma = np.sqrt(variance) / 6.0
+    sigma[count < MIN_VALID_FRACTION * block_size * block_size] = np.nan
+    return sigma
+
+
+def _largest_cluster(mask):
+    """Largest 4-connected set of True cells in a 2-D mask, as a list of (row, col)."""
+    remaining = set(zip(*(axis.tolist() for axis in np.nonzero(mask))))
+    best = []
+    while remaining:
+        queue = deque([remaining.pop()])
+        cluster = []
+        while queue:
+            y, x = queue.popleft()
+            cluster.append((y, x))
+            for neighbour in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    queue.append(neighbour)
+        if len(cluster) > len(best):
+            best = cluster
+    return best
+
+
+def _heatmap(z_scores, size):
+    levels = np.nan_to_num(np.clip(z_scores / (OUTLIER_Z * 2), 0, 1), nan=-1)
+    rgb = np.empty(levels.shape + (3,), dtype=np.uint8)
+    # Dark blue (consistent) to yellow (inconsistent); grey where nothing was measured
+    rgb[..., 0] = (255 * levels).clip(0, 255)
+    rgb[..., 1] = (220 * levels).clip(0, 255)
+    rgb[..., 2] = (120 * (1 - levels)).clip(0, 255)
+    rgb[levels < 0] = (48, 54, 61)
+    return Image.fromarray(rgb, 'RGB').resize(size, Image.NEAREST)
+
+
+def noise_map(image_source, block_size=BLOCK_SIZE, max_pixels=MAX_PIXELS):
+    """
+    Noise-inconsistency analysis. Regions pasted from another source usually
+    carry a different noise level than the rest of the scan (often none at
+    all, for digitally added text).
+
+    Each block's noise level is compared with the image's median level on a
+    log scale using a robust (MAD) z-score. Text, stamps and compression
+    leave scattered outlier blocks in any document, so what counts is the
+    largest connected region of outliers: a region of MIN_REGION or more
+    blocks is an edit. Returns a dict:
+        'image'          - heatmap, bright where the noise level is inconsistent
+        'inconsistency'  - percentage of measured blocks that are outliers
+        'median_sigma'   - typical noise level in grey levels
+        'region_blocks'  - outlier blocks in the largest connected region
+        'region_box'     - (x0, y0, x1, y1) around that region in original pixels, or None
+        'blocks', 'outliers', 'block_size', 'scale'
+    """
+    gray, scale = to_gray(image_source, max_pixels)
+    sigma = block_noise(gray, block_size)
+    measured = np.isfinite(sigma)
+
+    result = {'image': None, 'inconsistency': 0.0, 'median_sigma': None, 'blocks': int(measured.sum()),
+              'outliers': 0, 'region_blocks': 0, 'region_box': None, 'block_size': block_size, 'scale': scale}
+    if result['blocks'] < 4:
+        return result
+
+    log_sigma = np.log(sigma + 0.1)
+    median = np.median(log_sigma[measured])
+    mad = 1.4826 * np.median(np.abs(log_sigma[measured] - median))
+    z_scores = np.abs(log_sigma - median) / max(mad, 0.1)
+
+    outlier_mask = measured & (z_scores > OUTLIER_Z)
+    outliers = int(outlier_mask.sum())
+    region = _largest_cluster(outlier_mask)
+    if region:
+        rows, cols = zip(*region)
+        # Residual pixel (y, x) is gray pixel (y + 1, x + 1)
+        result['region_box'] = tuple(int(round((v * block_size + 1) * scale)) for v in
+                                     (min(cols), min(rows), max(cols) + 1, max(rows) + 1))
+    height, width = gray.shape
+    factor = max(1, -(-max(width, height) // HEATMAP_MAX_SIZE))
+    result.update(
+        image=_heatmap(z_scores, (width // factor, height // factor)),
+        inconsistency=round(100.0 * outliers / result['blocks'], 2),
+        median_sigma=round(float(np.exp(median) - 0.1), 3),
+        outliers=outliers,
+        region_blocks=len(region),
+    )
+    return result
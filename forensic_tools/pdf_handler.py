@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from .ela import compute_ela, ela_score
+from .phash import image_hashes
+
+DEFAULT_DPI = 150
+
+def convert_pdf_to_images(pdf_path, output_folder="temp_pdf_images"):
+    """
+    Converts a PDF file into a list of PIL Image objects (one per page).
+    Returns a list of temporary file paths for the converted images.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+        
+    try:
+        # Converts PDF pages to PIL Image objects
+        images = convert_from_path(pdf_path)
+        
+        temp_paths = []
+        for i, image in enumerate(images):
+            # Save the image as a temporary JPEG file
+            temp_path = os.path.join(output_folder, f"{os.path.basename(pdf_path)}_page_{i+1}.jpg")
+            image.save(temp_path, 'JPEG')
+            temp_paths.append(temp_path)
+        
+        return temp_paths
+
+    except Exception as e:
+        print(f"  [PDF ERROR] Conversion failed. Ensure Poppler is installed and in your PATH. Error: {e}")
+        return None
+
+def get_pdf_page_count(pdf_path):
+    """Returns the number of pages reported by poppler's pdfinfo (0 on failure)."""
+    try:
+        return int(pdfinfo_from_path(pdf_path).get('Pages', 0))
+    except Exception as e:
+        print(f"  [PDF ERROR] Could not read page count: {e}")
+        return 0
+
+
+def resolve_page_range(page_count, first_page=1, last_page=None, max_pages=None):
+    """
+    Clamps a requested 1-based, inclusive page range to the document and to
+    max_pages. Returns (first_page, last_page), or None if nothing is left.
+    """
+    first_page = max(1, int(first_page or 1))
+    last_page = min(page_count, int(last_page or page_count))
+    if max_pages:
+        last_page = min(last_page, first_page + int(max_pages) - 1)
+    if first_page > last_page:
+        return None
+    return first_page, last_page
+
+
+def page_ela(pdf_path, page_number, dpi=DEFAULT_DPI, quality=95, scale=20, normalize='scale'):
+    """
+    Rasterizes a single PDF page and runs ELA on it. Runs inside a worker
+    process, so only the JPEG-encoded ELA image, its statistics and the page's
+    perceptual hashes are sent back; the page bitmap never leaves the worker.
+    """
+    pages = convert_from_path(pdf_path, dpi=dpi, first_page=page_number,
+                              last_page=page_number, thread_count=1)
+    if not pages:
+        raise ValueError(f"Page {page_number} could not be rasterized")
+
+    page_img = pages[0]
+    width, height = page_img.size
+    result = compute_ela(page_img, quality=quality, scale=scale, normalize=normalize)
+    hashes = image_hashes(page_img)
+    page_img.close()
+
+    buffer = BytesIO()
+    result['image'].save(buffer, format='JPEG', quality=90)
+
+    return {
+        'page': page_number,
+        'width': width,
+        'height': height,
+        'dpi': dpi,
+        'stats': result['stats'],
+        'score': ela_score(result['stats']),
+        'ela_jpeg': buffer.getvalue(),
+        'hashes': hashes,
+    }
+
+
+def iter_pdf_page_ela(pdf_path, first_page=1, last_page=None, dpi=DEFAULT_DPI,
+                      max_pages=None, max_dpi=None, workers=None, **ela_options):
+    """
+    Runs page_ela over a page range across a process pool and yields each
+    page's result as soon as it finishes (not in page order). Failed pages
+    are yielded as {'page': n, 'error': message}.
+    """
+    if max_dpi:
+        dpi = min(dpi, max_dpi)
+
+    page_count = get_pdf_page_count(pdf_path)
+    page_range = resolve_page_range(page_count, first_page, last_page, max_pages)
+    if page_range is None:
+        return
+
+    page_numbers = range(page_range[0], page_range[1] + 1)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(page_numbers)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(page_ela, pdf_path, n, dpi, **ela_options): n
+            for n in page_numbers
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"  [PDF ERROR] ELA failed on page {futures[future]}: {e}")
+                yield {'page': futures[future], 'error': str(e)}
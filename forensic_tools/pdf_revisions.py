@@ -0,0 +1,209 @@
+# forensic_tools/pdf_revisions.py
+import codecs
+import mmap
+import os
+import re
+
+INFO_KEYS = ('Title', 'Author', 'Subject', 'Keywords', 'Creator', 'Producer', 'CreationDate', 'ModDate')
+XMP_KEYS = {
+    'CreatorTool': rb'xmp:CreatorTool',
+    'Producer': rb'pdf:Producer',
+    'CreateDate': rb'xmp:CreateDate',
+    'ModifyDate': rb'xmp:ModifyDate',
+    'MetadataDate': rb'xmp:MetadataDate',
+    'DocumentID': rb'xmpMM:DocumentID',
+    'InstanceID': rb'xmpMM:InstanceID',
+}
+# Tools whose appearance in Creator/Producer/CreatorTool suggests graphical editing
+EDITING_TOOLS = ('photoshop', 'illustrator', 'canva', 'gimp', 'inkscape',
+                 'sejda', 'smallpdf', 'ilovepdf', 'pdfescape')
+
+_HEADER = re.compile(rb'%PDF-(\d\.\d)')
+_EOF = re.compile(rb'%%EOF[\r\n]*')
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_OBJECT = re.compile(rb'(?<![\d])(\d{1,10})\s+(\d{1,5})\s+obj\b')
+_INFO_REF = re.compile(rb'/Info\s+(\d+)\s+(\d+)\s+R')
+_MEDIA_BOX = re.compile(rb'/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]')
+_XMP_PACKET = re.compile(rb'<x:xmpmeta.*?</x:xmpmeta>', re.S)
+_TEXT_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+                 b'(': b'(', b')': b')', b'\\': b'\\'}
+
+
+def _decode_text(raw):
+    """PDF text strings are PDFDocEncoding (close to Latin-1) or UTF-16BE with a BOM."""
+    if raw.startswith(codecs.BOM_UTF16_BE):
+        return raw[2:].decode('utf-16-be', errors='replace')
+    if raw.startswith(codecs.BOM_UTF8):
+        return raw[3:].decode('utf-8', errors='replace')
+    return raw.decode('latin-1')
+
+
+def _literal_string(data, pos):
+    """Reads a (literal) string starting just after '(' at pos; returns (bytes, end)."""
+    out, depth = bytearray(), 1
+    while pos < len(data):
+        char = data[pos:pos + 1]
+        if char == b'\\':
+            following = data[pos + 1:pos + 2]
+            if following in _TEXT_ESCAPES:
+                out += _TEXT_ESCAPES[following]
+                pos += 2
+            elif following and following in b'01234567':
+                octal = re.match(rb'[0-7]{1,3}', data[pos + 1:pos + 4]).group()
+                out.append(int(octal, 8) & 0xFF)
+                pos += 1 + len(octal)
+            elif following in (b'\r', b'\n'):
+                pos += 3 if data[pos + 1:pos + 3] == b'\r\n' else 2  # line continuation
+            else:
+                pos += 1  # unknown escape (e.g. \8): the backslash is ignored, the character kept
+            continue
+        if char == b'(':
+            depth += 1
+        elif char == b')':
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+        out += char
+        pos += 1
+    return bytes(out), pos
+
+
+def parse_info_dictionary(body):
+    """Extracts the INFO_KEYS entries of an Info dictionary's source bytes as text."""
+    info = {}
+    for key in INFO_KEYS:
+        match = re.search(rb'/' + key.encode() + rb'\s*([(<])', body)
+        if not match:
+            continue
+        if match.group(1) == b'(':
+            raw, _ = _literal_string(body, match.end())
+        else:
+            end = body.find(b'>', match.end())
+            hex_digits = re.sub(rb'\s', b'', body[match.end():end])
+            raw = bytes.fromhex((hex_digits + b'0' * (len(hex_digits) % 2)).decode('ascii', errors='ignore'))
+        info[key] = _decode_text(raw)
+    return info
+
+
+def parse_xmp(packet):
+    """Extracts XMP_KEYS from an XMP packet, as element text or as attributes."""
+    xmp = {}
+    for name, tag in XMP_KEYS.items():
+        match = re.search(tag + rb'\s*=\s*"([^"]*)"', packet) or \
+            re.search(tag + rb'>\s*(?:<rdf:Alt>\s*<rdf:li[^>]*>)?([^<]*)<', packet)
+        if match and match.group(1).strip():
+            xmp[name] = match.group(1).strip().decode('utf-8', errors='replace')
+    return xmp
+
+
+def _object_body(view, offset, limit):
+    end = view.find(b'endobj', offset, limit)
+    return view[offset:end if end != -1 else min(limit, offset + 4096)]
+
+
+def scan_pdf_revisions(view):
+    """
+    Lists the revisions of a PDF from a bytes-like view (bytes or mmap)
+    without building a full object model.
+
+    Every incremental save appends new objects, an xref section and a
+    trailer ending in %%EOF, so the file is split at each %%EOF. For each
+    revision the scanner records the objects (re)defined in it, whether it
+    uses an xref table or stream, and its Info dictionary and XMP packet.
+    Returns:
+        {'version', 'size', 'linearized', 'incremental_updates', 'software',
+         'media_box', 'needs_full_parse', 'error',
+         'revisions': [{'number', 'start', 'end', 'startxref', 'xref', 'objects',
+                        'info', 'info_ref', 'xmp'}]}
+    needs_full_parse is True when some Info dictionary lives in a compressed
+    object stream and can only be read by a real parser.
+    """
+    size = len(view)
+    result = {'version': None, 'size': size, 'linearized': False, 'incremental_updates': 0, 'software': [],
+              'media_box': None, 'needs_full_parse': False, 'error': None, 'revisions': []}
+    header = _HEADER.search(view, 0, min(size, 1024))
+    if not header:
+        result['error'] = "missing %PDF header"
+        return result
+    result['version'] = header.group(1).decode()
+
+    boundaries = [match.end() for match in _EOF.finditer(view)]
+    if not boundaries:
+        result['error'] = "no %%EOF marker (truncated file?)"
+        boundaries = [size]
+    elif view[boundaries[-1]:boundaries[-1] + 64].strip():
+        result['error'] = f"{size - boundaries[-1]:,} bytes after the last %%EOF"
+
+    # Every object definition, in file order: the latest one before a revision's end wins
+    definitions = {}
+    start = 0
+    for number, end in enumerate(boundaries, start=1):
+        revision = {'number': number, 'start': start, 'end': end, 'startxref': None, 'xref': None,
+                    'objects': [], 'info': {}, 'info_ref': None, 'xmp': {}}
+        for match in _OBJECT.finditer(view, start, end):
+            ref = (int(match.group(1)), int(match.group(2)))
+            revision['objects'].append(ref)
+            definitions.setdefault(ref, []).append(match.start())
+
+        startxrefs = list(_STARTXREF.finditer(view, start, end))
+        if startxrefs:
+            revision['startxref'] = int(startxrefs[-1].group(1))
+            xref_offset = revision['startxref']
+            if xref_offset < size:
+                revision['xref'] = 'table' if view[xref_offset:xref_offset + 4] == b'xref' else 'stream'
+
+        # The trailer (or xref stream dictionary) is at the end of the revision
+        info_refs = list(_INFO_REF.finditer(view, start, end))
+        if info_refs:
+            revision['info_ref'] = (int(info_refs[-1].group(1)), int(info_refs[-1].group(2)))
+        packets = list(_XMP_PACKET.finditer(view, start, end))
+        if packets:
+            revision['xmp'] = parse_xmp(packets[-1].group())
+        result['revisions'].append(revision)
+        start = end
+
+    # Resolve each revision's Info dictionary to the definition current at that point
+    for revision in result['revisions']:
+        ref = revision['info_ref']
+        if ref is None:
+            continue
+        offsets = [o for o in definitions.get(ref, []) if o < revision['end']]
+        if offsets:
+            revision['info'] = parse_info_dictionary(_object_body(view, offsets[-1], revision['end']))
+        else:
+            result['needs_full_parse'] = True
+
+    first = result['revisions'][0] if result['revisions'] else None
+    if first and first['objects']:
+        offset = definitions[first['objects'][0]][0]
+        result['linearized'] = b'/Linearized' in _object_body(view, offset, first['end'])[:1024]
+    # A linearized file carries an extra %%EOF after its first-page section
+    result['incremental_updates'] = max(0, len(result['revisions']) - 1 - int(result['linearized']))
+
+    media_box = _MEDIA_BOX.search(view)
+    if media_box:
+        result['media_box'] = tuple(float(v) for v in media_box.groups())
+
+    software = []
+    for revision in result['revisions']:
+        for value in (revision['info'].get('Creator'), revision['info'].get('Producer'),
+                      revision['xmp'].get('CreatorTool'), revision['xmp'].get('Producer')):
+            if value and value not in software:
+                software.append(value)
+    result['software'] = software
+    return result
+
+
+def editing_tools(values):
+    """The EDITING_TOOLS mentioned in any of the given strings."""
+    lowered = ' '.join(v.lower() for v in values if v)
+    return [tool for tool in EDITING_TOOLS if tool in lowered]
+
+
+def scan_pdf_file(file_path):
+    """scan_pdf_revisions for a file on disk, read through mmap."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return scan_pdf_revisions(b'')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return scan_pdf_revisions(view)
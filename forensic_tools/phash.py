@@ -0,0 +1,238 @@
+# forensic_tools/phash.py
+"""
+Perceptual hashes (aHash, dHash, pHash) of images and PDF pages, and a
+persistent index for finding earlier submissions that look alike: the same
+receipt template with a few edits hashes to nearby values even though the
+SHA-256 is different.
+
+The index uses multi-index hashing: each 64-bit pHash is split into four
+16-bit chunks stored in indexed columns. Two hashes within Hamming distance
+r share at least one chunk within distance r // 4 (pigeonhole), so a query
+only looks up the few chunk values near the query's chunks instead of
+scanning every row, then checks the full distance on those candidates.
+"""
+import itertools
+import sqlite3
+import time
+
+import numpy as np
+from PIL import Image
+
+CHUNKS = 4
+CHUNK_BITS = 16
+# Radius r needs every chunk value within r // 4 bits; beyond 15 the IN lists outgrow SQLite's parameter limit
+MAX_RADIUS = 15
+DEFAULT_RADIUS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    page INTEGER NOT NULL DEFAULT 0,
+    original_filename TEXT,
+    ahash INTEGER NOT NULL,
+    dhash INTEGER NOT NULL,
+    phash INTEGER NOT NULL,
+    p0 INTEGER NOT NULL,
+    p1 INTEGER NOT NULL,
+    p2 INTEGER NOT NULL,
+    p3 INTEGER NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (sha256, page)
+);
+CREATE INDEX IF NOT EXISTS image_hashes_p0 ON image_hashes (p0);
+CREATE INDEX IF NOT EXISTS image_hashes_p1 ON image_hashes (p1);
+CREATE INDEX IF NOT EXISTS image_hashes_p2 ON image_hashes (p2);
+CREATE INDEX IF NOT EXISTS image_hashes_p3 ON image_hashes (p3);
+"""
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    return np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def image_hashes(image):
+    """
+    aHash, dHash and pHash of a PIL image as 64-bit ints. The image is first
+    box-filtered down to 64x64, so hashing a 24-megapixel scan costs one resize.
+    """
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    base = image.resize((64, 64), Image.BOX).convert('L')
+
+    small = np.asarray(base.resize((8, 8), Image.BOX), dtype=np.float32)
+    ahash = _to_int(small > small.mean())
+
+    wide = np.asarray(base.resize((9, 8), Image.BOX), dtype=np.float32)
+    dhash = _to_int(wide[:, 1:] > wide[:, :-1])
+
+    pixels = np.asarray(base.resize((32, 32), Image.BOX), dtype=np.float64)
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    phash = _to_int(low > np.median(low))
+    return {'ahash': ahash, 'dhash': dhash, 'phash': phash}
+
+
+def hash_file(file_path):
+    """image_hashes of an image file; JPEGs are decoded at reduced size (draft mode)."""
+    with Image.open(file_path) as image:
+        image.draft('RGB', (64, 64))
+        return image_hashes(image)
+
+
+def to_hex(hashes):
+    return {name: f"{value:016x}" for name, value in hashes.items()}
+
+
+def from_hex(hashes):
+    return {name: int(value, 16) for name, value in hashes.items()}
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _chunks(value):
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & mask for i in range(CHUNKS)]
+
+
+def _neighbours(chunk, distance):
+    """Every CHUNK_BITS-bit value within Hamming distance of chunk."""
+    values = [chunk]
+    for flips in range(1, distance + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), flips):
+            value = chunk
+            for bit in bits:
+                value ^= 1 << bit
+            values.append(value)
+    return values
+
+
+class HashIndex:
+    """
+    Perceptual hashes of analyzed files in a local SQLite file, one row per
+    image or PDF page. Like JobQueue, every method opens its own connection,
+    so one HashIndex can be shared between threads and worker processes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add(self, sha256, pages, original_filename=None):
+        """
+        Indexes a file. pages is a list of (page, hashes) with hashes as from
+        image_hashes; use page 0 for a single image. Known (sha256, page) pairs are kept.
+        """
+        now = time.time()
+        rows = []
+        for page, hashes in pages:
+            rows.append((sha256, page, original_filename, _signed(hashes['ahash']), _signed(hashes['dhash']),
+                         _signed(hashes['phash']), *_chunks(hashes['phash']), now))
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO image_hashes (sha256, page, original_filename, ahash, dhash, phash, "
+                "p0, p1, p2, p3, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def hashes_for(self, sha256):
+        """The indexed (page, hashes) of a file, in page order."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT page, ahash, dhash, phash FROM image_hashes WHERE sha256 = ? ORDER BY page",
+                                (sha256,)).fetchall()
+        finally:
+            conn.close()
+        return [(row['page'], {name: _unsigned(row[name]) for name in ('ahash', 'dhash', 'phash')}) for row in rows]
+
+    def query(self, hashes, radius=DEFAULT_RADIUS, limit=10, exclude_sha256=None, conn=None):
+        """
+        Indexed images whose pHash is within radius bits of hashes['phash'],
+        closest first: [{'sha256', 'page', 'original_filename', 'distance',
+        'ahash_distance', 'dhash_distance', 'created'}].
+        """
+        radius = max(0, min(int(radius), MAX_RADIUS))
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            candidates = {}
+            for i, chunk in enumerate(_chunks(hashes['phash'])):
+                values = _neighbours(chunk, radius // CHUNKS)
+                rows = conn.execute(
+                    f"SELECT * FROM image_hashes WHERE p{i} IN ({','.join('?' * len(values))})", values)
+                for row in rows:
+                    candidates[row['id']] = row
+        finally:
+            if own_conn:
+                conn.close()
+
+        matches = []
+        for row in candidates.values():
+            if exclude_sha256 and row['sha256'] == exclude_sha256:
+                continue
+            distance = hamming(hashes['phash'], _unsigned(row['phash']))
+            if distance > radius:
+                continue
+            matches.append({
+                'sha256': row['sha256'],
+                'page': row['page'],
+                'original_filename': row['original_filename'],
+                'distance': distance,
+                'ahash_distance': hamming(hashes['ahash'], _unsigned(row['ahash'])) if 'ahash' in hashes else None,
+                'dhash_distance': hamming(hashes['dhash'], _unsigned(row['dhash'])) if 'dhash' in hashes else None,
+                'created': row['created'],
+            })
+        matches.sort(key=lambda m: (m['distance'], -m['created']))
+        return matches[:limit]
+
+    def similar(self, pages, radius=DEFAULT_RADIUS, limit=10, exclude_sha256=None):
+        """
+        Indexed files that look like any of pages ((page, hashes) pairs), over
+        one connection. Each file is reported once, with the page pair of its
+        smallest distance ('query_page' and 'page'), closest first.
+        """
+        best = {}
+        conn = self._connect()
+        try:
+            for query_page, hashes in pages:
+                for match in self.query(hashes, radius=radius, limit=limit, exclude_sha256=exclude_sha256, conn=conn):
+                    known = best.get(match['sha256'])
+                    if known is None or match['distance'] < known['distance']:
+                        best[match['sha256']] = dict(match, query_page=query_page)
+        finally:
+            conn.close()
+        return sorted(best.values(), key=lambda m: (m['distance'], -m['created']))[:limit]
+
+    def count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM image_hashes").fetchone()[0]
+        finally:
+            conn.close()
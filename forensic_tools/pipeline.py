@@ -0,0 +1,154 @@
+# forensic_tools/pipeline.py
+"""
+Dependency-graph scheduler for the analysis stages.
+
+Analyzers are plugins that declare what they need: shared inputs (raw
+bytes, header markers, the decoded image, an RGB or grayscale array,
+rasterized pages) or the result of another analyzer. Inputs are steps
+too, so each one is computed once, and only if some analyzer needs it.
+A step starts on a thread pool as soon as everything it needs is
+available. Pillow and NumPy release the GIL for decoding, resizing and
+array arithmetic, so independent analyzers really do overlap.
+
+    pipeline = Pipeline()
+
+    @pipeline.input('gray', 'image')
+    def gray(context, image):
+        return image.convert('L') if image else None
+
+    @pipeline.analyzer('noise', 'gray')
+    def noise(context, gray):
+        ...
+
+    values = pipeline.run(context, seeds={'image': decoded}, workers=4)
+
+Stdlib only, so the package can always import it.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+INPUT = 'input'
+ANALYZER = 'analyzer'
+
+
+class Step:
+    """One node of the graph: func(context, *values of needs) computes the value stored under name."""
+
+    def __init__(self, name, func, needs=(), kind=ANALYZER):
+        self.name = name
+        self.func = func
+        self.needs = tuple(needs)
+        self.kind = kind
+
+    def __repr__(self):
+        return f"Step({self.name!r}, needs={self.needs!r}, kind={self.kind!r})"
+
+
+class Pipeline:
+    """A registry of input providers and analyzers, and the scheduler that runs them."""
+
+    def __init__(self):
+        self.steps = {}
+
+    def _register(self, name, needs, kind):
+        def decorator(func):
+            if name in self.steps:
+                raise ValueError(f"Step {name!r} is already registered")
+            self.steps[name] = Step(name, func, needs, kind)
+            return func
+        return decorator
+
+    def input(self, name, *needs):
+        """Decorator registering the provider of a shared input; it runs only when an analyzer needs it."""
+        return self._register(name, needs, INPUT)
+
+    def analyzer(self, name, *needs):
+        """Decorator registering an analyzer; every analyzer runs on each pipeline run."""
+        return self._register(name, needs, ANALYZER)
+
+    def plan(self, seeds=()):
+        """
+        Names of the steps a run computes (all analyzers plus the inputs they
+        need, transitively), in registration order. Raises ValueError for an
+        unknown need or a dependency cycle.
+        """
+        needed = set()
+        stack = [name for name, step in self.steps.items() if step.kind == ANALYZER]
+        while stack:
+            name = stack.pop()
+            if name in needed or name in seeds:
+                continue
+            if name not in self.steps:
+                raise ValueError(f"Nothing provides {name!r}")
+            needed.add(name)
+            stack.extend(self.steps[name].needs)
+
+        # Kahn's algorithm, only to reject cycles before anything runs
+        done = set(seeds)
+        remaining = set(needed)
+        while remaining:
+            ready = {name for name in remaining if all(need in done for need in self.steps[name].needs)}
+            if not ready:
+                raise ValueError(f"Dependency cycle between {', '.join(sorted(remaining))}")
+            done |= ready
+            remaining -= ready
+        return [name for name in self.steps if name in needed]
+
+    def run(self, context, seeds=None, workers=4, on_done=None, wrap=None):
+        """
+        Runs every analyzer, computing each input it needs exactly once.
+        seeds are values already known (e.g. {'bytes': view, 'path': path}).
+        Up to workers steps run at the same time; workers=0 runs them one by
+        one on the calling thread.
+
+        on_done(name, seconds), if given, is called on the calling thread as
+        each step finishes. wrap(func), if given, is applied to each step's
+        function before it is submitted (e.g. to carry a request context into
+        the pool thread). If a step raises, no further steps are started and
+        the exception is re-raised once the running ones finish.
+
+        Returns {name: value} for the seeds and every step that ran.
+        """
+        values = dict(seeds or {})
+        pending = self.plan(values)
+
+        def call(step, args):
+            started = time.perf_counter()
+            value = step.func(context, *args)
+            return value, time.perf_counter() - started
+
+        def submit(executor, step):
+            func = wrap(call) if wrap else call
+            return executor.submit(func, step, [values[need] for need in step.needs])
+
+        if workers <= 0:
+            for name in pending:
+                step = self.steps[name]
+                values[name], seconds = call(step, [values[need] for need in step.needs])
+                if on_done:
+                    on_done(name, seconds)
+            return values
+
+        error = None
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis') as executor:
+            while pending or running:
+                if error is None:
+                    for name in [n for n in pending if all(need in values for need in self.steps[n].needs)]:
+                        running[submit(executor, self.steps[name])] = name
+                        pending.remove(name)
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        values[name], seconds = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    if on_done:
+                        on_done(name, seconds)
+        if error is not None:
+            raise error
+        return values
@@ -0,0 +1,130 @@
+# forensic_tools/reports.py
+import multiprocessing
+import os
+import threading
+
+from .backends import load
+from .cache import prune_folder
+
+# Bump whenever report_template.html changes, so stale cached PDFs are not served.
+REPORT_TEMPLATE_VERSION = "1"
+PAGE_CSS = '@page { size: A4; margin: 1cm; }'
+# WeasyPrint's memory grows with every document; recycle a worker after this many reports
+TASKS_PER_WORKER = 50
+
+
+class ReportUnavailable(Exception):
+    """Raised when WeasyPrint is not installed in the render workers."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a report takes longer than the renderer's timeout."""
+
+
+def report_key(result_id):
+    """Cache key of a report: the stored result's id plus the report template version."""
+    return f"{result_id}-t{REPORT_TEMPLATE_VERSION}"
+
+
+def _render_pdf(report_html, base_url):
+    # Runs in a render worker; WeasyPrint is imported there once and never in the web process
+    weasyprint = load('weasyprint')
+    if weasyprint is None:
+        raise ReportUnavailable("WeasyPrint not found on server.")
+    return weasyprint.HTML(string=report_html, base_url=base_url).write_pdf(
+        stylesheets=[weasyprint.CSS(string=PAGE_CSS)]
+    )
+
+
+class ReportRenderer:
+    """
+    Renders report PDFs in a dedicated pool of worker processes and caches
+    them on disk by report key, so repeat downloads never reach WeasyPrint.
+
+    The pool is started on the first render. A render that exceeds timeout
+    seconds raises RenderTimeout and the pool is replaced, because a running
+    task cannot be cancelled otherwise. Concurrent requests for the same key
+    share one render.
+    """
+
+    def __init__(self, cache_dir, workers=1, timeout=60, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.max_disk_bytes = max_disk_bytes
+        self._pool = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = prune_folder(cache_dir, max_disk_bytes, '.pdf')
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key):
+        """The cached PDF bytes for key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return pdf
+
+    def render(self, key, report_html, base_url):
+        """Renders report_html to PDF bytes in the pool (or returns the cached PDF)."""
+        pdf = self.get(key)
+        if pdf is not None:
+            return pdf
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                if self._pool is None:
+                    # spawn: never fork a multi-threaded web server
+                    context = multiprocessing.get_context('spawn')
+                    self._pool = context.Pool(self.workers, maxtasksperchild=TASKS_PER_WORKER)
+                pending = self._pool.apply_async(_render_pdf, (report_html, base_url))
+                self._pending[key] = pending
+            pool = self._pool
+
+        try:
+            pdf = pending.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            with self._lock:
+                if self._pool is pool:
+                    pool.terminate()
+                    self._pool = None
+            raise RenderTimeout(f"Report rendering took longer than {self.timeout} s.")
+        finally:
+            with self._lock:
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+
+        self._store(key, pdf)
+        return pdf
+
+    def _store(self, key, pdf):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  [CACHE ERROR] Could not write report {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += len(pdf)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._disk_bytes = prune_folder(self.cache_dir, self.max_disk_bytes, '.pdf')
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
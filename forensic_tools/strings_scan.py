@@ -0,0 +1,109 @@
+# forensic_tools/strings_scan.py
+import mmap
+import os
+import re
+from contextlib import closing
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_STRING_CHARS = 200
+
+# Editor names, XMP edit history and URLs that are worth flagging in a receipt
+DEFAULT_KEYWORDS = (
+    'photoshop', 'adobe', 'illustrator', 'gimp', 'canva', 'paint.net', 'pixlr',
+    'xmpmm:history', 'stevt:', 'softwareagent', 'http://', 'https://', 'www.',
+)
+
+_ASCII_CHAR = rb'[\x20-\x7e\t]'
+_UTF16_CHAR = rb'[\x20-\x7e\t]\x00'
+
+
+def _patterns(min_length):
+    # (encoding, string pattern, run-of-characters pattern, bytes per character)
+    return (
+        ('ascii', re.compile(_ASCII_CHAR + b'{%d,}' % min_length), re.compile(_ASCII_CHAR + b'*'), 1),
+        ('utf-16le', re.compile(b'(?:' + _UTF16_CHAR + b'){%d,}' % min_length), re.compile(b'(?:' + _UTF16_CHAR + b')*'), 2),
+    )
+
+
+def _flag(text, keywords):
+    lowered = text.lower()
+    return [k for k in keywords if k in lowered]
+
+
+def scan_strings(view, start=0, min_length=4, keywords=DEFAULT_KEYWORDS, chunk_size=CHUNK_SIZE):
+    """
+    Yields printable ASCII and UTF-16LE strings from a bytes-like view (e.g. an
+    mmap) in offset order, starting at byte offset start. Each item is a dict
+    with offset, encoding, length (in bytes), text (capped at MAX_STRING_CHARS)
+    and the keywords it matched.
+
+    The view is scanned in chunks that overlap, so a string crossing a chunk
+    boundary is reported once, at its true start offset.
+    """
+    size = len(view)
+    patterns = _patterns(min_length)
+    overlap = MAX_STRING_CHARS * 2 + 2
+    pos = start
+
+    while pos < size:
+        chunk_end = min(pos + chunk_size, size)
+        window_end = min(chunk_end + overlap, size)
+        found = []
+
+        # re scans the mmap in place (pos/endpos), so no chunk is ever copied
+        for encoding, pattern, run_pattern, unit in patterns:
+            for match in pattern.finditer(view, pos, window_end):
+                begin = match.start()
+                if begin >= chunk_end:
+                    break
+                # A match at the window start may be the tail of a string from the previous chunk
+                if begin - pos < unit * 2 and begin >= unit and \
+                        run_pattern.fullmatch(view, begin - unit, begin):
+                    continue
+
+                end = match.end()
+                if window_end < size and end > window_end - unit:
+                    # The string may run past the window (whose end can split a UTF-16 code unit): find its real end
+                    end = run_pattern.match(view, end).end()
+
+                text = view[begin:begin + min(end - begin, MAX_STRING_CHARS * unit)]
+                text = text.decode(encoding, errors='replace')
+                found.append({
+                    'offset': begin,
+                    'encoding': encoding,
+                    'length': end - begin,
+                    'text': text,
+                    'keywords': _flag(text, keywords),
+                })
+
+        found.sort(key=lambda s: s['offset'])
+        yield from found
+        pos = chunk_end
+
+
+def extract_strings(file_path, offset=0, limit=200, min_length=4, keywords=DEFAULT_KEYWORDS, flagged_only=False):
+    """
+    Returns one page of strings from the file, read through mmap:
+        {'strings': [...], 'next_offset': int or None, 'file_size': int}
+    next_offset is where the following page starts (None at end of file), so
+    output stays bounded however large the file is.
+    """
+    page = []
+    next_offset = None
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size == 0:
+            return {'strings': [], 'next_offset': None, 'file_size': 0}
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            # closing() releases the scanner's buffer exports before the mmap is closed
+            with closing(scan_strings(view, start=offset, min_length=min_length, keywords=keywords)) as items:
+                for item in items:
+                    if flagged_only and not item['keywords']:
+                        continue
+                    if len(page) >= limit:
+                        next_offset = item['offset']
+                        break
+                    page.append(item)
+
+    return {'strings': page, 'next_offset': next_offset, 'file_size': file_size}
@@ -1,7 +1,8 @@
 import os
 import numpy as np
-from PIL import Image, ImageChops, ImageEnhance
+from PIL import Image, ImageEnhance
 import cv2
+from forensic_tools.ela import compute_ela, normalize_error
 
 def ela_analysis(image_path, quality=90, scale=10):
     """
@@ -19,44 +20,28 @@ def ela_analysis(image_path, quality=90, scale=10):
         Image: A PIL Image object of the ELA result, or None on error.
     """
     try:
-        # 1. Load Original Image
-        original_img = Image.open(image_path).convert('RGB')
-        
-        # 2. Save a Recompressed Copy
-        temp_file = "temp_ela_copy.jpg"
-        original_img.save(temp_file, 'JPEG', quality=quality)
-        
-        # 3. Load the Recompressed Copy
-        resaved_img = Image.open(temp_file).convert('RGB')
-        
-        # 4. Calculate the Absolute Difference (Error Level)
-        # ImageChops.difference returns the difference between two images.
-        ela_img = ImageChops.difference(original_img, resaved_img)
+        # 1-4. Recompress in memory and compute the absolute difference (Error Level)
+        # The shared NumPy engine never writes a temp file into the CWD.
+        result = compute_ela(image_path, quality=quality, normalize='none')
+        ela_img = result['image']
         
         # 5. Enhance the Error Image for Visibility (Normalization)
-        extrema = ela_img.getextrema()
-        max_diff = max([ex[1] for ex in extrema])
+        max_diff = max(result['stats']['max'])
         
         if max_diff == 0:
             print("No difference found, image is likely pristine or not JPEG.")
             return ela_img
         
         # Normalize the difference to 0-255 range and apply a scale factor
-        scale_factor = 255.0 / max_diff
-        ela_img = ImageEnhance.Brightness(ela_img).enhance(scale_factor)
+        ela_img = Image.fromarray(normalize_error(result['error'], normalize='max'))
         
         # 6. Optional: Increase contrast/brightness for better visualization
         ela_img = ImageEnhance.Contrast(ela_img).enhance(1.5)
         
-        # 7. Clean up the temporary file
-        os.remove(temp_file)
-        
         return ela_img
 
     except Exception as e:
         print(f"An error occurred during ELA: {e}")
-        if os.path.exists(temp_file):
-             os.remove(temp_file)
         return None
 
 def main_tamper_check(file_path):
@@ -0,0 +1,48 @@
+import multiprocessing
+import time
+
+from forensic_tools.admission import MemoryBudget
+
+
+def _acquire_and_exit(db_path, nbytes):
+    MemoryBudget(db_path, total_bytes=100).try_acquire(nbytes)
+
+
+def test_budget_is_shared(tmp_path):
+    budget = MemoryBudget(str(tmp_path / 'admission.db'), total_bytes=100)
+    first = budget.try_acquire(60)
+    assert first is not None
+    assert budget.try_acquire(60) is None
+    budget.release(first)
+    assert budget.try_acquire(60) is not None
+
+
+def test_oversized_lease_runs_alone(tmp_path):
+    budget = MemoryBudget(str(tmp_path / 'admission.db'), total_bytes=100)
+    assert budget.try_acquire(500) is not None
+    assert budget.try_acquire(1) is None
+
+
+def test_leases_of_dead_processes_are_reclaimed(tmp_path):
+    budget = MemoryBudget(str(tmp_path / 'admission.db'), total_bytes=100)
+    holder = multiprocessing.Process(target=_acquire_and_exit, args=(budget.db_path, 80))
+    holder.start()
+    holder.join()
+    assert budget.try_acquire(80) is not None
+
+
+def test_held_lease_is_renewed_past_lease_seconds(tmp_path):
+    budget = MemoryBudget(str(tmp_path / 'admission.db'), total_bytes=100, lease_seconds=0.2)
+    lease_id = budget.try_acquire(80)
+    with budget.hold(lease_id):
+        time.sleep(0.5)
+        assert budget.in_use() == 80
+        assert budget.try_acquire(80) is None
+    assert budget.in_use() == 0
+
+
+def test_unrenewed_lease_expires(tmp_path):
+    budget = MemoryBudget(str(tmp_path / 'admission.db'), total_bytes=100, lease_seconds=0.1)
+    budget.try_acquire(80)
+    time.sleep(0.2)
+    assert budget.in_use() == 0
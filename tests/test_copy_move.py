@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+from PIL import Image
+
+from forensic_tools.copy_move import detect_copy_move
+
+
+def _texture(size=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    cells = Image.fromarray((rng.random((size // 8, size // 8)) * 255).astype(np.uint8))
+    return np.asarray(cells.resize((size, size), Image.BICUBIC)).copy()
+
+
+def test_cloned_region_is_found():
+    pixels = _texture()
+    pixels[600:800, 500:800] = pixels[100:300, 100:400]
+    result = detect_copy_move(pixels)
+    assert not result['timed_out']
+    assert [match['shift'] for match in result['matches']] == [(400, 500)]
+    x0, y0, x1, y1 = result['matches'][0]['target']
+    assert abs(x0 - 500) <= 8 and abs(y0 - 600) <= 8 and abs(x1 - 800) <= 8 and abs(y1 - 800) <= 8
+
+
+def test_time_budget_bounds_periodic_textures():
+    # A periodic pattern matches almost everywhere: millions of pairs and huge regions
+    y, x = np.mgrid[0:1024, 0:1024]
+    pixels = (128 + 60 * np.sin(x / 3.0) + 60 * np.sin(y / 5.0)).astype(np.uint8)
+    started = time.perf_counter()
+    result = detect_copy_move(pixels, time_budget=1.0)
+    assert result['timed_out']
+    assert time.perf_counter() - started < 1.5
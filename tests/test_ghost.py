@@ -0,0 +1,44 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.corpus import RESOLUTIONS, receipt_image
+from forensic_tools.ghost import ALERT_PERCENT, ghost_sweep
+from forensic_tools.jpeg_markers import analyze_jpeg
+
+
+def _jpeg(img, quality):
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def _sweep(data):
+    luma = np.asarray(Image.open(BytesIO(data)).convert('L'))
+    return ghost_sweep(luma, primary_quality=analyze_jpeg(data)['quality'], visualize=None)
+
+
+@pytest.mark.parametrize('quality', [75, 92])
+def test_pristine_receipt_has_no_ghost(quality):
+    # jpeg-small-q75-1 and jpeg-small-q92-1 of the benchmark corpus
+    result = _sweep(_jpeg(receipt_image(RESOLUTIONS['small'], 1), quality))
+    assert result['ghost_percent'] < ALERT_PERCENT
+
+
+def test_patch_from_an_earlier_save_is_a_ghost():
+    size = RESOLUTIONS['small']
+    box = (270, 355, 537, 530)
+    # A textured patch (e.g. a photographed stamp) saved at quality 65, pasted into a receipt saved at 92
+    rng = np.random.default_rng(1)
+    textured = np.asarray(receipt_image(size, 11), dtype=np.float32) + rng.normal(0, 8, (size[1], size[0], 1))
+    patch = Image.open(BytesIO(_jpeg(Image.fromarray(textured.clip(0, 255).astype(np.uint8)), 65)))
+    forged = receipt_image(size, 1)
+    forged.paste(patch.crop(box), box[:2])
+
+    result = _sweep(_jpeg(forged, 92))
+    assert result['ghost_percent'] >= ALERT_PERCENT
+    assert result['ghost_quality'] == 65
+    x0, y0, x1, y1 = result['ghost_box']
+    assert box[0] - 16 <= x0 and x1 <= box[2] + 16 and box[1] - 16 <= y0 and y1 <= box[3] + 16
@@ -0,0 +1,55 @@
+import multiprocessing
+import time
+
+from forensic_tools.jobs import QUEUED, RUNNING, Heartbeat, JobQueue, pid_alive
+
+
+def _claim_and_exit(db_path):
+    JobQueue(db_path).claim()
+
+
+def test_requeue_leaves_jobs_of_live_workers(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.submit('upload.jpg', 'upload.jpg')
+    queue.claim()
+    # Another web process opening the same queue must not take the job back
+    assert JobQueue(queue.db_path).requeue_running() == 0
+    assert queue.get(job_id)['status'] == RUNNING
+
+
+def test_requeue_takes_back_jobs_of_dead_workers(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.submit('upload.jpg', 'upload.jpg')
+    worker = multiprocessing.Process(target=_claim_and_exit, args=(queue.db_path,))
+    worker.start()
+    worker.join()
+    job = queue.get(job_id)
+    assert job['status'] == RUNNING and job['worker_pid'] == worker.pid
+    assert not pid_alive(worker.pid)
+    assert queue.requeue_running() == 1
+    assert queue.get(job_id)['status'] == QUEUED
+
+
+def test_requeue_takes_back_expired_heartbeats(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0.2)
+    job_id = queue.submit('upload.jpg', 'upload.jpg')
+    queue.claim()
+    with Heartbeat(lambda: queue.heartbeat(job_id), 0.05):
+        time.sleep(0.4)
+        assert queue.requeue_running() == 0
+    time.sleep(0.3)
+    assert queue.requeue_running() == 1
+
+
+def test_sweep_deletes_expired_finished_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), ttl=0.2)
+    done, failed, running, queued = (queue.submit('upload.jpg', 'upload.jpg') for _ in range(4))
+    for job_id in (done, failed, running):
+        assert queue.claim()['id'] == job_id
+    queue.finish(done, {'ok': True})
+    queue.fail(failed, 'broken')
+    assert queue.sweep() == 0
+    time.sleep(0.3)
+    assert queue.sweep() == 2
+    assert queue.get(done) is None and queue.get(failed) is None
+    assert queue.get(running)['status'] == RUNNING and queue.get(queued)['status'] == QUEUED
@@ -0,0 +1,86 @@
+from io import BytesIO
+
+from PIL import Image
+
+from benchmarks.corpus import receipt_image
+from forensic_tools.jpeg_markers import analyze_jpeg, find_eoi, parse_jpeg_markers
+
+
+def _jpeg(seed=1, size=(320, 240), quality=80, **options):
+    buffer = BytesIO()
+    receipt_image(size, seed).save(buffer, 'JPEG', quality=quality, **options)
+    return buffer.getvalue()
+
+
+def test_single_jpeg_has_no_trailing_bytes():
+    info = parse_jpeg_markers(_jpeg())
+    assert info['valid']
+    assert info['trailing_bytes'] == 0
+
+
+def test_progressive_jpeg_has_no_trailing_bytes():
+    data = _jpeg(progressive=True)
+    info = parse_jpeg_markers(data)
+    assert info['frame']['progressive']
+    assert find_eoi(data, info['scan_offset']) == len(data) - 2
+    assert info['trailing_bytes'] == 0
+
+
+def test_two_concatenated_jpegs():
+    first, second = _jpeg(1), _jpeg(2, size=(200, 150))
+    info = parse_jpeg_markers(first + second)
+    assert info['frame']['width'] == 320
+    assert info['trailing_bytes'] == len(second)
+
+
+def test_appended_progressive_jpeg_after_progressive_jpeg():
+    first, second = _jpeg(1, progressive=True), _jpeg(2, progressive=True)
+    assert parse_jpeg_markers(first + second)['trailing_bytes'] == len(second)
+
+
+def test_appended_blob_ending_in_eoi_bytes():
+    blob = b'PK\x03\x04 payload \xff\xd9'
+    assert parse_jpeg_markers(_jpeg() + blob)['trailing_bytes'] == len(blob)
+
+
+def test_truncated_scan_has_no_eoi():
+    data = _jpeg()
+    info = parse_jpeg_markers(data[:len(data) // 2])
+    assert find_eoi(data[:len(data) // 2], info['scan_offset']) is None
+    assert info['trailing_bytes'] == 0
+
+
+def test_restart_markers_are_skipped():
+    # Pillow writes RSTn markers when a restart interval is set
+    data = _jpeg(restart_marker_blocks=1)
+    info = parse_jpeg_markers(data)
+    assert info['restart_interval']
+    assert info['trailing_bytes'] == 0
+    assert parse_jpeg_markers(data + data)['trailing_bytes'] == len(data)
+    with Image.open(BytesIO(data)) as image:
+        assert image.size == (320, 240)
+
+
+def test_photoshop_preset_tables_are_an_indicator():
+    info = analyze_jpeg(_jpeg(quality='web_high'))
+    assert info['photoshop_preset'] == "Save for Web: High"
+    assert info['encoder'].startswith('Adobe Photoshop')
+    assert len(info['indicators']) == 1
+
+
+def test_app14_and_ijg_tables_with_exif_are_only_notes():
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'  # Make
+    data = _jpeg(quality=90, exif=exif.tobytes())
+    # Cameras write no JFIF segment: drop the APP0 that Pillow puts first
+    data = data[:2] + data[4 + int.from_bytes(data[4:6], 'big'):]
+    info = analyze_jpeg(data)
+    assert info['quality_exact'] and info['app_segments'][0] == 'Exif'
+    assert info['indicators'] == [] and len(info['notes']) == 1
+
+    buffer = BytesIO()
+    receipt_image((320, 240), 1).convert('CMYK').save(buffer, 'JPEG', quality=80)
+    info = analyze_jpeg(buffer.getvalue())
+    assert 'Adobe' in info['app_segments']
+    assert info['photoshop_preset'] is None
+    assert info['indicators'] == [] and len(info['notes']) == 1
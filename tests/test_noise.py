@@ -0,0 +1,31 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.corpus import RESOLUTIONS, receipt_image
+from forensic_tools.noise import MIN_REGION, noise_map
+
+
+def _gray(seed, edited, quality):
+    img = receipt_image(RESOLUTIONS['medium'], seed, edited)
+    if quality:
+        buffer = BytesIO()
+        img.save(buffer, 'JPEG', quality=quality)
+        img = Image.open(BytesIO(buffer.getvalue()))
+    return np.asarray(img.convert('L'))
+
+
+@pytest.mark.parametrize('quality', [None, 75, 92])
+def test_clean_receipt_has_no_outlier_region(quality):
+    result = noise_map(_gray(1, False, quality))
+    assert result['region_blocks'] < MIN_REGION
+
+
+@pytest.mark.parametrize('quality', [None, 75, 92])
+def test_repainted_total_is_one_outlier_region(quality):
+    result = noise_map(_gray(1, True, quality))
+    assert result['region_blocks'] >= MIN_REGION
+    x0, y0, x1, y1 = result['region_box']
+    assert x1 > RESOLUTIONS['medium'][0] * 3 // 4 and y0 < RESOLUTIONS['medium'][1] // 2
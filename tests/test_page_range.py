@@ -0,0 +1,17 @@
+import pytest
+
+from app import parse_page_range
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('', (1, None)), (None, (1, None)), ('3', (3, 3)), ('2-5', (2, 5)), (' 2 - 5 ', (2, 5)),
+    ('2-', (2, None)), ('-5', (1, 5)), ('-', (1, None)),
+])
+def test_page_ranges_are_parsed(spec, expected):
+    assert parse_page_range(spec) == expected
+
+
+@pytest.mark.parametrize('spec', ['5-2', '0', '0-3', 'a-b', '2-5-7'])
+def test_invalid_page_ranges_are_rejected(spec):
+    with pytest.raises(ValueError, match='Invalid page range'):
+        parse_page_range(spec)
@@ -0,0 +1,135 @@
+from forensic_tools.pdf_revisions import _literal_string, parse_info_dictionary, scan_pdf_revisions
+
+
+def _pdf(objects, info_ref=b'2 0 R', header=b'%PDF-1.7\n'):
+    """A minimal PDF: header, the given (number, body) objects, an xref table and a trailer."""
+    data = bytearray(header)
+    offsets = []
+    for number, body in objects:
+        offsets.append(len(data))
+        data += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(data)
+    data += b'xref\n0 %d\n' % (len(objects) + 1)
+    data += b'0000000000 65535 f \n' + b''.join(b'%010d 00000 n \n' % o for o in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R /Info ' % (len(objects) + 1) + info_ref + b' >>\n'
+    data += b'startxref\n%d\n%%%%EOF\n' % xref
+    return bytes(data)
+
+
+def _update(base, objects, info_ref=b'2 0 R'):
+    """base with an incremental update appended: new object definitions, an xref table and a trailer."""
+    data = bytearray(base)
+    for number, body in objects:
+        data += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(data)
+    data += b'xref\n0 1\n0000000000 65535 f \ntrailer\n<< /Size 4 /Info ' + info_ref + b' >>\n'
+    data += b'startxref\n%d\n%%%%EOF\n' % xref
+    return bytes(data)
+
+
+CATALOG = (1, b'<< /Type /Catalog /Pages 3 0 R >>')
+PAGES = (3, b'<< /Type /Pages /Kids [] /Count 0 /MediaBox [0 0 595 842] >>')
+
+
+def test_literal_string_escapes():
+    assert _literal_string(b'a\\nb\\(c\\)\\\\d)', 0) == (b'a\nb(c)\\d', 13)
+    assert _literal_string(b'\\101\\7\\0610)', 0)[0] == b'A\x0710'
+
+
+def test_literal_string_nested_parentheses():
+    assert _literal_string(b'a (b (c)) d) tail', 0) == (b'a (b (c)) d', 12)
+
+
+def test_literal_string_unknown_escape_keeps_character():
+    assert _literal_string(b'v\\8\\9 \\q)', 0)[0] == b'v89 q'
+
+
+def test_literal_string_line_continuation():
+    assert _literal_string(b'ab\\\ncd\\\r\nef)', 0)[0] == b'abcdef'
+
+
+def test_literal_string_unterminated():
+    assert _literal_string(b'abc\\', 0) == (b'abc', 4)
+
+
+def test_parse_info_dictionary_literal_and_hex():
+    body = (b'<< /Producer (Canva \\(web\\)) /Creator <FEFF00470049004D0050>'
+            b' /CreationDate (D:20240101120000+07\'00\') /Trapped /False >>')
+    assert parse_info_dictionary(body) == {'Producer': 'Canva (web)', 'Creator': 'GIMP',
+                                           'CreationDate': "D:20240101120000+07'00'"}
+
+
+def test_parse_info_dictionary_odd_hex_digits():
+    assert parse_info_dictionary(b'<< /Producer <41424> >>') == {'Producer': 'AB@'}
+
+
+def test_scan_single_revision():
+    scan = scan_pdf_revisions(_pdf([CATALOG, (2, b'<< /Producer (Microsoft Word) >>'), PAGES]))
+    assert scan['version'] == '1.7'
+    assert scan['error'] is None
+    assert scan['incremental_updates'] == 0
+    assert not scan['linearized']
+    assert scan['media_box'] == (0.0, 0.0, 595.0, 842.0)
+    (revision,) = scan['revisions']
+    assert revision['xref'] == 'table'
+    assert revision['objects'] == [(1, 0), (2, 0), (3, 0)]
+    assert revision['info'] == {'Producer': 'Microsoft Word'}
+    assert scan['software'] == ['Microsoft Word']
+
+
+def test_scan_incremental_update():
+    original = _pdf([CATALOG, (2, b'<< /Producer (Microsoft Word) >>'), PAGES])
+    scan = scan_pdf_revisions(_update(original, [(2, b'<< /Producer (iLovePDF) /ModDate (D:20240301) >>')]))
+    assert scan['incremental_updates'] == 1
+    first, second = scan['revisions']
+    assert first['info'] == {'Producer': 'Microsoft Word'}
+    assert second['info'] == {'Producer': 'iLovePDF', 'ModDate': 'D:20240301'}
+    assert second['objects'] == [(2, 0)]
+    assert second['start'] == first['end'] == len(original)
+    assert scan['software'] == ['Microsoft Word', 'iLovePDF']
+
+
+def test_scan_update_without_new_info_uses_earlier_definition():
+    original = _pdf([CATALOG, (2, b'<< /Producer (Skia/PDF) >>'), PAGES])
+    scan = scan_pdf_revisions(_update(original, [(3, b'<< /Type /Pages /Kids [] /Count 0 >>')]))
+    assert [r['info'] for r in scan['revisions']] == [{'Producer': 'Skia/PDF'}] * 2
+
+
+def test_scan_linearized_is_not_an_update():
+    # The first-page section of a linearized file ends in its own %%EOF
+    first_page = _pdf([(4, b'<< /Linearized 1 /L 1000 /N 1 >>')], info_ref=b'2 0 R')
+    scan = scan_pdf_revisions(first_page + _pdf([CATALOG, (2, b'<< /Producer (Acrobat) >>'), PAGES], header=b''))
+    assert scan['linearized']
+    assert len(scan['revisions']) == 2
+    assert scan['incremental_updates'] == 0
+    assert scan['revisions'][0]['info'] == {}
+
+
+def test_scan_xref_stream_and_hex_info():
+    data = bytearray(b'%PDF-1.5\n')
+    data += b'1 0 obj\n<< /Type /Catalog >>\nendobj\n'
+    data += b'2 0 obj\n<< /Producer <FEFF00430061006E00760061> >>\nendobj\n'
+    xref = len(data)
+    data += b'5 0 obj\n<< /Type /XRef /Size 6 /Root 1 0 R /Info 2 0 R /W [1 2 1] /Length 0 >>\nstream\n\nendstream\nendobj\n'
+    data += b'startxref\n%d\n%%%%EOF\n' % xref
+    scan = scan_pdf_revisions(bytes(data))
+    (revision,) = scan['revisions']
+    assert revision['xref'] == 'stream'
+    assert revision['info_ref'] == (2, 0)
+    assert revision['info'] == {'Producer': 'Canva'}
+
+
+def test_scan_info_in_object_stream_needs_full_parse():
+    data = _pdf([CATALOG, PAGES], info_ref=b'9 0 R')
+    assert scan_pdf_revisions(data)['needs_full_parse']
+
+
+def test_scan_info_with_non_octal_escape():
+    scan = scan_pdf_revisions(_pdf([CATALOG, (2, b'<< /Producer (Tool \\9 v2) >>'), PAGES]))
+    assert scan['revisions'][0]['info'] == {'Producer': 'Tool 9 v2'}
+
+
+def test_scan_trailing_data_and_missing_header():
+    scan = scan_pdf_revisions(_pdf([CATALOG, PAGES]) + b'PK\x03\x04 appended archive')
+    assert scan['error'].endswith('bytes after the last %%EOF')
+    assert scan_pdf_revisions(b'not a pdf')['error'] == 'missing %PDF header'
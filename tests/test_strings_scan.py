@@ -0,0 +1,26 @@
+import pytest
+
+from forensic_tools.strings_scan import MAX_STRING_CHARS, scan_strings
+
+
+def _found(data, chunk_size):
+    return [(s['offset'], s['length'], s['encoding']) for s in scan_strings(data, chunk_size=chunk_size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 13, 64, 1000])
+@pytest.mark.parametrize('prefix', [b'', b'\x01', b'\x01\x02\x03'])
+def test_strings_spanning_a_window_keep_their_length(prefix, chunk_size):
+    data = prefix + ('y' * 1000).encode('utf-16le') + b'\x01' + b'abc' * 300
+    assert _found(data, chunk_size) == [(len(prefix), 2000, 'utf-16le'), (len(prefix) + 2001, 900, 'ascii')]
+
+
+def test_long_string_text_is_capped():
+    (item,) = scan_strings(b'\x00' + b'x' * 5000 + b'\x00', chunk_size=100)
+    assert item['offset'] == 1 and item['length'] == 5000
+    assert item['text'] == 'x' * MAX_STRING_CHARS
+
+
+def test_keywords_are_flagged():
+    data = b'\x00\x00Adobe Photoshop 2024\x00' + 'https://canva.com'.encode('utf-16le')
+    items = list(scan_strings(data))
+    assert [item['keywords'] for item in items] == [['photoshop', 'adobe'], ['canva', 'https://']]